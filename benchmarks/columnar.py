@@ -0,0 +1,103 @@
+"""Memory and aggregation time of a unit list: Dict vs columnar.Table.
+
+Decodes a synthetic company units response (or the largest units response
+of the given replay archives) and keeps it as a Dict of dictionaries and
+as a columnar Table. Reports the memory retained by each (measured by
+tracemalloc, the decoded response excluded), the time to total a field by
+a string field, and the time to filter by a range.
+
+Usage:
+    python benchmarks/columnar.py [ARCHIVE ...]
+"""
+
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from virtonomics.columnar import Table
+from virtonomics.jsondecoder import loads
+from virtonomics.types import Dict, ge
+
+from json_decode import recorded_payloads
+
+
+def synthetic_units(count=20000):
+    random.seed(1)
+    kinds = ['shop', 'farm', 'mine', 'warehouse', 'lab', 'workshop', 'mill']
+    countries = ['Россия', 'Украина', 'Куба', 'Дания', 'Германия']
+    units = {str(i): {
+        'id': str(i), 'name': 'Подразделение %d' % i,
+        'unit_class_kind': random.choice(kinds), 'unit_type_name': 'Тип',
+        'city_name': 'Город %d' % random.randrange(200),
+        'country_name': random.choice(countries),
+        'productivity': str(random.random()), 'size': str(random.randint(1, 6)),
+        'is_wasted': 'f', 'on_holiday': random.choice('tf'), 'innovations': [],
+        'employee_count': str(random.randrange(10000)),
+        'unit_class_id': '1885', 'region_id': str(random.randrange(3000, 3100))}
+        for i in range(7000000, 7000000 + count)}
+    return json.dumps({'info': {'count': str(count)}, 'data': units}).encode()
+
+
+def retained(build, data):
+    """Memory retained by the structure built from decoded data."""
+    
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(data)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def loop_sum(units, field, by):
+    result = {}
+    for unit in units.values():
+        result[unit[by]] = result.get(unit[by], 0) + unit[field]
+    return result
+
+
+def main(filenames):
+    if filenames:
+        contents = recorded_payloads(filenames)['company/units']
+        content = max(contents, key=len)
+    else:
+        content = synthetic_units()
+    units = Dict(loads(content)['data'])
+    
+    # Copy the records, so that the Dict does not share them with units
+    units_dict, dict_size = retained(
+        lambda d: Dict({k: dict(v) for k, v in d.items()}), units)
+    units_table, table_size = retained(Table.from_dict, units)
+    print('%d units' % len(units))
+    print('%-16s %12s %12s' % ('', 'Dict', 'Table'))
+    print('%-16s %10.1fMB %10.1fMB' % ('memory', dict_size / 2**20,
+                                       table_size / 2**20))
+    
+    sums, dict_time = timed(lambda: loop_sum(units_dict, 'employee_count',
+                                             'country_name'))
+    table_sums, table_time = timed(lambda: units_table.sum('employee_count',
+                                                           by='country_name'))
+    assert sums == table_sums
+    print('%-16s %10.1fms %10.1fms' % ('sum by country', dict_time * 1000,
+                                       table_time * 1000))
+    
+    found, dict_time = timed(lambda: units_dict(size=ge(5), on_holiday=True))
+    table_found, table_time = timed(lambda: units_table(size=ge(5), on_holiday=True))
+    assert list(found) == list(table_found)
+    print('%-16s %10.1fms %10.1fms' % ('filter', dict_time * 1000,
+                                       table_time * 1000))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,90 @@
+"""Memory and field access time of dict records vs compact records.
+
+Decodes synthetic units and offers responses (or the JSON responses of
+the given replay archives) and converts the records to compact records
+(virtonomics.records). Reports the memory retained by the records of each
+kind (measured by tracemalloc, the shared field values excluded), and the
+time of a loop reading two fields of every offer by item (dict and
+record), by attribute (record) and by records.getter (both).
+
+Usage:
+    python benchmarks/compact_records.py [ARCHIVE ...]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from virtonomics.jsondecoder import loads
+from virtonomics.records import compact, getter
+
+from json_decode import recorded_payloads, synthetic_payloads
+
+
+def retained(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def by_item(records):
+    return sum(r['price'] * r['quality'] for r in records)
+
+
+def by_attribute(records):
+    return sum(r.price * r.quality for r in records)
+
+
+def by_getter(records):
+    get = getter(records, 'price', 'quality')
+    return sum(price * quality for price, quality in map(get, records))
+
+
+def main(filenames):
+    payloads = recorded_payloads(filenames) if filenames else synthetic_payloads()
+    print('%-40s %8s %10s %10s' % ('payload', 'records', 'dict', 'compact'))
+    offers = None
+    for kind, contents in sorted(payloads.items()):
+        data = loads(max(contents, key=len))
+        if isinstance(data, dict) and 'data' in data:
+            data = data['data']
+        records = data.values() if isinstance(data, dict) else data
+        records = [r for r in records if isinstance(r, dict)]
+        if not records:
+            continue
+        # Records built from the same decoded values: only the containers
+        # are measured
+        dicts, dict_size = retained(lambda: [dict(r) for r in records])
+        compacts, compact_size = retained(lambda: compact(records, 'record'))
+        print('%-40s %8d %8.1fMB %8.1fMB' % (kind[:40], len(records),
+                                             dict_size / 2**20,
+                                             compact_size / 2**20))
+        if 'price' in records[0] and 'quality' in records[0]:
+            offers = (dicts, compacts)
+    
+    if offers:
+        dicts, compacts = offers
+        print('\nprice * quality over %d offers:' % len(dicts))
+        print('%-24s %8.1fms' % ('dict items', timed(lambda: by_item(dicts)) * 1000))
+        print('%-24s %8.1fms' % ('record items', timed(lambda: by_item(compacts)) * 1000))
+        print('%-24s %8.1fms' % ('record attributes',
+                                 timed(lambda: by_attribute(compacts)) * 1000))
+        print('%-24s %8.1fms' % ('dict getter', timed(lambda: by_getter(dicts)) * 1000))
+        print('%-24s %8.1fms' % ('record getter',
+                                 timed(lambda: by_getter(compacts)) * 1000))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,122 @@
+"""Decoding time of the API responses: two pass decoder vs backends.
+
+Decodes the JSON responses stored in replay archives (see 
+virtonomics.replay, Virta(record=...)) with the previous two pass decoder 
+(stock decoding, then a recursive conversion walk) and with jsondecoder.loads
+using every available backend (see jsondecoder.backends), checks the 
+results are identical and reports the time per payload kind (API path 
+without ids and query).
+
+If no archive is given, synthetic units and offers payloads are used.
+
+Usage:
+    python benchmarks/json_decode.py [ARCHIVE ...]
+"""
+
+import json
+import re
+import sys
+import timeit
+from collections import defaultdict
+
+from virtonomics import replay
+from virtonomics import jsondecoder
+
+
+class TwoPassDecoder(json.JSONDecoder):
+    """Previous implementation of jsondecoder.Decoder."""
+    
+    def decode(self, s):
+        result = super().decode(s)
+        return self._decode(result)
+
+    def _decode(self, o):
+        if isinstance(o, str):
+            if o == 't':
+                return True
+            elif o == 'f':
+                return False
+            else:
+                try:
+                    return int(o)
+                except ValueError:
+                    try:
+                        return float(o)
+                    except ValueError:
+                        return o
+        elif isinstance(o, dict):
+            result = {}
+            for k, v in o.items():
+                try:
+                    k = int(k)
+                except ValueError:
+                    pass
+                result[k] = self._decode(v)
+            return result
+        elif isinstance(o, list):
+            return [self._decode(v) for v in o]
+        else:
+            return o
+
+
+def synthetic_payloads():
+    units = {str(i): {
+        'id': str(i), 'name': 'Магазин %d' % i, 'unit_class_kind': 'shop',
+        'unit_type_name': 'Магазин', 'city_name': 'Москва', 'country_name':
+        'Россия', 'productivity': '0.98', 'size': '5', 'is_wasted': 'f',
+        'on_holiday': 'f', 'innovations': [], 'employee_count': '1500',
+        'unit_class_id': '1885', 'region_id': '3054', 'x': '12.5'}
+        for i in range(7000000, 7003000)}
+    offers = {str(i): {
+        'id': str(i), 'company_name': 'Компания %d' % i, 'price': '123.45',
+        'quality': '12.34', 'brand': '0', 'free_for_buy': '100000',
+        'max_qty': None, 'is_independent': 't', 'unit_id': str(i + 1)}
+        for i in range(80000000, 80010000)}
+    return {
+        'company/units': [json.dumps({'info': {'count': '3000'}, 
+                                      'data': units}).encode()],
+        'marketing/report/trade/offers': [json.dumps({'data': offers}).encode()],
+        }
+
+
+def recorded_payloads(filenames):
+    result = defaultdict(list)
+    for filename in filenames:
+        for (method, path, body), entries in replay.load(filename).items():
+            kind = re.sub(r'\d+', '{}', path.split('?')[0].split('/api/')[-1])
+            for entry in entries:
+                content = entry['content']
+                if content[:1] in (b'{', b'['):
+                    result[kind].append(content)
+    return result
+
+
+def main(filenames):
+    payloads = recorded_payloads(filenames) if filenames else synthetic_payloads()
+    names = list(jsondecoder.backends)
+    decoders = [lambda c: json.loads(c, cls=TwoPassDecoder)] + [
+        jsondecoder.backends[name] for name in names]
+    print('%-40s %6s %8s' % ('payload', 'count', 'KB') 
+          + ''.join('%10s' % name for name in ['two pass'] + names))
+    totals = [0] * len(decoders)
+    for kind, contents in sorted(payloads.items(), key=lambda p: -sum(map(len, p[1]))):
+        for content in contents:
+            expected = decoders[0](content)
+            for name in names:
+                jsondecoder.set_backend(name)
+                assert jsondecoder.loads(content) == expected, name
+        times = [min(timeit.repeat(lambda: [decode(c) for c in contents], 
+                                   number=1, repeat=3))
+                 for decode in decoders]
+        totals = [total + t for total, t in zip(totals, times)]
+        print('%-40s %6d %8d' % (kind[:40], len(contents), 
+                                 sum(map(len, contents)) // 1024)
+              + ''.join('%8.1fms' % (t * 1000) for t in times))
+    print('%-40s %6s %8s' % ('total', '', '')
+          + ''.join('%8.1fms' % (t * 1000) for t in totals))
+    print('%-40s %6s %8s' % ('speedup', '', '')
+          + ''.join('%9.2fx' % (totals[0] / t) for t in totals))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
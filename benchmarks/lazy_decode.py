@@ -0,0 +1,70 @@
+"""Eager vs lazy records: decoding time, field access time and memory.
+
+Decodes the JSON responses of the given replay archives (or synthetic 
+units and offers payloads) with jsondecoder.loads, eagerly and with 
+lazy=True (see jsondecoder.LazyRecord), then reads a few fields of every
+record, like most consumers of units and offers do.
+
+Times are the best of 5 runs, memory is the peak while decoding.
+
+Usage:
+    python benchmarks/lazy_decode.py [ARCHIVE ...]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from virtonomics.jsondecoder import loads
+
+from json_decode import recorded_payloads, synthetic_payloads
+
+
+FIELDS = ('id', 'name', 'price', 'size')
+
+
+def records(document):
+    data = document.get('data', document) if isinstance(document, dict) else document
+    values = data.values() if isinstance(data, dict) else data
+    return [value for value in values if isinstance(value, dict)]
+
+
+def read_fields(document):
+    return [[record.get(field) for field in FIELDS] for record in records(document)]
+
+
+def measure(content, lazy, repeat=5):
+    decode = access = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        document = loads(content, lazy=lazy)
+        decoded = time.perf_counter()
+        fields = read_fields(document)
+        accessed = time.perf_counter()
+        decode = min(decode, decoded - start)
+        access = min(access, accessed - decoded)
+    tracemalloc.start()
+    document = loads(content, lazy=lazy)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return fields, decode, access, peak
+
+
+def main(filenames):
+    payloads = recorded_payloads(filenames) if filenames else synthetic_payloads()
+    print('%-32s %-6s %10s %10s %10s %10s' % ('payload', 'mode', 'decode', 
+          'access', 'total', 'memory'))
+    for kind, contents in sorted(payloads.items(), key=lambda p: -sum(map(len, p[1]))):
+        content = max(contents, key=len)
+        results = []
+        for lazy in (False, True):
+            fields, decode, access, peak = measure(content, lazy)
+            results.append(fields)
+            print('%-32s %-6s %8.1fms %8.1fms %8.1fms %8.1fMB' % (kind[:32], 
+                  'lazy' if lazy else 'eager', decode * 1000, access * 1000, 
+                  (decode + access) * 1000, peak / 2**20))
+        assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,50 @@
+"""Parsing throughput of crawled pages: calling thread vs parse pool.
+
+Parses synthetic technology sellers pages (as fetched by 
+technology_sellers_many) with the registered scraper, in the calling 
+thread and in scrapers.ParsePool worker processes. The pool only helps on
+several cores: the number of CPUs is printed.
+
+Usage:
+    python benchmarks/parse_pool.py [PAGES] [ROWS]
+"""
+
+import os
+import sys
+import time
+
+import virtonomics._technology  # registers the scrapers
+from virtonomics.scrapers import ParsePool, scrapers
+
+
+def sellers_page(level, rows):
+    body = ''.join('<tr><td><a href="/olga/main/company/view/%d">Company</a>'
+                   '</td><td>$%d %03d.50</td></tr>' % (1000 + i, level, i)
+                   for i in range(rows))
+    menu = '<ul>%s</ul>' % ('<li><a href="#">Menu</a></li>' * 2000)
+    return ('<html><head><meta charset="utf-8"></head><body>%s<div '
+            'id="mainContent"><table>%s</table></div></body></html>' 
+            % (menu, body)).encode()
+
+
+def main(pages=48, rows=500):
+    contents = [sellers_page(level, rows) for level in range(pages)]
+    scraper = scrapers['technology_sellers']
+    print('%d pages of %d KB, %d rows, %d CPUs' % (pages, 
+          len(contents[0]) // 1024, rows, os.cpu_count()))
+    results = []
+    for processes in (0, None):
+        pool = ParsePool(processes)
+        pool.start()
+        start = time.perf_counter()
+        futures = [pool.submit(scraper, content, 'utf-8') for content in contents]
+        results.append([future.result() for future in futures])
+        elapsed = time.perf_counter() - start
+        pool.shutdown()
+        print('%-16s %8.1fms' % ('calling thread' if processes == 0 
+                                 else 'parse pool', elapsed * 1000))
+    assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
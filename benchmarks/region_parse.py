@@ -0,0 +1,65 @@
+"""Parse cost of the whole page vs the main content region.
+
+Builds a synthetic unit page: a trading hall table of a given size inside
+#mainContent, surrounded by menus, scripts and a sidebar of typical size,
+and compares html.fromstring on the whole page with Session.tree region 
+parsing (cut_region and parsing the fragment only).
+
+Usage:
+    python benchmarks/region_parse.py [ROWS] [REPEAT]
+"""
+
+import sys
+import timeit
+
+from lxml import html
+
+from virtonomics.transport import cut_region
+
+sys.path.insert(0, 'benchmarks')
+from xpath_parse import trading_hall_page
+
+
+def unit_page(rows):
+    menu = ''.join('<li><a href="/olga/main/menu/%d">Пункт меню %d</a>'
+                   '<ul><li><a href="#">%d</a></li></ul></li>' % (i, i, i)
+                   for i in range(300))
+    script = '<script>var data = [%s];</script>' % ','.join(
+        '{"id": %d, "html": "<div class=\\"tip\\">%d</div>"}' % (i, i)
+        for i in range(2000))
+    sidebar = ''.join('<div class="news"><h4>Новость %d</h4><p>%s</p></div>'
+                      % (i, 'Текст новости. ' * 20) for i in range(100))
+    table = trading_hall_page(rows).split('<body>')[1].split('</body>')[0]
+    return ('<html><head><meta charset="utf-8">%s</head><body>'
+            '<div id="menu"><ul>%s</ul></div><div id="wrapper">'
+            '<div id="mainContent"><h1>Магазин</h1>%s</div>'
+            '<div id="sidebar">%s</div></div></body></html>'
+            % (script, menu, table, sidebar)).encode()
+
+
+def parse_page(content):
+    return html.fromstring(content)
+
+
+def parse_region(content):
+    fragment = cut_region(content, 'mainContent')
+    return html.fromstring(fragment, parser=html.HTMLParser(encoding='utf-8'))
+
+
+def main(rows=50, repeat=20):
+    content = unit_page(rows)
+    fragment = cut_region(content, 'mainContent')
+    rows_xp = '//input[@type="text"]/ancestor::tr'
+    assert len(parse_page(content).xpath(rows_xp)) == rows
+    assert len(parse_region(content).xpath(rows_xp)) == rows
+    print('%d rows, page %d KB, region %d KB, best of %d' % (
+          rows, len(content) // 1024, len(fragment) // 1024, repeat))
+    for parse in (parse_page, parse_region):
+        seconds = min(timeit.Timer(lambda: parse(content)).repeat(repeat, 1))
+        elements = sum(1 for _ in parse(content).getroottree().iter())
+        print('%-14s %8.2f ms %8d elements' % (parse.__name__, seconds * 1000,
+                                               elements))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,81 @@
+"""Peak memory and time of decoding a market: loads vs iter_items.
+
+Decodes a synthetic offers response (or the largest JSON response of the
+given replay archives) whole with jsondecoder.loads and incrementally with
+jsondecoder.iter_items, from 64 KB chunks, keeping only the cheapest offer.
+Peak memory is measured by tracemalloc and excludes the body itself, which
+is not held in memory when streaming from the socket.
+
+Before measuring, checks that iter_items decodes a document with floats
+and exponents split at every offset like loads.
+
+Usage:
+    python benchmarks/stream_decode.py [ARCHIVE ...]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from virtonomics.jsondecoder import iter_items, loads
+
+from json_decode import recorded_payloads, synthetic_payloads
+
+
+def chunks(content, size=65536):
+    for i in range(0, len(content), size):
+        yield content[i:i+size]
+
+
+def check_split():
+    """iter_items results match loads however the document is split."""
+    
+    content = (b'{"info": {"count": "3"}, "data": {"1": {"a": 2.5, "b": 1e5, '
+               b'"c": -0.25E-3, "d": "7", "e": [10, 1.5e+2, true, null]}, '
+               b'"2": {"a": 12345, "b": "x"}, "3": 6.02e23}}')
+    expected = list(loads(content)['data'].items())
+    for offset in range(1, len(content)):
+        parts = [content[:offset], content[offset:]]
+        assert list(iter_items(parts)) == expected, offset
+    for size in range(1, 8):
+        assert list(iter_items(chunks(content, size))) == expected, size
+
+
+def cheapest_loaded(content):
+    records = loads(content)['data'].values()
+    return min(records, key=lambda r: r.get('price') or 0)
+
+
+def cheapest_streamed(content):
+    records = (record for _, record in iter_items(chunks(content)))
+    return min(records, key=lambda r: r.get('price') or 0)
+
+
+def measure(function, content):
+    start = time.perf_counter()
+    result = function(content)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()  # slows decoding down, so timed separately
+    function(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(filenames):
+    check_split()
+    payloads = recorded_payloads(filenames) if filenames else synthetic_payloads()
+    content = max((c for contents in payloads.values() for c in contents), key=len)
+    print('payload %d KB' % (len(content) // 1024))
+    print('%-10s %10s %12s' % ('', 'time', 'peak memory'))
+    results = []
+    for name, function in [('loads', cheapest_loaded), 
+                           ('iter_items', cheapest_streamed)]:
+        result, elapsed, peak = measure(function, content)
+        results.append(result)
+        print('%-10s %8.1fms %10.1fMB' % (name, elapsed * 1000, peak / 2**20))
+    assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,174 @@
+"""Per-page parse cost of the HTML scrapers.
+
+Builds synthetic trading hall, supply and sale pages of a given size and
+extracts all the cells scraped by trading_hall, supply_products and
+sale_offers:
+    strings - xpath per cell given as a string (compiled by lxml on every
+        call, as the scrapers used to do),
+    compiled - xpath per cell precompiled once (see virtonomics.xpath),
+    table - single pass typed extraction (see virtonomics.htmltable).
+The table timings include the values conversion, the others do not.
+
+Usage:
+    python benchmarks/xpath_parse.py [ROWS] [REPEAT]
+"""
+
+import sys
+import timeit
+
+from lxml import etree, html
+
+from virtonomics._shop import trading_hall_table
+from virtonomics._supply import supply_products_table
+from virtonomics.htmltable import Table, Column
+from virtonomics.xpath import xpaths
+
+
+def trading_hall_page(rows):
+    row = ('<tr><td></td><td><input type="checkbox" name="productData'
+           '[selected][{{{0},{1}}}]"></td><td><a href="/olga/main/globalreport'
+           '/marketing?product_id={0}&amp;unit_id=1">Product</a></td>'
+           '<td><a href="#">1 234</a></td><td>[1 000]</td><td>12 345</td>'
+           '<td>12.34</td><td>1.23</td><td>$1 234.56</td><td><input type="text"'
+           ' name="productData[price][{{{0},{1}}}]" value="99.5"></td>'
+           '<td>12.3 %</td><td>$100.00</td><td>10.5</td><td>2.1</td></tr>')
+    body = ''.join(row.format(1500 + i, 58000000 + i) for i in range(rows))
+    return '<html><body><table>%s</table></body></html>' % body
+
+
+def supply_page(rows):
+    row = ('<tr><td><img src="/img/products/p{0}.gif" alt="Product {0}">'
+           '<a href="/olga/main/unit/supply/create/1/{0}">+</a></td><td>'
+           '<table><tr><td>Количество</td><td>1 000</td></tr>'
+           '<tr><td>Качество</td><td>12.5</td></tr>'
+           '<tr><td>Себестоимость</td><td>$123.45</td></tr>'
+           '<tr><td>Требуется</td><td>2 000</td></tr>'
+           '<tr><td>Бренд</td><td>1.5</td></tr>'
+           '<tr><td>Продано</td><td>900</td></tr>'
+           '<tr><td>Расх. на клиента</td><td>3</td></tr></table></td>'
+           '<td><img title="Выбрать поставщика"></td></tr>')
+    body = ''.join(row.format(1500 + i) for i in range(rows))
+    return '<html><body><table>%s</table></body></html>' % body
+
+
+def sale_page(rows):
+    subtable = ('<table><tr><td>Количество</td><td>1 000</td></tr>'
+                '<tr><td>Качество</td><td>12.5</td></tr>'
+                '<tr><td>Себестоимость</td><td>$123.45</td></tr></table>')
+    row = ('<tr><td><input type="checkbox" value="{0}/0"></td><td><a href='
+           '"/olga/main/globalreport/marketing?product_id={0}">Product</a>'
+           '</td><td>%s</td><td>%s</td><td><input name="storageData[{0}]'
+           '[price]" value="10.5"></td><td><input name="storageData[{0}]'
+           '[max_qty]" value="100"></td><td><select name="storageData[{0}]'
+           '[constraint]"><option value="0">0</option><option value="2" '
+           'selected>2</option></select></td></tr>') % (subtable, subtable)
+    header = ('<tr><th></th><th>Товар</th><th>Выпуск</th><th>На складе</th>'
+              '<th>Цена</th><th>Макс.</th><th>Политика</th></tr>')
+    body = header + ''.join(row.format(1500 + i) for i in range(rows))
+    return '<html><body><table>%s</table></body></html>' % body
+
+
+# Cell expressions the scrapers used to evaluate for every row:
+# page: (page builder, rows xpath, [(cell xpath, xpath variables)])
+subtable = './/table//td[contains(.,$label)]/../td[2]/text()'
+column_subtable = './td[$column]/table//td[contains(.,$label)]/../td[2]/text()'
+PAGES = {
+    'trading_hall': (trading_hall_page, '//input[@type="text"]/ancestor::tr', [
+        ('./td[2]/input/@name', {}),
+        ('./td[3]/a/@href', {}),
+        ('./td[4]/a/text()', {}),
+        ] + [
+        ('./td[%d]/text()' % i, {}) for i in range(5, 10)
+        ] + [
+        ('./td[10]/input/@value', {}),
+        ] + [
+        ('./td[%d]/text()' % i, {}) for i in range(11, 15)
+        ]),
+    'supply_products': (supply_page, 
+                        '//img[@title="Выбрать поставщика"]/ancestor::tr[last()]', [
+        ('.//@href[contains(.,"supply/create")]', {}),
+        ('.//img[contains(@src,"img/products")]/@alt', {}),
+        ] + [
+        (subtable, {'label': label}) for label in (
+            'Количество', 'Качество', 'Себестоимость', 'Требуется', 'Бренд',
+            'Продано', 'Расх. на клиента')
+        ]),
+    'sale_offers': (sale_page, '//input[contains(@name,"[price]")]/ancestor::tr', [
+        ('./td/a[contains(@href,"globalreport/marketing")]/text()', {}),
+        ('./td/input[contains(@name,"[price]")]/@value', {}),
+        ('./td//input[contains(@name,"[max_qty]")]/@value', {}),
+        ('./td/select[contains(@name,"[constraint]")]/option[@selected]/@value', {}),
+        ('./td/input[@type="checkbox"]/@value', {}),
+        ('./td//select[contains(@name,"[company]")]/option/@value', {}),
+        ] + [
+        (column_subtable, {'column': column, 'label': label})
+        for column in (3, 4)
+        for label in ('Количество', 'Качество', 'Себестоимость')
+        ]),
+    }
+
+
+def parse_strings(page, rows_xp, cells):
+    """Cells extraction with string expressions (compiled on every call)."""
+    
+    result = []
+    for row in page.xpath(rows_xp):
+        result.append([row.xpath(xp, **variables) for xp, variables in cells])
+    return result
+
+
+def parse_compiled(page, rows_xp, cells):
+    """Cells extraction with expressions compiled once per page."""
+    
+    rows_xp = etree.XPath(rows_xp)
+    cells = [(etree.XPath(xp), variables) for xp, variables in cells]
+    result = []
+    for row in rows_xp(page):
+        result.append([xp(row, **variables) for xp, variables in cells])
+    return result
+
+
+def parse_table(page_name):
+    """Typed records extraction with the scraper table spec."""
+    
+    if page_name == 'trading_hall':
+        return trading_hall_table.records
+    if page_name == 'supply_products':
+        return supply_products_table.records
+    columns = [
+        Column('product_name', path=xpaths['sale_offers.product_name']),
+        Column('price', type='float', path=xpaths['sale_offers.price']),
+        Column('max_qty', type='int', path=xpaths['sale_offers.max_qty']),
+        Column('constraint', type='int', path=xpaths['sale_offers.constraint']),
+        Column('product', path=xpaths['sale_offers.product'], required=False),
+        Column('company', type=int, path=xpaths['sale_offers.company'], 
+               many=True),
+        ] + [
+        Column(label, column, 'money', label=label) 
+        for column in (3, 4)
+        for label in ('Количество', 'Качество', 'Себестоимость')
+        ]
+    return Table('sale_offers.rows', columns).records
+
+
+def main(rows=500, repeat=5):
+    print('%d rows per page, best of %d, ms per page' % (rows, repeat))
+    print('%-16s %10s %10s %10s' % ('page', 'strings', 'compiled', 'table'))
+    for page_name, (build, rows_xp, cells) in PAGES.items():
+        page = html.fromstring(build(rows))
+        before = parse_strings(page, rows_xp, cells)
+        after = parse_compiled(page, rows_xp, cells)
+        assert len(before) == rows and list(map(str, before)) == list(map(str, after))
+        records = parse_table(page_name)
+        assert len(records(page)) == rows
+        timers = [
+            timeit.Timer(lambda: parse_strings(page, rows_xp, cells)),
+            timeit.Timer(lambda: parse_compiled(page, rows_xp, cells)),
+            timeit.Timer(lambda: records(page)),
+            ]
+        times = [min(timer.repeat(repeat, 1)) * 1000 for timer in timers]
+        print('%-16s %10.1f %10.1f %10.1f' % (page_name, *times))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -3,7 +3,6 @@
 """
 
 from virtonomics import Virta
-from .delay import delay
 
 
 class MyVirta(Virta):
@@ -65,10 +64,10 @@ class MyVirta(Virta):
         read_shagreen_data,
         )
     
+    lazy_attributes = Virta.lazy_attributes | {'retail_target_volumes'}
+    
     def __init__(self, server='olga', **kwargs):
         super().__init__(server, **kwargs)
-        self.session.get = delay(self.session.get)
-        self.session.post = delay(self.session.post)
     
     def __getattr__(self, attrname):
         if attrname == 'retail_target_volumes':
@@ -7,6 +7,8 @@ import matplotlib.pyplot as plt
 
 sys.path.append('./virtonomics')
 from jsondecoder import Decoder
+from virtonomics.scrapers import scraper
+from virtonomics.xpath import xpaths
 
 
 def load_shagreen_data(shagreen_id, day):
@@ -77,46 +79,44 @@ def clean_data(data):
     return result
 
 
-def read_shagreen_data(self, save=False):
-    def read_unit_data(unit_id):
-        result = {}
-        url = self.domain_ext + 'unit/view/%d' % unit_id
-        page = self.session.tree(url)
-        
-        if page.xpath('//h1[contains(.,"404")]'):
-            return None
-        
-        xp = '//img[contains(@src,"artefact")]/@title'
-        innovations = page.xpath(xp)
-        result['innovations'] = list(map(str, innovations))
-        xp = '//td[.="%s"]/../td[2]/text()'
-        fields = [
-            ('district', 'Расположение магазина', str),
-            ('size', 'Торговая площадь', int),
-            ('departments', 'Количество отделов', int),
-            ('fame', 'Известность', float),
-            ('visitors', 'Количество посетителей', str),
-            ('service', 'Уровень сервиса', str),
-        ]
-        for key, name, typ in fields:
-            values = page.xpath(xp % name)
-            if values:
-                value = values[0]
-                if typ != str:
-                    value = value.replace(' ', '')
-                if key == 'size':
-                    value = value.replace('м', '')
-                if key == 'district':
-                    value = value.replace(',', '').strip()
-                result[key] = typ(value)
-        xp = '//img[@alt="Шагрень"]/../../td[5]/text()'
-        price = page.xpath(xp)
-        if price:
-            price = price[0].replace(' ', '').replace('$', '')
-            if price != 'неизв.':
-                result['price'] = float(price)
-        return result
+@scraper('shagreen_unit', region='mainContent')
+def read_unit_data(page):
+    """Competitor shop data from its unit page (None if not found)."""
     
+    result = {}
+    if xpaths['unit_view.not_found'](page):
+        return None
+    
+    innovations = xpaths['shagreen.innovations'](page)
+    result['innovations'] = list(map(str, innovations))
+    fields = [
+        ('district', 'Расположение магазина', str),
+        ('size', 'Торговая площадь', int),
+        ('departments', 'Количество отделов', int),
+        ('fame', 'Известность', float),
+        ('visitors', 'Количество посетителей', str),
+        ('service', 'Уровень сервиса', str),
+    ]
+    for key, name, typ in fields:
+        values = xpaths['shagreen.field'](page, name=name)
+        if values:
+            value = values[0]
+            if typ != str:
+                value = value.replace(' ', '')
+            if key == 'size':
+                value = value.replace('м', '')
+            if key == 'district':
+                value = value.replace(',', '').strip()
+            result[key] = typ(value)
+    price = xpaths['shagreen.price'](page)
+    if price:
+        price = price[0].replace(' ', '').replace('$', '')
+        if price != 'неизв.':
+            result['price'] = float(price)
+    return result
+
+
+def read_shagreen_data(self, save=False):
     def read_self_unit_data(unit_id):
         result = {}
         unit_summary = self.unit_summary(unit_id)
@@ -127,14 +127,12 @@ def read_shagreen_data(self, save=False):
         result['fame'] = round(unit_summary['fame'] * 100, 2)
         result['visitors'] = unit_summary['customers_count']
         url = self.domain_ext + 'unit/view/%d' % unit_id
-        page = self.session.tree(url)
-        xp = '//img[contains(@src,"pub/artefact")]/@title'
-        innovations = page.xpath(xp)
+        page = self.session.tree(url, region='mainContent')
+        innovations = xpaths['shagreen.own_innovations'](page)
         result['innovations'] = list(map(str, innovations))
         url = self.domain_ext + 'unit/view/%d/product_history/423040/' % unit_id
-        page = self.session.tree(url)
-        xp = '//tr/td[4]/text()'
-        result['price'] = float(page.xpath(xp)[0])
+        page = self.session.tree(url, region='mainContent')
+        result['price'] = float(xpaths['shagreen.history_price'](page)[0])
         return result
     
     
@@ -153,22 +151,20 @@ def read_shagreen_data(self, save=False):
             data[0] = {}
             
         url = self.domain_ext + 'olla/%d' % shagreen_id
-        page = self.session.tree(url)
-        xp = ('//div[@id="mainContent"]//img[contains(@src,"flags")]' +
-              '/following-sibling::b/text()')
-        city_name = page.xpath(xp)[0]
+        page = self.session.tree(url, region='mainContent')
+        city_name = xpaths['shagreen.city_name'](page)[0]
         local_market_info = self.retail_history(423040, city_name=city_name)[-1]
         data[0][day] = local_market_info
         
-        xp = '//a[contains(@href, "unit/view/")]/..'
-        cells = page.xpath(xp)
+        cells = xpaths['shagreen.cells'](page)
         units = []
         for cell in cells:
-            total_revenue = float(cell.xpath('./text()')[0].strip().replace(' ', '').replace('$', ''))
-            unit_id = int(cell.xpath('./a/@href')[0].split('/')[-1])
+            total_revenue = xpaths['shagreen.revenue'](cell)[0]
+            total_revenue = float(total_revenue.strip().replace(' ', '').replace('$', ''))
+            unit_id = int(xpaths['shagreen.unit_href'](cell)[0].split('/')[-1])
             units.append(unit_id)
-            user = str(cell.xpath('./../td[2]//a/text()')[0])
-            company = cell.xpath('./../td[3]//a/text()')
+            user = xpaths['shagreen.user'](cell)[0]
+            company = xpaths['shagreen.company'](cell)
             if unit_id not in data:
                 data[unit_id] = {}
             if day not in data[unit_id]:
@@ -178,12 +174,16 @@ def read_shagreen_data(self, save=False):
                 if company:
                     data[unit_id][day]['company'] = str(company[0])
         
+        # Competitors pages are parsed in worker processes
+        urls = {unit_id: self.domain_ext + 'unit/view/%d' % unit_id
+                for unit_id in units if unit_id not in self.units}
+        units_data = self.scrape_many('shagreen_unit', urls, raise_errors=True)
         for unit_id in units:
             print(unit_id)
             if unit_id in self.units():
                 unit_data = read_self_unit_data(unit_id)
             else:
-                unit_data = read_unit_data(unit_id)
+                unit_data = units_data[unit_id]
                 if not unit_data:
                     unit_data = today_data.get(unit_id, {}).get(day, {})
             data[unit_id][day] = {**data[unit_id][day], **unit_data}
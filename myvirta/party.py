@@ -1,3 +1,6 @@
+from virtonomics.xpath import xpaths
+
+
 def party_sales(self, unit_ids=None):
     """Open warehouse sales for party members.
     
@@ -9,9 +12,8 @@ def party_sales(self, unit_ids=None):
     # Determine party members companies ids
     url = self.domain_ext + 'company/view/%s/party' % self.company['id']
     page = self.session.tree(url)
-    xp = '//input[@name="member[]"]/../..//a[contains(@href,"company/view")]/@href'
-    companies = [href.split('/')[-1] for href in page.xpath(xp)]
-    for unit_id, unit in self.units(unit_type_name='Склад').items():
+    companies = [href.split('/')[-1] for href in xpaths['party.companies'](page)]
+    for unit_id, unit in self.units.view(unit_type_name='Склад').items():
         if (unit_ids and unit_id in unit_ids 
                 or not unit_ids and unit['name'][:1] == '%'):
             print(unit['name'])
@@ -1,11 +1,21 @@
+from virtonomics.scrapers import scraper
+from virtonomics.xpath import xpaths
+
 from .const import ECO_FACTORS, INDUSTRIAL_CITIES, SUPPORTED_PARTIES, MANAGED_SHOPS_NAMES
 
 
+@scraper('eco_factors')
+def scrape_eco_factors(page, names=ECO_FACTORS):
+    """Ecological factors states on a mayor or governor page."""
+    
+    return {name: xpaths['eco_factor'](page, name=name)[0] for name in names}
+
+
 def agitation(self):
     """Запустить политическую агитацию на всех виллах"""
     
     print('\nПолитическая агитация:')
-    units = self.units(unit_type_name='Вилла', country_name='Украина')
+    units = self.units.view(unit_type_name='Вилла', country_name='Украина')
     for unit in units.values():
         print(unit['name'])
         self.set_innovation(unit['id'], 'agitation')
@@ -15,8 +25,7 @@ def manage_cities(self):
     """Управление городами"""
     
     print('\nMAYOR')
-    cities = [c for c in self.cities.values() 
-              if 'mayor' in c and c['mayor']['mayor_name']==self.user]
+    cities = self.cities.view(mayor=lambda m: m and m['mayor_name']==self.user).values()
     
     for city in cities:
         is_industrial = city['city_name'] in INDUSTRIAL_CITIES
@@ -27,10 +36,10 @@ def manage_cities(self):
         
         # Run ecological projects once necessary and before election
         url = self.domain_ext + 'politics/mayor/%s' % city['id']
-        page = self.session.tree(url)
+        states = self.scrape('eco_factors', url)
         for eco_factor in ECO_FACTORS:
-            xpath = '//td[.="%s"]/../td[2]/span/text()' % eco_factor
-            if days_to_election <= 1 or page.xpath(xpath)[0] != 'в норме':
+            state = states[eco_factor]
+            if days_to_election <= 1 or state != 'в норме':
                 self.city_money_project(city['id'], eco_factor)
                 
         # Continuously run trade union agreement for industrial cities
@@ -74,7 +83,7 @@ def manage_cities(self):
         
         # Removed
         if False and days_to_election == 0:
-            shops = self.units(city_id=city['id'], unit_class_kind='shop')
+            shops = self.units.view(city_id=city['id'], unit_class_kind='shop')
             for shop_id, shop in shops.items():
                 if shop['name'] not in MANAGED_SHOPS_NAMES:
                     self.set_innovation(shop_id, 'shop_retail')
@@ -92,16 +101,15 @@ def manage_regions(self):
     """Управление регионами"""
     
     print('\nGOVERNOR')
-    regions = [c for c in self.regions.values() if 'governor' in c 
-               and c['governor']['governor_name']==self.user]
+    regions = self.regions.view(
+        governor=lambda g: g and g['governor_name']==self.user).values()
     for region in regions:
         print(region['region_name'], self.days_to_refresh)
         self.region_country_up(region['id'])
         url = self.domain_ext + 'politics/governor/%s' % region['id']
-        page = self.session.tree(url)
+        states = self.scrape('eco_factors', url)
         for eco_factor in ECO_FACTORS:
-            xpath = '//td[.="%s"]/../td[2]/span/text()' % eco_factor
-            if page.xpath(xpath)[0] != 'в норме':
+            if states[eco_factor] != 'в норме':
                 self.region_money_project(region['id'], eco_factor)
         self.region_money_projects(
                 region['id'], 
@@ -3,7 +3,7 @@ from .const import MAX_TECHNOLOGIES
 
 def set_technologies(self):
     print('UPDATE TECHNOLOGIES')
-    for unit_id, unit in self.units(unit_class_kind=list(MAX_TECHNOLOGIES.keys())).items():
+    for unit_id, unit in self.units.view(unit_class_kind=list(MAX_TECHNOLOGIES.keys())).items():
         if unit['name'][:2] == 'G ':
             continue
         unit = self.unit_summary(unit_id, refresh=True)
@@ -25,7 +25,8 @@ def lab_quality_required(level):
 
 def manage_research(self):
     print('\nRESEARCH')
-    labs = {lab_id: self.unit_summary(lab_id) for lab_id in self.units(unit_class_kind='lab')}
+    labs = self.fetch_many('unit_summary', self.units.view(unit_class_kind='lab'),
+                           raise_errors=True)
     free_labs = []
     current_research = {}
     experimental_units = [unit_id for unit_id, unit in self.units.items() 
@@ -186,22 +187,25 @@ def manage_research(self):
     
     print(len(free_labs0), 'free laboratories')
     
-    for lab_id in free_labs:
-        self.rename_unit(lab_id, '-')
-        self.holiday_set(lab_id)
-    
-    for lab_id in labs:
-        self.set_innovation(lab_id, 'lab_equipment')
+    with self.batch():
+        for lab_id in free_labs:
+            self.rename_unit(lab_id, '-')
+            self.holiday_set(lab_id)
+        
+        for lab_id in labs:
+            self.set_innovation(lab_id, 'lab_equipment')
         
     self.set_technologies()
     
     print('SEND ON HOLIDAY')
-    nonexperimental_units = {unit_id: unit for unit_id, unit in self.units.items()
-                             if unit['name'][0] == '=' 
-                             and unit_id not in experimental_units
-                             and not self.unit_summary(unit_id)['on_holiday']}
-    for unit_id, unit in nonexperimental_units.items():
-        print(unit_id, unit['name'])
-        self.holiday_set(unit_id)
+    candidates = [unit_id for unit_id, unit in self.units.items()
+                  if unit['name'][0] == '=' and unit_id not in experimental_units]
+    summaries = self.fetch_many('unit_summary', candidates, raise_errors=True)
+    nonexperimental_units = {unit_id: self.units[unit_id] for unit_id in candidates
+                             if not summaries[unit_id]['on_holiday']}
+    with self.batch():
+        for unit_id, unit in nonexperimental_units.items():
+            print(unit_id, unit['name'])
+            self.holiday_set(unit_id)
         
     return current_research
\ No newline at end of file
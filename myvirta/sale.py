@@ -1,21 +1,29 @@
 import math
 
+from virtonomics.records import getter
+from virtonomics.types import List
+
 
 def sort_sale_contracts(self, unit_id):
-    products = {}
     contracts = self.sale_contracts(unit_id)
-    sort_key = lambda c: (c['consumer_company_id'] != self.company['id'],
-                          c['country_name'] != 'Украина',
-                          c['party_quantity'])
-    for contract in sorted(contracts, key=sort_key):
-        p = contract['product_id']
-        products[p] = products.get(p, []) + [contract['consumer_id']]
+    get = getter(contracts, 'consumer_company_id', 'country_name', 
+                 'party_quantity')
+    company_id = self.company['id']
+    
+    def sort_key(contract):
+        consumer_company_id, country_name, party_quantity = get(contract)
+        return (consumer_company_id != company_id, country_name != 'Украина',
+                party_quantity)
+    
+    contracts = List(sorted(contracts, key=sort_key))
+    products = {p: [c['consumer_id'] for c in group]
+                for p, group in contracts.group_by('product_id').items()}
     self.reorder_sale_contracts(unit_id, products)
 
 
 def sort_all_sale_contracts(self):
     """Отсортировать контракты по возрастанию заказа"""
-    units = self.units(unit_class_kind='warehouse')
+    units = self.units.view(unit_class_kind='warehouse')
     for unit_id in units:
         sale_contracts = self.sale_contracts(unit_id)
         consumers = set(c['consumer_company_id'] for c in sale_contracts)
@@ -49,6 +57,7 @@ def manage_sale_offers(self, unit_id, delta=0, markup=0.1, target_ratio=10):
     markup_factor = 1 + markup
     sale_offers = self.sale_offers(unit_id)
     sale_contracts = self.sale_contracts(unit_id)
+    sale_contracts.index('product_id')
     
     for product_id, offer in sale_offers.items():
         contracts = sale_contracts(product_id=product_id)
@@ -63,7 +72,7 @@ def manage_sale_offers(self, unit_id, delta=0, markup=0.1, target_ratio=10):
                 # Adjust price
                 r = target_ratio
                 s = offer['stock']
-                t = sum(c['party_quantity'] for c in contracts)  # total order
+                t = contracts.sum('party_quantity')  # total order
                 if t < s:
                     percent = delta * math.sin(
                               0.5*math.pi * (math.log(1 + r*(r-2)*t/s) / math.log(r-1) - 1)
@@ -103,7 +112,7 @@ def manage_sale_offers_all(self, unit_class=None, delta=0, markup=0.1,
             'warehouse',
             'workshop',
             ]
-    units = self.units(unit_class_kind=unit_class)
+    units = self.units.view(unit_class_kind=unit_class)
     for unit_id, unit in units.items():
         print(unit['id'], unit['name'])
         if exception_flag and exception_flag in unit['name']:
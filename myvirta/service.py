@@ -31,7 +31,7 @@ def manage_restaurants(self, days=3):
         'medicine': 1000,
         }
     
-    for unit_id in self.units(unit_class_kind=['restaurant', 'educational', 'repair', 'service_light', 'medicine']):
+    for unit_id in self.units.view(unit_class_kind=['restaurant', 'educational', 'repair', 'service_light', 'medicine']):
         print(unit_id)
         unit = self.unit_summary(unit_id)
         if unit['name'][:1] == '*':
@@ -1,4 +1,6 @@
 import math
+from virtonomics.htmltable import Table, Column
+from virtonomics.types import Dict, startswith, contains
 from .math import sigmoid, log
 
 from .const import (
@@ -26,10 +28,11 @@ def set_shop_advertisement(self, shop_id, target_customers=None, innovation=Fals
 
 
 def set_shops_advertisement(self, target_customers=None):
-    for shop_id, shop in self.units(unit_class_kind='shop').items():
-        if 'Конкурс Олигархов' not in shop['name'] and shop['name'][:2] != '* ':
-            self.set_shop_advertisement(shop_id, target_customers, 
-                                        innovation=shop['name'] in MANAGED_SHOPS_NAMES)
+    shops = self.units.view(unit_class_kind='shop', 
+                            name=~startswith('* ') & ~contains('Конкурс Олигархов'))
+    for shop_id, shop in shops.items():
+        self.set_shop_advertisement(shop_id, target_customers, 
+                                    innovation=shop['name'] in MANAGED_SHOPS_NAMES)
 
 
 def set_shop_innovations(self, shop_id, advertisement=True, parking=False, 
@@ -61,7 +64,7 @@ def set_shop_innovations(self, shop_id, advertisement=True, parking=False,
 
 def set_shops_innovations(self, refresh=False):
     print('SETTING SHOPS INNOVATIONS:')
-    for shop_id, shop in self.units(unit_class_kind='shop').items():
+    for shop_id, shop in self.units.view(unit_class_kind='shop').items():
         self.set_shop_innovations(shop_id, 
                                   advertisement=shop['name'] in MANAGED_SHOPS_NAMES, 
                                   retail=shop['name'] in MANAGED_SHOPS_NAMES, 
@@ -70,7 +73,7 @@ def set_shops_innovations(self, refresh=False):
 
 
 def distribute_shops_employees(self, reserve=100):
-    units = [unit_id for (unit_id, unit) in self.units(unit_class_kind='shop').items()
+    units = [unit_id for (unit_id, unit) in self.units.view(unit_class_kind='shop').items()
              if unit['name'] in MANAGED_SHOPS_NAMES or unit['name'][:1] != '*']
     return self.distribute_shop_employees(units, reserve=reserve)
 
@@ -91,7 +94,7 @@ def set_shop_default_prices(self, shop_id, factor=2):
 
 
 def set_shops_default_prices(self, factor=2):
-    for shop_id in self.units(name=MANAGED_SHOPS_NAMES):
+    for shop_id in self.units.view(name=MANAGED_SHOPS_NAMES):
         self.set_shop_default_prices(shop_id)
 
 
@@ -111,34 +114,44 @@ def propagate_contracts(self, shops=None, reference_shop_id=None):
                 self.create_supply_contract(shop_id, offer_id, max_increase=0)
 
 
+warehouse_table = Table('warehouse.rows', [
+    Column('product_name', 1, str),
+    Column('purchase', 8, 'int'),
+    ])
+
+
 def _get_retail_terget_volumes(self):
     units = {unit_id: unit 
-             for unit_id, unit in self.units(unit_class_kind='warehouse').items()
+             for unit_id, unit in self.units.view(unit_class_kind='warehouse').items()
              if unit['name'][:1] == '!'}
     result = {}
     for unit_id in units:
         url = self.domain_ext + 'unit/view/%s' % unit_id
-        page = self.session.tree(url)
-        xp = '//tr//img[contains(@src, "/img/products/")]/../..'
-        for row in page.xpath(xp):
-            name = str(row.xpath('./td[1]/text()')[0])
-            purchase = int(row.xpath('./td[8]/text()')[0].replace(' ', ''))
-            result[name] = purchase
+        page = self.session.tree(url, region='mainContent')
+        for row in warehouse_table.records(page):
+            result[row['product_name']] = row['purchase']
     return result
 
 
 def manage_shops(self):
-    shops = self.units(name=MANAGED_SHOPS_NAMES)
+    shops = self.units.view(name=MANAGED_SHOPS_NAMES)
     trades = {}
     products = {}
     for shop_id in shops:
         for contract in self.supply_contracts(shop_id).values():
             product_id = contract['product_id']
-            trades[shop_id, product_id] = {}
+            trades[shop_id, product_id] = {'unit_id': shop_id, 'product_id': product_id}
             if product_id not in products:
-                products[product_id] = contract
-                contract['total_market_size'] = 0
-                contract['shipped'] = 0
+                # Копируем нужные поля контракта в обычный словарь: записи
+                # API могут быть компактными (Virta.compact_records), а
+                # чтение их полей по ключу в циклах ниже медленнее
+                products[product_id] = {
+                    'offer_id': contract['offer_id'],
+                    'supplier_id': contract['supplier_id'],
+                    'quantity_at_supplier_storage': contract['quantity_at_supplier_storage'],
+                    'total_market_size': 0,
+                    'shipped': 0,
+                    }
         for product_id, trade in self.trading_hall(shop_id, cache=True).items():
             if (shop_id, product_id) not in trades:
                 # Обрабатываем только поставляемые товары 
@@ -166,26 +179,26 @@ def manage_shops(self):
         else:
             product['quantity_to_distribute'] = quantity
     
+    trades = Dict(trades)
+    product_trades = trades.group_by('product_id')
+    shop_trades = trades.group_by('unit_id')
+    
     # Считаем долю магазинов, в которых сбыли весь товар
     # чем выше данное отношение, тем больше поднимаем цену
-    clearance_count = {product_id: [] for product_id in products}
-    for (_, product_id), trade in trades.items():
-        clearance_count[product_id].append(
-                trade['stock'] == trade['purchase'] and trade['sold'] > 0)
+    cleared = lambda t: t['stock'] == t['purchase'] and t['sold'] > 0
     for product_id, product in products.items():
-        count = clearance_count[product_id]
-        product['clearance_rate'] = sum(count) / max(1, len(count))
+        product['clearance_rate'] = product_trades[product_id].mean(cleared)
     
     # Distribute sales
     print('Distributing sales')
     # Распределяем товары между магазинами
     for product_id, product in products.items():
-        p_trades = {s: t for ((s, p), t) in trades.items() if p == product_id}
+        p_trades = {s: t for ((s, p), t) in product_trades[product_id].items()}
         # Считаем среднюю цену сбыта
-        total_sold = sum(t['sold'] for t in p_trades.values())
+        total_sold = product_trades[product_id].sum('sold')
         if total_sold > 0:
             # средняя цена
-            mean_price = sum(t['price'] * t['sold'] for t in p_trades.values()) / total_sold
+            mean_price = product_trades[product_id].weighted_mean('price', 'sold')
             log_mean_price = math.log(mean_price)
             # стандартное отклоние цены от средней
             std_dev = (sum(t['sold'] * (log(t['price'], log_mean_price) - log_mean_price)**2
@@ -274,7 +287,7 @@ def manage_shops(self):
     # Корректируем магазины
     for shop_id in shops:
         print(shop_id)
-        s_trades = {p: t for ((s, p), t) in trades.items() if s == shop_id}
+        s_trades = {p: t for ((s, p), t) in shop_trades.get(shop_id, {}).items()}
         
         # Снабжение
         orders = {}
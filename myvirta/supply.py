@@ -44,7 +44,7 @@ def manage_supply_orders_all(self, unit_class=None):
     print('\nSUPPLY')
     if not unit_class:
         unit_class = ['animalfarm', 'mill', 'workshop']
-    units = self.units(unit_class_kind=unit_class)
+    units = self.units.view(unit_class_kind=unit_class)
     for unit_id, unit in units.items():
         print(unit['id'], unit['name'])
         self.manage_supply_orders(unit_id)
\ No newline at end of file
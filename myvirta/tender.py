@@ -60,6 +60,7 @@ def manage_science_tenders(self):
         unittype_id = tender['tender_params'][0]
         duration = tender['tender_type']
         print(tender_id, days_left, '[%d]' % duration)
+        self.technology_sellers_many(unittype_id, range(2, 50))
         for level in range(2, 50):
             self.save_technology_sellers_to_db(unittype_id, level, tender_id,
                                                duration - days_left)
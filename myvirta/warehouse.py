@@ -1,5 +1,5 @@
 def resize_warehouses(self):
-    for unit_id in self.units(unit_class_kind='warehouse'):
+    for unit_id in self.units.view(unit_class_kind='warehouse'):
         unit = self.unit_summary(unit_id, refresh=True)
         target_size = int(unit['size'] * unit['filling'] / 90) + 1
         print(unit_id, unit['name'], unit['size'], '->', target_size)
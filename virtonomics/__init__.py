@@ -1,12 +1,5 @@
-import requests
-from lxml import html
-
 from ._attributes import Attributes
-
-# Little extension of Session interface for code conciseness.
-# self.session.tree(url) will return the page tree structure,
-# in which we can locate elements by xpath
-requests.Session.tree = lambda self, url: html.fromstring(self.get(url).content)
+from .asyncvirta import AsyncVirta
 
 
 class Virta(Attributes):
@@ -24,9 +17,36 @@ class Virta(Attributes):
 
     Attributes:
         api (dict): Some API urls provided by the game developers.
+        api_cache (dict): Disk cache policies for reference API data. Maps
+            API url names to either max age in seconds, or the name of the
+            attribute, which the data stays valid until changes (e.g. 
+            'days_to_refresh').
+        cache_dir (str): Disk cache directory, relative to path. Reference
+            data (cities, products, etc.) is stored there and revalidated
+            by conditional requests. Defaults to 'cache'. If None, the disk
+            cache is disabled.
         cities (Dict): List of cities.
+        columnar (tuple): Names of the attributes to store as columnar.Table
+            instead of Dict: 'cities', 'regions', 'countries', 'products',
+            'goods', 'unittypes' and 'units'. Tables take a fraction of the
+            memory and aggregate fields with NumPy, but their records are
+            read-only copies. Requires numpy. Defaults to ().
         company (dict): Basic company information.
+        compact_records (bool): If True, records of the reference tables 
+            (cities, products, etc.), units, offers and contracts are 
+            records.Record objects with __slots__ instead of dicts: they 
+            take about a third of the memory and their fields can also be 
+            read as attributes (unit.size), as fast as dict items. Reading
+            them by key (unit['size']) is a few times slower than on a 
+            dict. Records are mappings but not dict instances: 
+            isinstance(unit, dict) is False and json.dumps(unit) raises
+            TypeError (convert with dict(unit)). Defaults to False.
         company_finance (dict): Company finance report.
+        concurrency (int): Initial number of requests in flight per 
+            endpoint family (urls differing only in ids). The limit grows
+            while the response time stays flat, and is halved on errors
+            and timeouts, up to pool_size. If None, only rate_limit 
+            applies. Defaults to 4.
         conn (sqlite3.Connection): Database connection.
         countries (Dict): List of countries.
         days_to_refresh (int): Number of real days (virtual weeks) left until 
@@ -45,17 +65,62 @@ class Virta(Attributes):
             list of investigated levels.
         knowledge (dict): Top manager qualification.
         knowledge_areas (Dict): Knowledge areas.
+        lazy_records (bool): If True, records of paginated API data (units,
+            offers, contracts) and reference tables (cities, products, 
+            etc.) are decoded as jsondecoder.LazyRecord: numeral strings
+            are converted when a field is read, which saves decoding time
+            when only a few fields are used. Defaults to False.
+        max_workers (int): Default number of threads used to run parallel
+            requests (see fetch_many). The number of requests actually in 
+            flight is set by the adaptive concurrency limits. Defaults to 
+            32.
         oligarch_competition_days_left (int): Days left to the and on oligarch
             competition.
+        pagesize (int): Number of records requested at once from paginated
+            API urls (units, offers, contracts). Pages are requested in 
+            parallel. Defaults to 1000.
+        parse_cache (scrapers.ParseCache): Results of the scrapers indexed
+            by the hash of the parsed pages (see scrape, scrape_many). None
+            if parse_cache_size is 0.
+        parse_cache_dir (str): Directory (relative to path) to persist 
+            parse_cache. The results stored there are unpickled: the 
+            directory is created accessible to the owner only (mode 0700),
+            and must not be writable by anyone else, who could otherwise
+            run code in the bot process. Defaults to None (memory only).
+        parse_cache_size (int): Maximal size of parse_cache in memory, in
+            bytes (pickled results). Defaults to 32 MB.
+        parse_pool (scrapers.ParsePool): Worker processes parsing the pages
+            fetched by scrape_many. Starts on the first use.
+        parse_workers (int): Number of parse_pool processes. Defaults to
+            None (the number of CPUs). If 0, pages are parsed in the 
+            fetching threads.
         password (str): User password.
         path (str): Framework directory path.
+        pool_size (int): Maximal number of connections kept alive in the
+            session connection pool. Defaults to 32.
         product_categories (dict): List of product categories.
         products (Dict): List of products.
         qualification (dict): Top manager qualification.
+        rate_burst (int): Number of requests that can be sent at once, 
+            before rate_limit applies. Defaults to 20.
+        rate_limit (float): Maximal sustained number of requests per second.
+            Defaults to 10.
+        record (str): Archive file name. If passed, all the requests and 
+            responses are recorded to be replayed later by a local 
+            stand-in server (see virtonomics.replay). Defaults to None.
         regions (Dict): List of regions.
+        retries (int): Number of repetitions of a request if the server 
+            responds with 429 or 5xx error. Defaults to 3.
         server (str): Server name.
         server_date (datetime.date): Current virtual server date.
-        session (requests.Session): Requests session. Opens automatically.
+        session (transport.Session): Requests session. Opens automatically.
+            session.tree(url) returns the page tree structure, in which 
+            elements can be located by xpath. session.tree(url, 
+            region='mainContent') parses only the element with the given id.
+        session_file (str): File name (relative to path) to save session
+            cookies and token to, so that next runs do not need to login.
+            May contain {server} and {user} fields. Defaults to 
+            'session-{server}-{user}.json'. If None, session is not saved.
         state_kinds (tuple): State enterprises kinds.
         tenders (Dict): List of tenders. (not currently supported)
         unittypes (Dict): List of unit types.
@@ -69,13 +134,35 @@ class Virta(Attributes):
         any fields. For example,
         v.units(unit_class_kind='farm', country_name=['Куба', 'Дания']) 
         will return all the farms located in the two specified countries.
+        Attributes listed in columnar are columnar.Table and can be filtered
+        the same way.
     """
     
-    from ._const import domain, user, password, path, db_name, api, state_kinds, today
+    from ._const import (
+        domain, user, password, path, db_name, pool_size, max_workers, 
+        pagesize, lazy_records, columnar, compact_records, concurrency, 
+        rate_limit, rate_burst, retries, cache_dir, parse_workers, parse_cache_size, parse_cache_dir, 
+        record, session_file, api, api_cache, state_kinds, today
+        )
     from ._init import __init__
     from ._del import __del__, quit
     #from ._attributes import __getattr__
-    from ._session import open_session  # 
+    from ._session import (
+        open_session,  # 
+        session_filename,
+        save_session,  # 
+        restore_session,  # 
+        cache_policy,  # 
+        )
+    from ._fetch import (
+        fetch_many,  # 
+        fetch_pages,  # 
+        iter_pages,  # 
+        scrape,  # 
+        scrape_many,  # 
+        )
+    from ._batch import batch  # 
+    from ._stats import stats  # 
     from ._database import (
         open_database,  # 
         initialize_database,  # 
@@ -97,8 +184,10 @@ class Virta(Attributes):
         retail_metrics,  # 
         retail_history,
         offers,  # 
+        iter_offers,  # 
         )
     from ._unit import (
+        iter_units,  # 
         unit_summary,  # 
         refresh,  # 
         rename_unit,  # 
@@ -169,6 +258,7 @@ class Virta(Attributes):
         destroy_technology_offers,  # 
         technology_offers,  # 
         technology_sellers_all,  # 
+        technology_sellers_many,  # 
         technology_sellers_med,  # 
         )
     from ._research import (
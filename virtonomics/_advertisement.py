@@ -1,5 +1,5 @@
 import math
-from .jsondecoder import Decoder
+from .jsondecoder import loads
 
 
 def set_advertisement(self, unit_id, *, cost=None, ratio=None, 
@@ -99,7 +99,7 @@ def set_advertisement(self, unit_id, *, cost=None, ratio=None,
                                 self.domain, self.server, unit_id)
             for platform in range(1,6):
                 data = {'type[]': 2265 - platform}
-                estimate = self.session.post(estimator_url, data=data).json(cls=Decoder)
+                estimate = loads(self.session.post(estimator_url, data=data).content)
                 cost = ratio * estimate['contactCost'] * city['population']
                 if cost >= estimate['minCost']:
                     break
@@ -116,7 +116,7 @@ def set_advertisement(self, unit_id, *, cost=None, ratio=None,
         'advertData[totalCost]': cost,
         'accept': 1
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def stop_advertisement(self, unit_id):
@@ -124,7 +124,7 @@ def stop_advertisement(self, unit_id):
     
     url = self.domain_ext + 'unit/view/%s/virtasement' % unit_id
     data = {'cancel': 1}
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 '''
 def set_product_advertisement(self, product_id, region_name, cities=None,
@@ -132,7 +132,7 @@ def set_product_advertisement(self, product_id, region_name, cities=None,
     region_id = self.regions.select(region_name=region_name)['id']
     unit_id = self.units.select(unit_class_kind='office', region_name=region_name)['id']
     if not cities:
-        cities = list(self.cities(region_name=region_name))
+        cities = list(self.cities.view(region_name=region_name))
     url = self.domain + f'ajax/unit/virtasement/{unit_id}/product_brand/{product_id}/181774'
     data = {
         'region': region_id,
@@ -1,12 +1,69 @@
+import os
+
 from .types import Dict
-from .jsondecoder import Decoder
+from .jsondecoder import loads
+from .records import compact
 from ._date import str_to_date
+from .scrapers import ParseCache, ParsePool
+from .xpath import xpaths
+
+
+# Record entities of the attributes (see compact_records)
+entities = {
+    'cities': 'city',
+    'regions': 'region',
+    'countries': 'country',
+    'products': 'product',
+    'goods': 'good',
+    'unittypes': 'unittype',
+    'units': 'unit',
+    }
+
+
+def records_table(self, attrname, records):
+    """Dict of records of an attribute, or columnar.Table if the attribute
+    is listed in self.columnar. Reference tables (all but units) are not
+    changed in place: their fields are indexed on the first filter."""
+    
+    if attrname in self.columnar:
+        from .columnar import Table  # requires numpy
+        return Table.from_dict(records)
+    if self.compact_records:
+        records = compact(records, entities[attrname])
+    table = Dict(records)
+    if attrname != 'units':
+        table.auto_index()
+    return table
+
 
 class Attributes:
+    # Attributes loaded on the first access by __getattr__
+    lazy_attributes = frozenset([
+        'session', 'parse_cache', 'parse_pool', 'db', 'conn', 'server_date',
+        'days_to_refresh', 'oligarch_competition_days_left', 'shagreen_id', 
+        'token', 'cities', 'regions', 'countries', 'product_categories', 
+        'products', 'goods', 'industries', 'unittypes', 'company', 
+        'company_finance', 'units', 'indicators', 'investigated_technologies',
+        'elections', 'qualification', 'knowledge', 'knowledge_areas',
+        ])
+    
     def __getattr__(self, attrname):
         if attrname == 'session':
             return self.open_session()
             
+        elif attrname == 'parse_cache':
+            self.parse_cache = None
+            if self.parse_cache_size:
+                directory = None
+                if self.parse_cache_dir:
+                    directory = os.path.join(self.path, self.parse_cache_dir)
+                self.parse_cache = ParseCache(self.parse_cache_size, directory)
+            return self.parse_cache
+        
+        elif attrname == 'parse_pool':
+            self.parse_pool = ParsePool(self.parse_workers)
+            return self.parse_pool
+        
         elif attrname == 'db' or attrname == 'conn':
             self.open_database()
             return getattr(self, attrname)
@@ -26,19 +83,27 @@ class Attributes:
         elif attrname in ['token', 'cities', 'regions', 'countries', 'product_categories', 
                           'products', 'goods', 'industries', 'unittypes', 'company', 
                           'company_finance']:
+            if 'session' not in self.__dict__:
+                # Restored session sets token and company
+                self.open_session()
+                if attrname in self.__dict__:
+                    return self.__dict__[attrname]
             data = {}
             if '{company_id}' in self.api[attrname]:
                 data['company_id'] = self.company['id']
             url = self.api[attrname].format(**data)
-            setattr(self, attrname, self.session.get(url).json(cls=Decoder))
+            response = self.session.get(url, cache=self.cache_policy(attrname))
+            setattr(self, attrname, loads(response.content, lazy=self.lazy_records))
             if attrname in ['cities', 'regions', 'countries', 'products', 'unittypes', 'goods']:
-                setattr(self, attrname, Dict(getattr(self, attrname)))
+                setattr(self, attrname, records_table(self, attrname, getattr(self, attrname)))
+            if attrname == 'token':
+                self.save_session()
             return getattr(self, attrname)
         
         elif attrname in ['units', 'indicators']:
             url = self.api['units'].format(company_id=self.company['id'])
-            result = self.session.get(url).json(cls=Decoder)
-            self.units = Dict(result.get('data', {}))
+            result = self.fetch_pages(url)
+            self.units = records_table(self, 'units', result.get('data', {}))
             self.indicators = result.get('indicators', {})
             return getattr(self, attrname)
         
@@ -52,15 +117,14 @@ class Attributes:
         elif attrname == 'elections':
             url = self.domain_ext + 'politics/news'
             page = self.session.tree(url)
-            xp = '//td[contains(.," г.")]/../td/a[contains(@href,"politics/elections")]/../..'
-            rows = page.xpath(xp)
+            rows = xpaths['elections.rows'](page)
             self.elections = Dict()
             for row in rows:
                 res = {}
-                election_id = int(row.xpath('./td[2]/a/@href')[0].split('/')[-1])
+                election_id = int(xpaths['elections.href'](row)[0].split('/')[-1])
                 res['election_id'] = election_id
-                res['location_name'] = str(row.xpath('./td[2]/a/text()')[0])
-                election_date = str_to_date(row.xpath('./td[3]/text()')[0])
+                res['location_name'] = xpaths['elections.location_name'](row)[0]
+                election_date = str_to_date(xpaths['elections.date'](row)[0])
                 res['days_to_election'] = (election_date - self.today).days - 1
                 self.elections[election_id] = res
             return self.elections
@@ -68,19 +132,19 @@ class Attributes:
         elif attrname in ['qualification', 'knowledge']:
             url = self.domain_ext + 'user/view/%s' % self.company['president_user_id']
             page = self.session.tree(url)
-            xp = '//tr/td[1]/img[contains(@src, "/qualification/")]/../..'
-            rows = page.xpath(xp)
+            rows = xpaths['qualification.rows'](page)
             res = {}
             for row in rows:
-                name = row.xpath('./td[1]/img/@src')[0].split('/')[-1].split('.')[0]
-                qual = int(row.xpath('./td[last()]/b/text()')[0])
+                name = xpaths['qualification.name'](row)[0].split('/')[-1].split('.')[0]
+                qual = int(xpaths['qualification.value'](row)[0])
                 res[name] = qual
             setattr(self, attrname, res)
             return getattr(self, attrname)
         
         elif attrname == 'knowledge_areas':
             url = self.api['knowledge']
-            result = self.session.get(url).json(cls=Decoder)
+            response = self.session.get(url, cache=self.cache_policy('knowledge'))
+            result = loads(response.content)
             self.knowledge_areas = Dict(result)
             return self.knowledge_areas
             
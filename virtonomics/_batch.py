@@ -0,0 +1,137 @@
+import contextlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MutationQueue:
+    """Deferred requests changing the game state (thread safe).
+    
+    Requests are grouped by unit and kept in order within each group. A 
+    request of kind 'set' replaces the queued request with the same method,
+    url and form fields and takes its place at the end of the group (last
+    write wins). Requests of kind 'action' are never merged. The sent 
+    callback of a request (see Session.get) is called with its response
+    when the request is sent.
+    
+    Attributes:
+        responses (list): Responses received by the last flush.
+    """
+    
+    unit_xp = re.compile(r'/unit/\D*?(\d+)')
+    
+    def __init__(self):
+        self.groups = {}
+        self.responses = []
+        self.lock = threading.Lock()
+        self.counter = 0
+    
+    @classmethod
+    def unit_of(cls, url, data):
+        """Unit id a request refers to, or None."""
+        
+        match = cls.unit_xp.search(url)
+        if match:
+            return int(match.group(1))
+        if '/unit/' in url and isinstance(data, dict):
+            unit_id = data.get('unit', data.get('id'))
+            if unit_id is not None:
+                return int(unit_id)
+        return None
+    
+    def put(self, kind, method, url, sent=None, **kwargs):
+        data = kwargs.get('data')
+        with self.lock:
+            if kind == 'set':
+                key = method, url, tuple(sorted(data)) if data else ()
+            else:
+                self.counter += 1
+                key = self.counter
+            group = self.groups.setdefault(self.unit_of(url, data), {})
+            group.pop(key, None)
+            group[key] = method, url, kwargs, sent
+    
+    def __len__(self):
+        return sum(len(group) for group in self.groups.values())
+    
+    def flush(self, session, max_workers):
+        """Send the queued requests.
+        
+        Groups are processed in parallel, requests within a group one by 
+        one. If any request fails, the first error is reraised once all 
+        the groups are processed.
+        """
+        
+        with self.lock:
+            groups = list(self.groups.values())
+            self.groups = {}
+        
+        def send(group):
+            responses = []
+            try:
+                for method, url, kwargs, sent in group.values():
+                    response = session.request(method, url, **kwargs)
+                    if sent is not None:
+                        sent(response)
+                    responses.append(response)
+            except Exception as error:
+                return error
+            return responses
+        
+        with ThreadPoolExecutor(max_workers) as executor:
+            results = list(executor.map(send, groups))
+        self.responses = [r for result in results if isinstance(result, list)
+                          for r in result]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return self.responses
+
+
+@contextlib.contextmanager
+def batch(self, max_workers=None):
+    """Defer requests changing the game state until the end of the block.
+    
+    Inside the block, methods that change the game state (set_supply_contracts,
+    set_sale_offers, rename_unit, set_employees, set_innovation, refresh,
+    etc.) queue their requests and return None. Repeated writes to the same
+    unit field are merged, the last one wins. On exit the queue is flushed:
+    requests for different units are sent in parallel, requests for the 
+    same unit are sent in order. If the block raises an exception, nothing
+    is sent: the queued requests stay in the yielded queue, which can be
+    flushed explicitly (queue.flush(v.session, max_workers)).
+    
+    Note:
+        Read methods are not affected and may return data that does not yet
+        reflect the queued changes. Code that uses the responses of state
+        changing methods should not run inside the block.
+        
+        Only the requests of the thread that opened the block are queued.
+        Requests of other threads (AsyncVirta executors, fetch_many 
+        workers) are sent immediately.
+    
+    Arguments:
+        max_workers (int): Number of threads to flush the queue. Defaults to
+            self.max_workers.
+    
+    Yields:
+        MutationQueue.
+    
+    Example:
+        with v.batch():
+            for lab_id in labs:
+                v.rename_unit(lab_id, '-')
+                v.holiday_set(lab_id)
+    """
+    
+    session = self.session
+    if session.mutations is not None:
+        # Nested block, flushed by the outer one
+        yield session.mutations
+        return
+    queue = session.mutations = MutationQueue()
+    try:
+        yield queue
+    finally:
+        session.mutations = None
+    queue.flush(session, max_workers or self.max_workers)
@@ -5,6 +5,22 @@ user = os.environ.get('VIRTA_USER')
 password = os.environ.get('VIRTA_PASSWORD')
 path = os.environ.get('VIRTA_DIR', os.getcwd())
 db_name = 'v.db'
+pool_size = 32  # max connections kept alive in the session pool
+max_workers = 32  # default number of threads for parallel requests
+concurrency = 4  # initial requests in flight per endpoint family
+pagesize = 1000  # records per page for paginated API urls
+lazy_records = False  # convert paginated and reference records on access
+columnar = ()  # attributes stored as columnar.Table (requires numpy)
+compact_records = False  # decode API records as records.Record (__slots__)
+rate_limit = 10  # sustained requests per second
+rate_burst = 20  # requests that can be sent at once
+retries = 3  # repetitions on 429 and 5xx responses
+cache_dir = 'cache'  # disk cache directory (relative to path), None to disable
+parse_workers = None  # parsing processes (None: number of CPUs, 0: no processes)
+parse_cache_size = 32 * 2**20  # bytes of parsed pages kept in memory, 0 to disable
+parse_cache_dir = None  # directory (relative to path) to persist parsed pages
+record = None  # archive file name to record the traffic to (see replay)
+session_file = 'session-{server}-{user}.json'  # None to login every run
 state_kinds = ('farm', 'fishingbase', 'mine', 'orchard', 'sawmill', 'villa')
 today = (datetime.datetime.today() - datetime.timedelta(hours=1)).date()
 api = {
@@ -25,7 +41,7 @@ api = {
     'knowledge': 
         'knowledge/browse',
     'offers': 
-        'marketing/report/trade/offers?product_id={product_id}&pagesize=1000000',
+        'marketing/report/trade/offers?product_id={product_id}',
     'produce': 
         'unittype/produce?id={unittype_id}',
     'product_categories': 
@@ -41,9 +57,9 @@ api = {
     'retail_history':
         'marketing/report/retail/history?product_id={product_id}&geo={geo}',
     'sale_contracts': 
-        'unit/sale/contracts?id={unit_id}{product_filter}&pagesize=1000000',
+        'unit/sale/contracts?id={unit_id}{product_filter}',
     'supply_contracts': 
-        'unit/supply/contracts?id={unit_id}{product_filter}&pagesize=1000000',
+        'unit/supply/contracts?id={unit_id}{product_filter}',
     'technologies': 
         'unittype/technologies',
     'tender':
@@ -55,7 +71,20 @@ api = {
     'unit_summary': 
         'unit/summary?id={unit_id}',
     'units': 
-        'company/units?id={company_id}&unit_class_id=all&pagesize=1000000',
+        'company/units?id={company_id}&unit_class_id=all',
     'unittypes': 
         'unittype/browse',
+    }
+# Disk cache policy for reference data: either max age in seconds, or the
+# name of the attribute whose change invalidates the data
+api_cache = {
+    'cities': 'days_to_refresh',
+    'countries': 'days_to_refresh',
+    'goods': 7 * 86400,
+    'industries': 7 * 86400,
+    'knowledge': 7 * 86400,
+    'produce': 7 * 86400,
+    'products': 7 * 86400,
+    'regions': 'days_to_refresh',
+    'unittypes': 7 * 86400,
     }
\ No newline at end of file
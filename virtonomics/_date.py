@@ -1,5 +1,8 @@
 import datetime
 
+from .xpath import xpaths
+
+
 def str_to_date(date_str):
     months = {
         'января': 1,
@@ -30,8 +33,7 @@ def date_to_str(date):
 
 def get_server_date(self):
     url = self.domain_ext + 'company/rank/%s/info' % self.company['id']
-    xp = '//div[@title="Время на сервере"]/text()'
-    date_str = self.session.tree(url).xpath(xp)[0].strip()
+    date_str = xpaths['server_date'](self.session.tree(url))[0].strip()
     self.server_date = str_to_date(date_str)
     return self.server_date
 
@@ -48,15 +50,13 @@ def get_days_to_refresh(self):
 def get_oligarch_competition_days_left(self):
     url = self.domain_ext + 'olla'
     page = self.session.tree(url)
-    xp = '//a[contains(.,"Шагрень")]/@href'
-    url = page.xpath(xp)
+    url = xpaths['shagreen.href'](page)
     if url:
         url = url[0]
     else:
         return None
     page = self.session.tree(url)
-    xp = '//h3[contains(.,"Осталось пересчётов:")]/text()'
-    days = page.xpath(xp)
+    days = xpaths['shagreen.days_left'](page)
     self.oligarch_competition_days_left = int(days[0].split(': ')[1]) if days else None
     return self.oligarch_competition_days_left
 
@@ -64,8 +64,7 @@ def get_oligarch_competition_days_left(self):
 def get_shagreen_id(self):
     url = self.domain_ext + 'olla'
     page = self.session.tree(url)
-    xp = '//a[contains(.,"Шагрень")]/@href'
-    url = page.xpath(xp)
+    url = xpaths['shagreen.href'](page)
     if url:
         self.shagreen_id = int(url[0].split('/')[-1])
     else:
@@ -13,5 +13,7 @@ def quit(self):
         self.driver.quit()
     if 'session' in self.__dict__:
         self.session.close()
+    if 'parse_pool' in self.__dict__:
+        self.parse_pool.shutdown()
     if 'conn' in self.__dict__:
         self.conn.close()
\ No newline at end of file
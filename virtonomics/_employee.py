@@ -32,7 +32,7 @@ def set_employees(self, unit_id, quantity=0, salary=0, salary_max=0,
         'target_level': target_level,
         'trigger': trigger
         }
-    result = self.session.post(url, data=data)
+    result = self.session.post(url, data=data, mutation='set')
     self.refresh(unit_id)
     return result
     
@@ -48,7 +48,7 @@ def holiday_set(self, unit_id):
     """
     
     url = self.domain_ext + 'unit/view/%s/holiday_set' % unit_id
-    result = self.session.post(url)
+    result = self.session.post(url, mutation='set')
     self.refresh(unit_id)
     return result
 
@@ -64,7 +64,7 @@ def holiday_unset(self, unit_id):
     """
     
     url = self.domain_ext + 'unit/view/%s/holiday_unset' % unit_id
-    result = self.session.post(url)
+    result = self.session.post(url, mutation='set')
     self.refresh(unit_id)
     return result
 
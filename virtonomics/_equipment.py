@@ -22,7 +22,7 @@ def supply_equipment(self, unit_id, offer_id, amount, operation):
         'supplier': offer_id,
         'amount': amount
         }
-    result = self.session.post(url, data=data)
+    result = self.session.post(url, data=data, mutation='action')
     self.refresh(unit_id)
     return result
 
@@ -74,7 +74,7 @@ def destroy_equipment(self, unit_id, amount):
         'unit': unit_id,
         'amount': amount
         }
-    result = self.session.post(url, data=data)
+    result = self.session.post(url, data=data, mutation='action')
     self.refresh(unit_id)
     return result
 
@@ -102,7 +102,7 @@ def supply_equipment_all(self, offer_id, units, operation):
     data = {'units[%s]'%unit_id: 1 for unit_id in units}
     data['supplyData[offer]'] = offer_id
     data['submitRepair'] = 1
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='action')
 
 
 def buy_equipment_all(self, offer_id, units):
@@ -34,4 +34,4 @@ def farm_season(self, unit_id, seasons):
     culture = seasons[month]
     spec_id = agricultural_specializations[culture]
     data = {'unitProduceData[produce]': spec_id}
-    return self.session.post(url, data=data)
\ No newline at end of file
+    return self.session.post(url, data=data, mutation='set')
\ No newline at end of file
@@ -0,0 +1,285 @@
+import math
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .jsondecoder import iter_items, loads
+from .scrapers import scrapers
+from .transport import charset
+
+
+def fetch_many(self, method, ids, *args, max_workers=None, raise_errors=False,
+               **kwargs):
+    """Call a read-only method for a number of ids in parallel.
+    
+    Calls run in a thread pool over the shared session. Only methods that
+    do not change the game state should be passed (unit_summary, 
+    supply_contracts, sale_contracts, supply_products, service_history, 
+    trading_hall, etc.).
+    
+    Arguments:
+        method (str or callable): Method name or bound method. Called as
+            method(id, *args, **kwargs) for every id.
+        ids (iterable): Ids to pass to the method (units ids, products 
+            ids, etc.).
+        max_workers (int): Number of threads. Defaults to self.max_workers.
+        raise_errors (bool): If True, the first (in ids order) exception
+            raised by the method is reraised once all the calls complete.
+            Defaults to False.
+        args, kwargs: Extra arguments passed to the method.
+    
+    Returns:
+        dict: Method results indexed by ids, in the order of ids. If a call
+            fails, the corresponding value is the exception raised.
+    
+    Example:
+        labs = v.fetch_many('unit_summary', v.units(unit_class_kind='lab'))
+    """
+    
+    if isinstance(method, str):
+        method = getattr(self, method)
+    ids = list(ids)
+    self.session  # login before going parallel
+    
+    def call(obj_id):
+        try:
+            return method(obj_id, *args, **kwargs)
+        except Exception as error:
+            return error
+    
+    with ThreadPoolExecutor(max_workers or self.max_workers) as executor:
+        result = dict(zip(ids, executor.map(call, ids)))
+    if raise_errors:
+        for value in result.values():
+            if isinstance(value, Exception):
+                raise value
+    return result
+
+
+def fetch_pages(self, url, pagesize=None, max_workers=None):
+    """Fetch paginated API data, requesting pages in parallel.
+    
+    The first page is requested alone. If it is full, the remaining pages 
+    are requested in parallel: all at once if the response reports the
+    total number of records. Otherwise they are requested in waves of 
+    doubling size (1, 2, 4... pages, up to max_workers) until a page comes
+    back incomplete.
+    
+    Arguments:
+        url (str): API url (with query string) without paging parameters.
+        pagesize (int): Records per page. Defaults to self.pagesize.
+        max_workers (int): Number of threads. Defaults to self.max_workers.
+    
+    Returns:
+        Decoded response of the first page, with the records (the 'data'
+        field, or the whole response if there is no such field) and the
+        side tables (like 'indicators') of all the pages merged in.
+    """
+    
+    pagesize = pagesize or self.pagesize
+    max_workers = max_workers or self.max_workers
+    
+    def get_page(pagenum):
+        page_url = '%s&pagesize=%d&pagenum=%d' % (url, pagesize, pagenum)
+        return loads(self.session.get(page_url).content, lazy=self.lazy_records)
+    
+    def records(page):
+        if isinstance(page, dict) and 'data' in page:
+            return page['data']
+        return page
+    
+    def merge(response):
+        """Add the page to the result. Return False if there is nothing new."""
+        page = records(response)
+        if not page:
+            return False
+        if isinstance(data, dict):
+            if page.keys() <= data.keys():
+                return False  # paging parameters are ignored
+            data.update(page)
+        else:
+            if page == data[:len(page)]:
+                return False
+            data.extend(page)
+        if page is not response:
+            # Per record side tables, like units indicators
+            for key, value in response.items():
+                if isinstance(value, dict) and isinstance(result.get(key), dict):
+                    if key != 'info':
+                        result[key].update(value)
+        return True
+    
+    result = get_page(0)
+    data = records(result)
+    if len(data) < pagesize:
+        return result
+    
+    info = result.get('info') if isinstance(result, dict) else None
+    count = info.get('count') if isinstance(info, dict) else None
+    if isinstance(count, int):
+        pages = self.fetch_many(get_page, range(1, math.ceil(count/pagesize)), 
+                                max_workers=max_workers, raise_errors=True)
+        for page in pages.values():
+            merge(page)
+        return result
+    
+    # Unknown number of pages: waves of 1, 2, 4... pages, up to max_workers,
+    # so that short lists do not request many empty pages
+    pagenum = 1
+    wave = 1
+    while True:
+        pages = self.fetch_many(get_page, range(pagenum, pagenum+wave), 
+                                max_workers=max_workers, raise_errors=True)
+        for page in pages.values():
+            if not merge(page) or len(records(page)) < pagesize:
+                return result
+        pagenum += wave
+        wave = min(2 * wave, max_workers)
+
+
+def iter_pages(self, url, pagesize=None, chunk_size=65536):
+    """Stream paginated API records.
+    
+    Pages are requested one after another, each response body is read from
+    the socket in chunks and decoded incrementally (see 
+    jsondecoder.iter_items), so the records can be processed while they are
+    downloaded and only one record at a time is kept in memory. Streamed
+    requests are not coalesced with requests in flight nor cached.
+    
+    Arguments:
+        url (str): API url (with query string) without paging parameters.
+        pagesize (int): Records per page. Defaults to self.pagesize.
+        chunk_size (int): Bytes read from the socket at once. Defaults to
+            65536.
+    
+    Yields:
+        tuple: (key, record) pairs of the 'data' field of the pages (or of 
+            the whole responses if there is no such field).
+    """
+    
+    pagesize = pagesize or self.pagesize
+    first_key = None
+    pagenum = 0
+    while True:
+        page_url = '%s&pagesize=%d&pagenum=%d' % (url, pagesize, pagenum)
+        count = 0
+        with self.session.get(page_url, stream=True) as response:
+            chunks = response.iter_content(chunk_size)
+            for key, record in iter_items(chunks, lazy=self.lazy_records):
+                if count == 0:
+                    if pagenum == 0:
+                        first_key = key
+                    elif key == first_key:
+                        return  # paging parameters are ignored
+                count += 1
+                yield key, record
+        if count < pagesize:
+            return
+        pagenum += 1
+
+
+def scrape(self, name, url, **kwargs):
+    """Fetch a page and extract data with a registered scraper.
+    
+    The page is parsed in the calling thread (see scrape_many to parse 
+    crawled pages in worker processes), unless the same content has already
+    been parsed by the scraper (see parse_cache).
+    
+    Arguments:
+        name (str): Scraper name (see virtonomics.scrapers).
+        url (str): Page url.
+        kwargs: Passed to the scraper function.
+    
+    Returns:
+        Extracted data.
+    """
+    
+    scraper = scrapers[name]
+    response = self.session.get(url)
+    encoding = charset(response) if scraper.region else None
+    cache = self.parse_cache
+    if cache is not None:
+        key = cache.key(scraper, response.content, encoding, **kwargs)
+        hit, result = cache.get(key)
+        if hit:
+            return result
+    result, found = scraper(response.content, encoding, **kwargs)
+    if not found:
+        self.session.count('region_misses')
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def scrape_many(self, name, urls, max_workers=None, raise_errors=False, 
+                **kwargs):
+    """Fetch pages in parallel and extract data in worker processes.
+    
+    Pages are fetched in a thread pool (see fetch_many). Every response 
+    body is passed to the parse pool (see parse_workers) as soon as it 
+    arrives, so parsing runs on all the cores while the next pages are 
+    fetched. Pages already parsed with the same content are served from
+    parse_cache.
+    
+    Arguments:
+        name (str): Scraper name (see virtonomics.scrapers).
+        urls (iterable or dict): Page urls, or dict mapping any keys to
+            page urls.
+        max_workers (int): Number of fetching threads. Defaults to 
+            self.max_workers.
+        raise_errors (bool): If True, the first (in urls order) exception
+            raised by a fetch or a scraper is reraised once all the pages 
+            are processed. Defaults to False.
+        kwargs: Passed to the scraper function.
+    
+    Returns:
+        dict: Extracted data indexed by urls (or by the urls dict keys), in
+            the same order. If a page fails, the corresponding value is the
+            exception raised.
+    
+    Example:
+        sellers = v.scrape_many('technology_sellers', {level: url % level 
+                                for level in range(2, 50)})
+    """
+    
+    scraper = scrapers[name]
+    if not isinstance(urls, dict):
+        urls = {url: url for url in urls}
+    cache = self.parse_cache
+    self.session  # login before going parallel
+    self.parse_pool.start()
+    
+    def fetch(key):
+        response = self.session.get(urls[key])
+        encoding = charset(response) if scraper.region else None
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key(scraper, response.content, encoding, **kwargs)
+            hit, result = cache.get(cache_key)
+            if hit:
+                future = Future()
+                future.set_result((result, True))
+                return future, None
+        future = self.parse_pool.submit(scraper, response.content, encoding, 
+                                        **kwargs)
+        return future, cache_key
+    
+    calls = self.fetch_many(fetch, urls, max_workers=max_workers)
+    result = {}
+    for key, call in calls.items():
+        if isinstance(call, Exception):
+            result[key] = call
+            continue
+        future, cache_key = call
+        try:
+            result[key], found = future.result()
+        except Exception as error:
+            result[key] = error
+            continue
+        if not found:
+            self.session.count('region_misses')
+        if cache_key is not None:
+            cache.put(cache_key, result[key])
+    if raise_errors:
+        for value in result.values():
+            if isinstance(value, Exception):
+                raise value
+    return result
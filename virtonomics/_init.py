@@ -4,5 +4,4 @@ def __init__(self, server, **kwargs):
     self.server = server
     self.domain_ext = self.domain + '/' + self.server + '/main/'
     api_url_prefix = '%s/api/%s/main/' % (self.domain, self.server)
-    for key in self.api:
-        self.api[key] = api_url_prefix + self.api[key]
\ No newline at end of file
+    self.api = {key: api_url_prefix + url for key, url in self.api.items()}
\ No newline at end of file
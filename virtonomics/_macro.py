@@ -1,15 +1,16 @@
-from .jsondecoder import Decoder
+from .jsondecoder import loads
 from .types import List, Dict
+from .records import compact, compact_record
 
 
 def produce(self, unittype_id):
     """Production information for a given unit type."""
     
-    if not hasattr(self, '__produce'):
-        self.__produce = {}
+    self.__dict__.setdefault('__produce', {})
     if unittype_id not in self.__produce:
         url = self.api['produce'].format(unittype_id=unittype_id)
-        self.__produce[unittype_id] = self.session.get(url).json(cls=Decoder)
+        response = self.session.get(url, cache=self.cache_policy('produce'))
+        self.__produce[unittype_id] = loads(response.content)
     return self.__produce[unittype_id]
 
 
@@ -20,20 +21,53 @@ def city_rent(self, city_id):
         List.
     """
     
-    if not hasattr(self, '__city_rent'):
-        self.__city_rent = {}
+    self.__dict__.setdefault('__city_rent', {})
     if city_id not in self.__city_rent:
         url = self.api['city_rent'].format(city_id=city_id)
-        self.__city_rent[city_id] = List(self.session.get(url).json(cls=Decoder))
+        self.__city_rent[city_id] = List(loads(self.session.get(url).content))
     return self.__city_rent[city_id]
 
 
-def offers(self, product_id):
-    """Open market offers"""
+def offers(self, product_id, pagesize=None):
+    """Open market offers.
+    
+    Arguments:
+        product_id (int): Product id.
+        pagesize (int): Offers per request. Pages are requested in parallel
+            (see fetch_pages). Defaults to self.pagesize.
+    """
+    
+    url = self.api['offers'].format(product_id=product_id)
+    result = self.fetch_pages(url, pagesize=pagesize)
+    offers = result.get('data',{})
+    if self.compact_records:
+        offers = compact(offers, 'offer')
+    return Dict(offers)
+
+
+def iter_offers(self, product_id, pagesize=None):
+    """Stream open market offers.
+    
+    Same as offers, but the offers are yielded one by one as they are 
+    downloaded (see iter_pages), without building the whole market in 
+    memory.
+    
+    Arguments:
+        product_id (int): Product id.
+        pagesize (int): Offers per request. Defaults to self.pagesize.
+    
+    Yields:
+        dict: Offer (records.Record if self.compact_records).
+    
+    Example:
+        cheapest = min(v.iter_offers(1500), key=lambda o: o['price'])
+    """
     
     url = self.api['offers'].format(product_id=product_id)
-    result = self.session.get(url).json(cls=Decoder)
-    return Dict(result.get('data',{}))
+    for _, offer in self.iter_pages(url, pagesize=pagesize):
+        if self.compact_records and isinstance(offer, dict):
+            offer = compact_record('offer', offer)
+        yield offer
 
 
 def retail_metrics(self, product_id, geo=None, **geo_filters):
@@ -79,7 +113,7 @@ def retail_metrics(self, product_id, geo=None, **geo_filters):
                 else:
                     return None
     url = self.api['retail_metrics'].format(product_id=product_id, geo=geo)
-    return self.session.get(url).json(cls=Decoder)
+    return loads(self.session.get(url).content)
 
 
 def retail_history(self, product_id, geo=None, **geo_filters):
@@ -125,4 +159,4 @@ def retail_history(self, product_id, geo=None, **geo_filters):
                 else:
                     return None
     url = self.api['retail_history'].format(product_id=product_id, geo=geo)
-    return self.session.get(url).json(cls=Decoder)
\ No newline at end of file
+    return loads(self.session.get(url).content)
\ No newline at end of file
@@ -1,14 +1,16 @@
+from .xpath import xpaths
+
+
 @property
 def messages(self):
     url = self.domain_ext + 'common/util/setpaging/usermain/messageIncomingList/400'
     self.session.get(url)
     url = self.domain_ext + 'user/privat/persondata/message/system?old'
     page = self.session.tree(url)
-    xp = '//tr[@id="newmesg"]'
     result = {}
-    for row in page.xpath(xp):
-        message_id = int(row.xpath('./td/input/@value')[0])
-        title = str(row.xpath('./td[last()]/a/text()')[0])
+    for row in xpaths['messages.rows'](page):
+        message_id = int(xpaths['messages.id'](row)[0])
+        title = xpaths['messages.title'](row)[0]
         result[message_id] = title
     return result
 
@@ -31,4 +33,4 @@ def mark_messages_as(self, messages, mark_as='Read'):
         'markas': mark_as,
         'message[]': list(messages)
         }
-    self.session.post(url, data=data)
\ No newline at end of file
+    self.session.post(url, data=data, mutation='action')
\ No newline at end of file
@@ -1,5 +1,7 @@
 import datetime
 
+from .xpath import xpaths
+
 
 @classmethod
 def days_to_election(cls, days_passed, post='mayor'):
@@ -40,7 +42,7 @@ def city_change_council_tax(self, city_id, increase=True):
     
     action = 'fee_up' if increase else 'fee_down'
     url = self.domain_ext + 'politics/%s/%s' % (action, city_id)
-    self.session.get(url)
+    self.session.get(url, mutation='action')
 
 
 def city_money_project(self, city_id, project_name):
@@ -102,13 +104,13 @@ def city_money_project(self, city_id, project_name):
     
     url = self.domain_ext + 'politics/money_project/%s/%s' % (
               city_id, codes[project_name])
-    return self.session.get(url)
+    return self.session.get(url, mutation='action')
 
 
 def city_retail_project(self, city_id, category_name):
     categories = {g['product_category_name']: g['product_category_id'] for g in self.goods.values()}
     url = self.domain_ext + 'politics/retail_project/%s/%s' % (city_id, categories[category_name])
-    return self.session.get(url)
+    return self.session.get(url, mutation='action')
 
 
 def city_change_rent(self, city_id, unit_class, rent_up=False):
@@ -154,7 +156,7 @@ def city_change_rent(self, city_id, unit_class, rent_up=False):
     change = 'rent_up' if rent_up else 'rent_down'
     url = self.domain_ext + 'politics/%s/%s/%d' % (
               change, city_id, unit_class)
-    self.session.get(url)
+    self.session.get(url, mutation='action')
 
 
 def region_money_project(self, region_id, project_name):
@@ -216,7 +218,7 @@ def region_money_project(self, region_id, project_name):
     
     url = self.domain_ext + 'politics/money_project/%s/%s' % (
               region_id, codes[project_name])
-    self.session.get(url)
+    self.session.get(url, mutation='action')
 
 
 def region_country_up(self, region_id):
@@ -225,7 +227,7 @@ def region_country_up(self, region_id):
         'region_id': region_id,
         'command': 'country_up'
     }
-    self.session.post(url, data=data)
+    self.session.post(url, data=data, mutation='action')
 
 
 def country_money_project(self, country_id, project_name):
@@ -276,21 +278,21 @@ def country_money_project(self, country_id, project_name):
 
     url = self.domain_ext + 'politics/money_project/%s/%s' % (
               country_id, codes[project_name])
-    self.session.get(url)
+    self.session.get(url, mutation='action')
 
 
 def election_candidates(self, election_id):
     url = self.domain_ext + 'politics/elections/%s' % election_id
     page = self.session.tree(url)
-    rows = page.xpath('//input[@type="radio" and @name="member" and @value!=0]/../..')
+    rows = xpaths['election_candidates.rows'](page, name='member')
     if not rows:
-        rows = page.xpath('//input[@type="radio" and @name="pr_member" and @value!=0]/../..')
+        rows = xpaths['election_candidates.rows'](page, name='pr_member')
     result = {}
     for row in rows:
-        candidate_id = int(row.xpath('.//input[@type="radio"]/@value')[0])
-        party = row.xpath('.//div[@class="title"]/text()')
+        candidate_id = int(xpaths['election_candidates.id'](row)[0])
+        party = xpaths['election_candidates.party'](row)
         if party:
-            party = str(party[0])
+            party = party[0]
         else:
             party = 'current'
         result[party] = candidate_id
@@ -303,7 +305,7 @@ def vote(self, election_id, candidate_id):
         'member': candidate_id,
         'pr_member': candidate_id
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def send_yacht_to_regatta(self, unit_id):
@@ -319,4 +321,4 @@ def send_yacht_to_regatta(self, unit_id):
     
     url = self.domain_ext + 'unit/view/%s' % unit_id
     data = {'picnic_btn': 1}
-    return self.session.post(url, data=data)
\ No newline at end of file
+    return self.session.post(url, data=data, mutation='action')
\ No newline at end of file
@@ -1,3 +1,6 @@
+from .types import List, ge
+
+
 @staticmethod
 def lab_employees_required(level):
     """Number of employees needed for a given technological level"""
@@ -29,7 +32,7 @@ def start_research_project(self, unit_id, unittype_id, level):
         'level': level, 
         'create': 1
         }
-    result = self.session.post(url, data=data)
+    result = self.session.post(url, data=data, mutation='action')
     self.refresh(unit_id)
     return result
 
@@ -46,7 +49,7 @@ def stop_research_project(self, unit_id):
     """
     
     url = self.domain_ext + 'unit/view/%s/project_current_stop' % unit_id
-    result = self.session.post(url)
+    result = self.session.post(url, mutation='action')
     self.refresh(unit_id)
     return result
 
@@ -68,7 +71,7 @@ def select_hypotesis(self, unit_id, hypotesis_id):
         'selectedHypotesis': hypotesis_id,
         'selectIt': 1
         }
-    result = self.session.post(url, data=data)
+    result = self.session.post(url, data=data, mutation='set')
     self.refresh(unit_id)
     return result
 
@@ -86,7 +89,7 @@ def set_experemental_unit(self, lab_id, exp_unit_id):
     
     url = self.domain_ext + 'unit/view/%s/set_experemental_unit' % lab_id
     data = {'unit': exp_unit_id}
-    result = self.session.post(url, data=data)
+    result = self.session.post(url, data=data, mutation='set')
     self.refresh(lab_id)
     return result
     
@@ -171,9 +174,9 @@ def choose_experimental_unit(self, unittype_id, min_size=0, tech_level=1):
         Too specific. Move to MyVirta class?
     """
     
-    units = [self.unit_summary(u) for u in self.units(unit_type_id=unittype_id)]
-    units = [u for u in units 
-             if u['size'] >= min_size and u['technology_level'] >= tech_level]
+    units = self.fetch_many('unit_summary', self.units(unit_type_id=unittype_id),
+                            raise_errors=True).values()
+    units = List(units)(size=ge(min_size), technology_level=ge(tech_level))
     if units:
         return max(units, key=lambda u: u['productivity'])
     else:
@@ -1,13 +1,17 @@
-from .jsondecoder import Decoder
 from .types import List, Dict
+from .records import compact
+from .htmltable import Table, Column
+from .xpath import xpaths
 
 
-def sale_contracts(self, unit_id, product_id=None):
+def sale_contracts(self, unit_id, product_id=None, pagesize=None):
     """List of sale contracts for a given unit
     
     Arguments:
         unit_id (int): Unit id.
         product_id (int): Defaults to None.
+        pagesize (int): Contracts per request. Pages are requested in 
+            parallel (see fetch_pages). Defaults to self.pagesize.
 
     Returns:
         List: List of sale contracts.
@@ -16,83 +20,57 @@ def sale_contracts(self, unit_id, product_id=None):
     product_filter = '&product_id=%s'%product_id if product_id else ''
     data = dict(unit_id=unit_id, product_filter=product_filter)
     url = self.api['sale_contracts'].format(**data)
-    return List(self.session.get(url).json(cls=Decoder).get('data', []))
+    contracts = self.fetch_pages(url, pagesize=pagesize).get('data', [])
+    if self.compact_records:
+        contracts = compact(contracts, 'sale_contract')
+    return List(contracts)
 
 
 def sale_offers(self, unit_id):
     url = self.domain_ext + 'unit/view/%s/sale' % unit_id
-    page = self.session.tree(url)
-    row_xp = '//input[contains(@name,"[price]")]/ancestor::tr'
-    rows = page.xpath(row_xp)
+    page = self.session.tree(url, region='mainContent')
+    rows = xpaths['sale_offers.rows'](page)
     if not rows:
         return {}
     
     column_names = [None]
-    for th in rows[0].xpath('./../tr/th'):
-        th = th.xpath('./text()')
-        column_names.append(str(th[0]) if th else None)
+    for th in xpaths['sale_offers.headers'](rows[0]):
+        th = xpaths['sale_offers.text'](th)
+        column_names.append(th[0] if th else None)
     stock_column = column_names.index('На складе')
     
-    subtable_xp = './td[%d]/table//td[contains(.,"%s")]/../td[2]/text()'
-    xps = {
-        'product_name': './td/a[contains(@href,"globalreport/marketing")]/text()',
-        'stock': subtable_xp % (stock_column, 'Количество'),
-        'quality': subtable_xp % (stock_column, 'Качество'),
-        'cost': subtable_xp % (stock_column, 'Себестоимость'),
-        'price': './td/input[contains(@name,"[price]")]/@value',
-        'max_qty': './td//input[contains(@name,"[max_qty]")]/@value',
-        'constraint': './td/select[contains(@name,"[constraint]")]/option[@selected]/@value'
-        }
+    columns = [
+        Column('product_name', path=xpaths['sale_offers.product_name']),
+        Column('stock', stock_column, 'float', label='Количество', default=0),
+        Column('quality', stock_column, 'float', label='Качество'),
+        Column('cost', stock_column, 'money', label='Себестоимость'),
+        Column('price', type='float', path=xpaths['sale_offers.price']),
+        Column('max_qty', type='int', path=xpaths['sale_offers.max_qty'], 
+               default=0),
+        Column('constraint', type='int', path=xpaths['sale_offers.constraint']),
+        ]
     if 'Выпуск' in column_names:
         produce_column = column_names.index('Выпуск')
-        xps['production'] = subtable_xp % (produce_column, 'Количество')
+        columns.append(Column('production', produce_column, 'float', 
+                              label='Количество', default=0))
+    columns += [
+        Column('product', path=xpaths['sale_offers.product'], required=False),
+        Column('product_href', path=xpaths['sale_offers.product_href'], 
+               required=False),
+        Column('company', type=int, path=xpaths['sale_offers.company'], 
+               many=True),
+        ]
     
     result = {}
-    for row in rows:
-        res = {name: str(row.xpath(xp)[0]) for name, xp in xps.items()}
-        
-        product_xp = './td/input[@type="checkbox"]/@value'
-        product_str = row.xpath(product_xp)
+    for res in Table('sale_offers.rows', columns).records(page, rows):
+        product_str = res.pop('product')
+        product_href = res.pop('product_href')
         if product_str:
-            product_str = str(product_str[0])
             res['product_id'] = int(product_str.split('/')[0])
             res['trademark'] = int(product_str.split('/')[-1])
         else:
-            product_xp = './td/a[contains(@href,"product_id")]/@href'
-            product_str = str(row.xpath(product_xp)[0])
-            res['product_id'] = int(product_str.split('product_id=')[-1].split('#')[0])
+            res['product_id'] = int(product_href.split('product_id=')[-1].split('#')[0])
             res['trademark'] = 0
-            
-        res['stock'] = res['stock'].replace(' ', '')
-        try:
-            res['stock'] = float(res['stock'])
-        except ValueError:
-            res['stock'] = 0
-            
-        res['cost'] = res['cost'].replace(' ', '').replace('$', '')
-        for name in ('quality', 'cost'):
-            try:
-                res[name] = float(res[name])
-            except ValueError:
-                res[name] = None
-                
-        res['price'] = float(res['price'])
-        try:
-            res['max_qty'] = int(res['max_qty'])
-        except ValueError:
-            res['max_qty'] = 0
-            
-        res['constraint'] = int(res['constraint'])
-        
-        company_xp = './td//select[contains(@name,"[company]")]/option/@value'
-        res['company'] = [int(c) for c in row.xpath(company_xp)]
-        
-        if 'production' in res:
-            res['production'] = res['production'].replace(' ', '')
-            try:
-                res['production'] = float(res['production'])
-            except ValueError:
-                res['production'] = 0
         
         result[res['product_id']] = res
         
@@ -146,7 +124,7 @@ def set_sale_offers(self, unit_id, offers):
         data[name%'max_qty'] = offer.get('max_qty', 0)
         data[name%'constraint'] = offer.get('constraint', 3)
         data[name%'company'+'[]'] = offer.get('company', [])
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def destroy_sale_contracts(self, unit_id, offer_id, consumers):
@@ -168,7 +146,7 @@ def destroy_sale_contracts(self, unit_id, offer_id, consumers):
         'consumerContractData[selected][%s][]'%offer_id: consumers,
         'destroy': 1
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='action')
 
 
 def reorder_sale_contracts(self, unit_id, products):
@@ -185,13 +163,12 @@ def reorder_sale_contracts(self, unit_id, products):
     
     Example:
         # To move up own orders
-        products = {}
-        for contract in sorted(
+        contracts = List(sorted(
                 v.sale_contracts(unit_id),
                 key=lambda c: c['consumer_company_id']!=v.company['id']
-                ):
-            p = contract['product_id']
-            products[p] = products.get(p, []) + [contract['consumer_id']]
+                ))
+        products = {p: [c['consumer_id'] for c in group]
+                    for p, group in contracts.group_by('product_id').items()}
         v.reorder_sale_contracts(unit_id, products)
     """
     
@@ -199,4 +176,4 @@ def reorder_sale_contracts(self, unit_id, products):
     data = {'positionData[%s/0][]' % product_id: consumers
             for product_id, consumers in products.items()}
     data['changePosition'] = 1
-    return self.session.post(url, data=data)
\ No newline at end of file
+    return self.session.post(url, data=data, mutation='set')
\ No newline at end of file
@@ -1,21 +1,18 @@
+from .htmltable import Table, Column
+from .xpath import xpaths
+
+
+service_history_table = Table('service_history.rows', [
+    Column('price', 2, 'money', deep=True, required=False),
+    Column('sold', 3, 'int', required=False, default=0),
+    ])
+
+
 def service_history(self, unit_id):
     url = self.domain_ext + 'unit/view/%s/service_history' % unit_id
-    page = self.session.tree(url)
-    xp = '//*[@id="mainContent"]//tr'
-    result = []
-    for row in page.xpath(xp)[1:]:
-        price = row.xpath('./td[2]//text()')
-        if price:
-            price = float(price[0].replace(' ', '').replace('$', ''))
-        else:
-            price = None
-        sold = row.xpath('./td[3]/text()')
-        if sold:
-            sold = int(sold[0].replace(' ', ''))
-        else:
-            sold = 0
-        result.append({'price': price, 'sold': sold})
-    return result
+    page = self.session.tree(url, region='mainContent')
+    rows = xpaths['service_history.rows'](page)[1:]  # skip the header
+    return service_history_table.records(page, rows)
 
 
 def set_service_price(self, unit_id, price):
@@ -33,4 +30,4 @@ def set_service_price(self, unit_id, price):
         'servicePrice': price, 
         'setprice': 1
     }
-    return self.session.post(url, data=data)
\ No newline at end of file
+    return self.session.post(url, data=data, mutation='set')
\ No newline at end of file
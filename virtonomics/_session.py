@@ -1,13 +1,120 @@
-import requests
+import json
+import os
+
+from .jsondecoder import loads
+from .replay import Recorder
+from .transport import Adapter, ResponseCache, Session
 
 def open_session(self):
-    """Open requests session and login to the game"""
+    """Open requests session and login to the game.
+    
+    If session_file is set, the session cookies and token saved by a 
+    previous run are reused as long as the session is still valid.
+    """
     
-    self.session = requests.Session()
+    cache = None
+    if self.cache_dir:
+        cache = ResponseCache(os.path.join(self.path, self.cache_dir))
+    self.session = Session(cache)
+    # Single connection pool shared by all the threads using the session
+    adapter = Adapter(rate=self.rate_limit, burst=self.rate_burst, 
+                      retries=self.retries, pool_connections=self.pool_size,
+                      pool_maxsize=self.pool_size, 
+                      concurrency=self.concurrency, 
+                      max_concurrency=self.pool_size,
+                      recorder=Recorder(self.record) if self.record else None)
+    self.session.mount('https://', adapter)
+    self.session.mount('http://', adapter)
+    if self.restore_session():
+        return self.session
     url = '%s/%s/main/user/login' % (self.domain, self.server)
     data = {
         'userData[login]': self.user, 
         'userData[password]': self.password
         }
     self.session.post(url, data=data)
-    return self.session
\ No newline at end of file
+    self.save_session()
+    return self.session
+
+
+def session_filename(self):
+    if self.session_file:
+        name = self.session_file.format(server=self.server, user=self.user)
+        return os.path.join(self.path, name)
+    return None
+
+
+def save_session(self):
+    """Save session cookies and token (readable by the owner only)."""
+    
+    filename = self.session_filename()
+    if not filename:
+        return
+    data = {
+        'cookies': [
+            {'name': c.name, 'value': c.value, 'domain': c.domain, 
+             'path': c.path, 'expires': c.expires, 'secure': c.secure}
+            for c in self.session.cookies
+            ],
+        'token': self.__dict__.get('token'),
+        }
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(filename, 0o600)
+    with os.fdopen(fd, 'w') as file:
+        json.dump(data, file)
+
+
+def restore_session(self):
+    """Load saved session cookies and token and check if they are valid.
+    
+    Validity is checked by a single company information request, so the
+    company attribute is set on success.
+    
+    Returns:
+        bool: True if the saved session is valid.
+    """
+    
+    filename = self.session_filename()
+    if not filename:
+        return False
+    try:
+        with open(filename) as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return False
+    try:
+        for cookie in data['cookies']:
+            self.session.cookies.set(**cookie)
+    except (KeyError, TypeError):
+        # Older format or edited file
+        self.session.cookies.clear()
+        return False
+    response = self.session.get(self.api['company'])
+    try:
+        company = loads(response.content)
+    except ValueError:
+        company = None
+    if not isinstance(company, dict) or 'id' not in company:
+        self.session.cookies.clear()
+        return False
+    self.company = company
+    if data.get('token'):
+        self.token = data['token']
+    return True
+
+
+def cache_policy(self, api_name):
+    """Disk cache policy for a given API url (see transport.Session.get).
+    
+    Arguments:
+        api_name (str): API url name (key in self.api).
+    
+    Returns:
+        Max age in seconds, or a function returning the freshness tag, or 
+        None if the data should not be cached.
+    """
+    
+    policy = self.api_cache.get(api_name)
+    if isinstance(policy, str):
+        return lambda: getattr(self, policy)
+    return policy
@@ -1,7 +1,36 @@
 import math
+from .htmltable import Table, Column
+from .scrapers import scraper
 from .types import Dict
 
 
+trading_hall_table = Table('trading_hall.rows', [
+    Column('ids', 2, lambda name: '{%s}' % name.split('}')[0].split('{')[-1],
+           path='input', attr='name'),
+    Column('product_id', 3, 
+           lambda href: int(href.split('product_id=')[-1].split('&')[0]),
+           path='a', attr='href'),  # trademark?
+    Column('sold', 4, 'int', path='a'),
+    Column('purchase', 5, 'int'),
+    Column('stock', 6, 'int'),
+    Column('quality', 7, 'float'),
+    Column('brand', 8, 'float'),
+    Column('cost', 9, 'money'),
+    Column('price', 10, 'float', path='input', attr='value'),
+    Column('market_share', 11, 'percent'),
+    Column('avg_price', 12, 'money'),
+    Column('avg_quality', 13, 'float'),
+    Column('avg_brand', 14, 'float'),
+    ])
+
+
+@scraper('trading_hall', region='mainContent')
+def scrape_trading_hall(page):
+    """Trading hall records (see trading_hall_table)."""
+    
+    return trading_hall_table.records(page)
+
+
 def trading_hall(self, shop_id, cache=False):
     result = {}
     if cache:
@@ -11,43 +40,8 @@ def trading_hall(self, shop_id, cache=False):
         result = {r['product_id']: r for r in query_result}
     if not result:
         url = self.domain_ext + 'unit/view/%s/trading_hall' % shop_id
-        page = self.session.tree(url)
-        row_xp = '//input[@type="text"]/ancestor::tr'
-        rows = page.xpath(row_xp)
-        xps = {
-            'ids': './td[2]/input/@name',
-            'product_id': './td[3]/a/@href',  # trademark?
-            'sold': './td[4]/a/text()',
-            'purchase': './td[5]/text()',
-            'stock': './td[6]/text()',
-            'quality': './td[7]/text()',
-            'brand': './td[8]/text()',
-            'cost': './td[9]/text()',
-            'price': './td[10]/input/@value',
-            'market_share': './td[11]/text()',
-            'avg_price': './td[12]/text()',
-            'avg_quality': './td[13]/text()',
-            'avg_brand': './td[14]/text()'
-            }
         result = {}
-        for row in rows:
-            res = {name: str(row.xpath(xp)[0]) for name, xp in xps.items()}
-            res['ids'] = '{' + res['ids'].split('}')[0].split('{')[-1] + '}'
-            res['product_id'] = int(res['product_id'].split('product_id=')[-1].split('&')[0])
-            res['sold'] = int(res['sold'].replace(' ', ''))
-            res['purchase'] = int(res['purchase'].replace(' ', '').replace('[', '').replace(']', ''))
-            res['stock'] = int(res['stock'].replace(' ', ''))
-            res['cost'] = res['cost'].replace(' ', '').replace('$', '')
-            for name in ('quality', 'brand', 'cost'):
-                try:
-                    res[name] = float(res[name])
-                except ValueError:
-                    res[name] = None
-            res['price'] = float(res['price'])
-            res['market_share'] = float(res['market_share'].replace(' ', '').replace('%', '')) / 100
-            res['avg_price'] = float(res['avg_price'].replace(' ', '').replace('$', ''))
-            res['avg_quality'] = float(res['avg_quality'])
-            res['avg_brand'] = float(res['avg_brand'])
+        for res in self.scrape('trading_hall', url):
             res['unit_id'] = shop_id
             res['date'] = self.today
             
@@ -79,13 +73,13 @@ def set_shop_sale_prices(self, shop_id, offers):
     data = {'action': 'setprice'}
     for offer_ids, price in offers.items():
         data['productData[price][%s]'%offer_ids] = price
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def set_shop_sales_prices(self, shop_id):
     url = self.domain_ext + 'unit/view/%s' % shop_id
     data = {'auto_Price': 'Распродажные цены'}
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def distribute_shop_employees(self, units, total_number=None, competence=None, reserve=0):
@@ -96,7 +90,13 @@ def distribute_shop_employees(self, units, total_number=None, competence=None, r
             competence = self.knowledge['trade']
         total_number = load * base * competence * (competence + 3)
     total_number -= reserve
-    units = {unit_id: self.unit_summary(unit_id, refresh=True) for unit_id in units}
+    units = list(units)
+    # Refresh requests change the game state: they are sent by batch, and
+    # only the summaries are read in parallel
+    with self.batch():
+        for unit_id in units:
+            self.refresh(unit_id)
+    units = self.fetch_many('unit_summary', units, raise_errors=True)
     employee_required = {unit_id: unit['employee_required']
                          for unit_id, unit in units.items()
                          if not unit.get('on_holiday', True)}
@@ -128,7 +128,7 @@ def product_move_to_warehouse(self, from_unit_id, product_id, to_unit_id, quanti
         'unit': to_unit_id,
         'doit': 1
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='action')
 
 
 def product_terminate(self, unit_id, product_ids):
@@ -137,4 +137,4 @@ def product_terminate(self, unit_id, product_ids):
     url = self.domain_ext + 'unit/view/%s/trading_hall' % unit_id
     data = {'productData[selected][%s]'%idx: 1 for idx in product_ids}
     data['action'] = 'terminate'
-    return self.session.post(url, data=data)
\ No newline at end of file
+    return self.session.post(url, data=data, mutation='action')
\ No newline at end of file
@@ -0,0 +1,31 @@
+from . import jsondecoder
+
+
+def stats(self):
+    """Transport and decoding instrumentation.
+    
+    Does not open the session if it is not opened yet.
+    
+    Returns:
+        dict: Session counters (see transport.Session.stats: 'coalesced',
+            'cache_hits', 'cache_revalidated', 'region_misses'), 
+            'concurrency' - current limits of requests in flight indexed by
+            endpoint families, 'json_backend' - name of the JSON backend
+            decoding API responses (see jsondecoder.set_backend), and 
+            'parse_cache' - parse cache counters (see 
+            scrapers.ParseCache.stats) if the cache is used.
+    """
+    
+    result = {}
+    concurrency = {}
+    session = self.__dict__.get('session')
+    if session is not None:
+        result.update(session.stats)
+        adapter = session.get_adapter(self.domain)
+        if getattr(adapter, 'controller', None) is not None:
+            concurrency = adapter.controller.snapshot()
+    result['concurrency'] = concurrency
+    result['json_backend'] = jsondecoder.get_backend()
+    if self.__dict__.get('parse_cache') is not None:
+        result['parse_cache'] = self.parse_cache.stats()
+    return result
@@ -1,13 +1,33 @@
-from .jsondecoder import Decoder
+from .htmltable import Table, Column
+from .records import compact
 from .types import Dict
+from .xpath import xpaths
 
 
-def supply_contracts(self, unit_id, product_id=None):
+supply_products_table = Table('supply_products.rows', [
+    Column('product_id', type=lambda href: int(href.split('/')[-1]), 
+           path=xpaths['supply_products.product_id']),
+    Column('stock', type='int', label='Количество'),
+    Column('quality', type='float', label='Качество'),
+    Column('cost', type='money', label='Себестоимость'),
+    # Not present in some unit types
+    Column('needed', type='int', label='Требуется', required=False),
+    Column('brand', type='float', label='Бренд', required=False),
+    Column('sold', type='int', label='Продано', required=False),
+    Column('per_client', type='int', label='Расх. на клиента', required=False),
+    Column('product_name', path=xpaths['supply_products.product_name'], 
+           required=False),
+    ])
+
+
+def supply_contracts(self, unit_id, product_id=None, pagesize=None):
     """List of supply contracts for a given unit.
     
     Arguments:
         unit_id (int): Unit id.
         product_id (int): Defaults to None.
+        pagesize (int): Contracts per request. Pages are requested in 
+            parallel (see fetch_pages). Defaults to self.pagesize.
 
     Returns:
         Dict: List of supply contracts.
@@ -16,75 +36,20 @@ def supply_contracts(self, unit_id, product_id=None):
     product_filter = '&product_id=%s'%product_id if product_id else ''
     data = dict(unit_id=unit_id, product_filter=product_filter)
     url = self.api['supply_contracts'].format(**data)
-    return Dict(self.session.get(url).json(cls=Decoder))
+    contracts = self.fetch_pages(url, pagesize=pagesize)
+    if self.compact_records:
+        contracts = compact(contracts, 'supply_contract')
+    return Dict(contracts)
 
 
 def supply_products(self, unit_id):
     url = self.domain_ext + 'unit/view/%s/supply' % unit_id
-    page = self.session.tree(url)
-    row_xp = '//img[@title="Выбрать поставщика"]/ancestor::tr[last()]'
-    rows = page.xpath(row_xp)
-    base_xp = './/table//td[contains(.,"%s")]/../td[2]/text()'
-    xps = {
-        'product_id': './/@href[contains(.,"supply/create")]',
-        'stock': base_xp % 'Количество',
-        'quality': base_xp % 'Качество',
-        'cost': base_xp % 'Себестоимость',
-        # Not present in some unit types
-        'needed': base_xp % 'Требуется',
-        'brand': base_xp % 'Бренд',
-        'sold': base_xp % 'Продано',
-        'per_client': base_xp % 'Расх. на клиента',
-        }
+    page = self.session.tree(url, region='mainContent')
     result = {}
-    for row in rows:
-        res = {}
-        for name, xp in xps.items():
-            try:
-                res[name] = str(row.xpath(xp)[0])
-            except IndexError:
-                pass
-        
-        name_xp = './/img[contains(@src,"img/products")]/@alt'
-        try:
-            res['product_name'] = str(row.xpath(name_xp)[0])
-        except:
-            name_xp = '//td/@title'
-            res['product_name'] = str(row.xpath(name_xp)[0])
-            
-        res['product_id'] = int(res['product_id'].split('/')[-1])
-        res['stock'] = int(res['stock'].replace(' ',''))
-        
-        try:
-            res['quality'] = float(res['quality'])
-        except ValueError:
-            res['quality'] = None
-            
-        try:
-            res['cost'] = float(res['cost'].replace(' ','').replace('$',''))
-        except ValueError:
-            res['cost'] = None
-            
-        if 'needed' in res:
-            res['needed'] = int(res['needed'].replace(' ',''))
-            
-        if 'brand' in res:
-            try:
-                res['brand'] = float(res['brand'])
-            except ValueError:
-                res['brand'] = None
-                
-        if 'sold' in res:
-            try:
-                res['sold'] = int(res['sold'].replace(' ',''))
-            except ValueError:
-                res['sold'] = 0
-        
-        if 'per_client' in res:
-            res['per_client'] = int(res['per_client'].replace(' ',''))
-        
+    for res in supply_products_table.records(page):
+        if res['product_name'] is None:
+            res['product_name'] = xpaths['supply_products.title'](page)[0]
         result[res['product_id']] = res
-        
     return Dict(result)
 
 
@@ -133,7 +98,7 @@ def create_supply_contract(self, unit_id, offer_id, amount=1, max_price=0,
         'constraintPriceType': 'Abs' if max_price else 'Rel',
         'instant': 'true' if instant else ''
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='action')
 
 
 def destroy_supply_contract(self, unit_id, offer_ids):
@@ -153,7 +118,7 @@ def destroy_supply_contract(self, unit_id, offer_ids):
         'contractDestroy': 1,
         'supplyContractData[selected][]': offer_ids
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='action')
 
 
 def set_supply_contracts(self, unit_id, orders):
@@ -210,7 +175,7 @@ def set_supply_contracts(self, unit_id, orders):
         else:
             data[name%'constraintPriceType'] = 'Rel'
         data[name%'quality_constraint_min'] = order.get('min_quality', 0)
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def suspend_supply_contracts(self, unit_id):
@@ -1,5 +1,7 @@
 from .types import List
-from .jsondecoder import Decoder
+from .jsondecoder import loads
+from .scrapers import scraper
+from .xpath import xpaths
 
 
 def technologies(self, unittype_id):
@@ -31,12 +33,11 @@ def technologies(self, unittype_id):
         v.technologies(2071).select(level=15)
     """
     
-    if not hasattr(self, '__technologies'):
-        self.__technologies = {}
+    self.__dict__.setdefault('__technologies', {})
     if unittype_id not in self.__technologies:
         url = self.api['technologies']
         data = {'company_id': self.company['id'], 'id': unittype_id}
-        result = self.session.post(url, data=data).json(cls=Decoder)
+        result = loads(self.session.post(url, data=data).content)
         self.__technologies[unittype_id] = List(result)
     return self.__technologies[unittype_id]
 
@@ -66,7 +67,7 @@ def set_technology_offer(self, unittype_id: int, level: int, price: float):
            + 'management_action/%s/investigations/technology_offer_create/%s/%s'
            % (self.company['id'], level, unittype_id))
     data = {'price': price}
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def destroy_technology_offers(self, offers: list):
@@ -86,7 +87,21 @@ def destroy_technology_offers(self, offers: list):
               for k in offers if k in all_offers or k in all_offers.values()]
     url = self.domain_ext + 'management_action/%s/investigations/technology_offers_destroy' % self.company['id']
     data = {'techs[]': offers}
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='action')
+
+
+@scraper('technology_offers', region='mainContent')
+def scrape_technology_offers(page):
+    """Own technology offers: (unittype_id, level) -> offer_id."""
+    
+    result = {}
+    for cell in xpaths['technology_offers.cells'](page):
+        offer_id = int(xpaths['technology_offers.id'](cell)[0])
+        href = xpaths['technology_offers.href'](cell)[0].split('/')
+        unittype_id = int(href[-1])
+        level = int(href[-2])
+        result[(unittype_id, level)] = offer_id
+    return result
 
 
 def technology_offers(self, refresh: bool=False) -> dict:
@@ -105,18 +120,29 @@ def technology_offers(self, refresh: bool=False) -> dict:
     
     if refresh or not hasattr(self, '__technology_offers'):
         url = self.domain_ext + 'management_action/%s/investigations/technologies' % self.company['id']
-        page = self.session.tree(url)
-        xp = '//input[@type="checkbox" and @name="techs[]"]/..'
-        self.__technology_offers = {}
-        for cell in page.xpath(xp):
-            offer_id = int(cell.xpath('./input/@value')[0])
-            href = cell.xpath('./a/@href')[0].split('/')
-            unittype_id = int(href[-1])
-            level = int(href[-2])
-            self.__technology_offers[(unittype_id, level)] = offer_id
+        self.__technology_offers = self.scrape('technology_offers', url)
     return self.__technology_offers
 
 
+@scraper('technology_sellers', region='mainContent')
+def scrape_technology_sellers(page):
+    """Technology offers of all the companies: company_id -> price."""
+    
+    result = {}
+    for row in xpaths['technology_sellers.rows'](page):
+        company_id = int(xpaths['technology_sellers.href'](row)[0].split('/')[-1])
+        price = xpaths['technology_sellers.price'](row)[0]
+        price = float(price.replace(' ', '').replace('$', ''))
+        result[company_id] = price
+    return result
+
+
+def technology_sellers_url(self, unittype_id, level):
+    return (self.domain_ext 
+            + 'management_action/%s/investigations/technology_sellers_info/%s/%s' 
+            % (self.company['id'], level, unittype_id))
+
+
 def technology_sellers_all(self, unittype_id: int, level: int) -> dict:
     """Предложения всех компаний.
     
@@ -128,24 +154,41 @@ def technology_sellers_all(self, unittype_id: int, level: int) -> dict:
         Dict: company_id -> price
     """
     
-    if not hasattr(self, '__technology_sellers_all'):
-        self.__technology_sellers_all = {}
+    self.__dict__.setdefault('__technology_sellers_all', {})
         
     if not (unittype_id, level) in self.__technology_sellers_all:
-        url = (self.domain_ext 
-              + 'management_action/%s/investigations/technology_sellers_info/%s/%s' 
-              % (self.company['id'], level, unittype_id))
-        page = self.session.tree(url)
-        xp = '//td/a[contains(@href,"/company/view/")]/../..'
-        result = {}
-        for row in page.xpath(xp):
-            company_id = int(row.xpath('.//a/@href')[0].split('/')[-1])
-            price = float(row.xpath('./td[2]/text()')[0].replace(' ', '').replace('$', ''))
-            result[company_id] = price
+        url = technology_sellers_url(self, unittype_id, level)
+        result = self.scrape('technology_sellers', url)
         self.__technology_sellers_all[unittype_id, level] = result
     return self.__technology_sellers_all[unittype_id, level]
 
 
+def technology_sellers_many(self, unittype_id: int, levels) -> dict:
+    """Предложения всех компаний для нескольких уровней.
+    
+    Pages are fetched in parallel and parsed in worker processes (see 
+    scrape_many). Results are cached for technology_sellers_all.
+    
+    Arguments:
+        unittype_id (int)
+        levels (iterable): Technology levels.
+    
+    Returns:
+        dict: level -> technology_sellers_all(unittype_id, level)
+    """
+    
+    self.__dict__.setdefault('__technology_sellers_all', {})
+    levels = list(levels)
+    urls = {level: technology_sellers_url(self, unittype_id, level) for level in levels
+            if (unittype_id, level) not in self.__technology_sellers_all}
+    if urls:
+        pages = self.scrape_many('technology_sellers', urls, raise_errors=True)
+        for level, result in pages.items():
+            self.__technology_sellers_all[unittype_id, level] = result
+    return {level: self.__technology_sellers_all[unittype_id, level] 
+            for level in levels}
+
+
 def technology_sellers_med(self, unittype_id: int, level: int) -> dict:
     """Предложения, формирующие рыночную стоимость технологии.
     
@@ -1,12 +1,12 @@
 from .types import Dict
-from .jsondecoder import Decoder
+from .jsondecoder import loads
 from datetime import datetime
 
 
 @property
 def tenders(self):
     url = self.api['tender'] + '/browse'
-    data = self.session.get(url).json(cls=Decoder)
+    data = loads(self.session.get(url).content)
     result = {}
     for day_data in data:
         for tender in day_data['tenders']:
@@ -26,7 +26,7 @@ def tender_register(self, tender_id):
         'id': tender_id,
         'token': self.token,
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='action')
 
 
 def tender_register_all(self):
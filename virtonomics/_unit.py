@@ -1,4 +1,27 @@
-from .jsondecoder import Decoder
+from .jsondecoder import loads
+from .records import compact_record
+from .xpath import xpaths
+
+
+def iter_units(self, pagesize=None):
+    """Stream company units.
+    
+    Same as the units attribute, but the units are yielded one by one as
+    they are downloaded (see iter_pages) and are not stored. Indicators are
+    not loaded.
+    
+    Arguments:
+        pagesize (int): Units per request. Defaults to self.pagesize.
+    
+    Yields:
+        dict: Unit (records.Record if self.compact_records).
+    """
+    
+    url = self.api['units'].format(company_id=self.company['id'])
+    for _, unit in self.iter_pages(url, pagesize=pagesize):
+        if self.compact_records and isinstance(unit, dict):
+            unit = compact_record('unit', unit)
+        yield unit
 
 
 def unit_summary(self, unit_id, refresh=False):
@@ -17,16 +40,15 @@ def unit_summary(self, unit_id, refresh=False):
         the unit and top manager effectiveness forecast.
     """
     
-    if not hasattr(self, '__unit_summary'):
-        self.__unit_summary = {}
+    self.__dict__.setdefault('__unit_summary', {})
     if refresh or unit_id not in self.__unit_summary:
         if refresh:
             self.refresh(unit_id)
         url_s = self.api['unit_summary'].format(unit_id=unit_id)
-        unit_info = self.session.get(url_s).json(cls=Decoder)
+        unit_info = loads(self.session.get(url_s).content)
         # Forecast
         #url_f = self.api['unit_forecast'].format(unit_id=unit_id)
-        #unit_info['forecast'] = self.session.get(url_f).json(cls=Decoder)
+        #unit_info['forecast'] = loads(self.session.get(url_f).content)
         self.__unit_summary[unit_id] = unit_info
     return self.__unit_summary[unit_id]
 
@@ -34,7 +56,9 @@ def unit_summary(self, unit_id, refresh=False):
 def refresh(self, unit_id):
     """Refresh unit information.
     Needs to be called if unit characteristics have been manually changed,
-    in order to get up to date unit summary information.
+    in order to get up to date unit summary information. Drops the cached
+    unit summary once the request is sent (at the end of the block inside
+    batch), so the next unit_summary call reads it again.
     
     Arguments:
         unit_id (int): Unit id.
@@ -43,9 +67,11 @@ def refresh(self, unit_id):
         POST request responce.
     """
     
+    summaries = self.__dict__.setdefault('__unit_summary', {})
     url = self.api['refresh']
     data = {'id': unit_id, 'token': self.token}
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set', 
+                             sent=lambda response: summaries.pop(unit_id, None))
 
 
 def rename_unit(self, unit_id, name, international_name=''):
@@ -66,16 +92,15 @@ def rename_unit(self, unit_id, name, international_name=''):
         'unitData[name]': name,
         'unitData[international_name]': international_name
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def get_unit_notice(self, unit_id):
     url = self.domain_ext + 'unit/notice/%s' % unit_id
     page = self.session.tree(url)
-    xp = '//textarea/text()'
-    text = page.xpath(xp)
+    text = xpaths['unit_notice.text'](page)
     if text:
-        text = str(page.xpath(xp)[0])
+        text = text[0]
     else:
         text = ''
     return text
@@ -87,7 +112,7 @@ def set_unit_notice(self, unit_id, text=''):
         'unitData[text]': text,
         'save': 1
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def set_technology(self, unit_id, level, max_price=0):
@@ -126,7 +151,7 @@ def set_technology(self, unit_id, level, max_price=0):
             return None
     url = self.domain_ext + 'unit/view/%s/technology' % unit_id
     data = {'level': level}
-    result = self.session.post(url, data=data)
+    result = self.session.post(url, data=data, mutation='set')
     self.refresh(unit_id)
     return result
 
@@ -154,13 +179,13 @@ def resize_unit(self, unit_id, size_delta=0, size=None):
         size_delta = size - self.unit_summary(unit_id)['size']
     url = self.domain_ext + 'unit/upgrade/%s' % unit_id
     data = {'upgrade[delta]': size_delta}
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='action')
 
 
 def cancel_resize_unit(self, unit_id):
     url = self.domain_ext + 'unit/upgrade/%s/stop' % unit_id
     data = {'accept': 1}
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='action')
 
 
 def set_innovation(self, unit_id, innovation_name, action='attach', refresh=False):
@@ -243,7 +268,7 @@ def set_innovation(self, unit_id, innovation_name, action='attach', refresh=Fals
     url = (self.domain + 
            '/%s/ajax/unit/artefact/%s?unit_id=%s&artefact_id=%s&slot_id=%s'
            % (self.server, action, unit_id, artefact_id, slot_id))
-    return self.session.post(url)
+    return self.session.post(url, mutation='set')
 
 
 def remove_innovation(self, unit_id, innovation_name):
@@ -282,24 +307,24 @@ def create_unit(self, *args, **kwargs):
     def get_options(page):
         result = {}
         name = None
-        rows = page.xpath('//input[@type="radio"]')
+        rows = xpaths['create_unit.options'](page)
         if rows:
             for row in rows:
                 if not name:
-                    name = str(row.xpath('./@name')[0]).split('[')[-1].split(']')[0]
-                value = int(row.xpath('./@value')[0])
+                    name = xpaths['create_unit.name'](row)[0].split('[')[-1].split(']')[0]
+                value = int(xpaths['create_unit.value'](row)[0])
                 if name == 'unit_type':
-                    text = row.xpath('./../label/text()[last()]')
+                    text = xpaths['create_unit.label'](row)
                 else:
-                    text = row.xpath('./../../td[2]/text()[last()]')
+                    text = xpaths['create_unit.td2'](row)
                 if not text:
-                    text = row.xpath('./../../td[3]/text()[last()]')
-                text = str(text[0]).strip()
+                    text = xpaths['create_unit.td3'](row)
+                text = text[0].strip()
                 result[value] = text
             return name, result
         else:
             name = 'custom_name'
-            value = page.xpath('//input[@type="text"]/@value')[0]
+            value = xpaths['create_unit.custom_name'](page)[0]
             return name, value
     
     if 'city' in kwargs and 'region' not in kwargs or 'country' not in kwargs:
@@ -358,10 +383,9 @@ def sale_unit(self, unit_id, price=None, factor=1):
         market_price = self.unit_summary(unit_id, refresh=True)['market_price']
         if not market_price:
             page = self.session.tree(url)
-            xp = '//input[@name="price"]/@value'
-            market_price = page.xpath(xp)
+            market_price = xpaths['sale_unit.price'](page)
             if market_price:
-                market_price = float(page.xpath(xp)[0])
+                market_price = float(market_price[0])
             else:
                 return
         price = factor * market_price
@@ -371,14 +395,14 @@ def sale_unit(self, unit_id, price=None, factor=1):
         'price': price,
         'sale': 1
         }
-    return self.session.post(url, data=data)
+    return self.session.post(url, data=data, mutation='set')
 
 
 def cancel_sale_unit(self, unit_id):
     """Отменить продажу предприятия"""
     
     url = self.domain_ext + 'unit/market/cancel_sale/%s' % unit_id
-    return self.session.get(url)
+    return self.session.get(url, mutation='action')
 
 
 def close_unit(self, unit_id):
@@ -398,4 +422,4 @@ def close_unit(self, unit_id):
         raise ValueError('State enterprises cannot be closed')
     url = self.domain_ext + 'unit/close/%s' % unit_id
     data = {'close_unit': 1}
-    return self.session.post(url, data=data)
\ No newline at end of file
+    return self.session.post(url, data=data, mutation='action')
\ No newline at end of file
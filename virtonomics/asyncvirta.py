@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncVirta:
+    """Asyncio interface to the Virtonomics framework.
+    
+    Exposes the same methods as the wrapped Virta instance, but as
+    coroutine functions. Lazy attributes (units, cities, company, etc., see
+    lazy_attributes of the wrapped class), properties and instance 
+    attributes become awaitables; other names raise AttributeError. 
+    Blocking calls run in a thread pool over the session of the wrapped
+    instance, so all the coroutines share one connection pool and the 
+    framework caches.
+    
+    Arguments:
+        virta (Virta or str): Virta (or MyVirta) instance to wrap, or server 
+            name. In the latter case a new Virta instance is created.
+        max_concurrency (int): Maximal number of blocking calls running at
+            the same time. Defaults to the wrapped instance pool_size.
+        kwargs: Passed to Virta if server name is given.
+    
+    Example:
+        async def main():
+            v = AsyncVirta('olga')
+            labs = (await v.units)(unit_class_kind='lab')
+            summaries = await asyncio.gather(
+                *(v.unit_summary(lab_id) for lab_id in labs))
+            await v.close()
+        
+        asyncio.run(main())
+    """
+    
+    def __init__(self, virta, max_concurrency=None, **kwargs):
+        if isinstance(virta, str):
+            from . import Virta
+            virta = Virta(virta, **kwargs)
+        self.virta = virta
+        self.max_concurrency = max_concurrency or virta.pool_size
+        self.executor = ThreadPoolExecutor(self.max_concurrency)
+        self._session_lock = None
+    
+    def __getattr__(self, attrname):
+        if attrname.startswith('_'):
+            raise AttributeError(attrname)
+        attr = inspect.getattr_static(type(self.virta), attrname, None)
+        if isinstance(attr, (staticmethod, classmethod)) or inspect.isfunction(attr):
+            method = getattr(self.virta, attrname)
+            
+            @functools.wraps(method)
+            async def wrapper(*args, **kwargs):
+                return await self.run(method, *args, **kwargs)
+            
+            return wrapper
+        if (attr is None and attrname not in self.virta.__dict__
+                and attrname not in getattr(self.virta, 'lazy_attributes', ())):
+            raise AttributeError(attrname)
+        return self.run(getattr, self.virta, attrname)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def open_session(self):
+        """Open session once, before any concurrent request is made."""
+        
+        if self._session_lock is None:
+            self._session_lock = asyncio.Lock()
+        async with self._session_lock:
+            if 'session' not in self.virta.__dict__:
+                await self._run_blocking(self.virta.open_session)
+        return self.virta.session
+    
+    async def run(self, func, *args, **kwargs):
+        """Run blocking function in the thread pool."""
+        
+        if 'session' not in self.virta.__dict__:
+            await self.open_session()
+        return await self._run_blocking(func, *args, **kwargs)
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        return await loop.run_in_executor(self.executor, call)
+    
+    async def close(self):
+        """Wait for running calls to complete and close the wrapped instance."""
+        
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.executor.shutdown)
+        await loop.run_in_executor(None, self.virta.quit)
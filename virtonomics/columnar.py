@@ -0,0 +1,539 @@
+"""Columnar records tables backed by NumPy arrays.
+
+A Table stores records (dictionaries with the same fields, like the values
+of v.units or v.cities) by columns: numbers as NumPy arrays, strings as
+categoricals (the distinct strings, interned, and an array of their codes),
+anything else (lists, dictionaries, mixed types) as object arrays. It takes
+a fraction of the memory of the dictionaries and answers aggregate
+questions with vectorised operations:
+
+    from virtonomics.columnar import Table
+    
+    cities = Table.from_dict(v.cities)
+    cities.sum('population', by='country_name')
+    cities(population=ge(10**6), country_name='Украина')
+
+Tables are read-only mappings of keys to records, compatible with Dict:
+they are callable with the same filters (see virtonomics.types) returning
+a Table of the matching records, and have select and view. Records are
+built on access: changing them does not change the table. Missing fields
+and None values are not distinguished, both read as None.
+
+Requires numpy. Set Virta.columnar to load attributes as Tables.
+"""
+
+import sys
+
+import numpy as np
+
+from .types import And, In, Not, Or, Range, condition
+
+
+# Codes dtype of categorical columns
+_codes_dtype = np.int32
+
+
+class Column:
+    """Column of a table: len, value(i), tolist() and take(indices)."""
+    
+    def mask(self, cond):
+        """Boolean array: values satisfying a condition (types.Condition)."""
+        
+        if isinstance(cond, Not):
+            return ~self.mask(cond.condition)
+        if isinstance(cond, And):
+            return np.logical_and.reduce([self.mask(c) for c in cond.conditions])
+        if isinstance(cond, Or):
+            return np.logical_or.reduce([self.mask(c) for c in cond.conditions])
+        result = self._mask(cond)
+        if result is None:
+            result = np.fromiter(map(cond.test, self.tolist()), bool, len(self))
+        return result
+    
+    def _mask(self, cond):
+        """Vectorised mask, or None if the condition is tested value by
+        value."""
+        
+        return None
+
+
+class NumericColumn(Column):
+    """Numbers (and booleans) array with a mask of the missing values."""
+    
+    def __init__(self, data, missing=None):
+        self.data = data
+        self.missing = missing if missing is not None and missing.any() else None
+    
+    @classmethod
+    def build(cls, values, dtype):
+        missing = np.fromiter((v is None for v in values), bool, len(values))
+        filler = dtype(0)
+        data = np.array([filler if v is None else v for v in values], dtype)
+        return cls(data, missing)
+    
+    def __len__(self):
+        return len(self.data)
+    
+    @property
+    def present(self):
+        """Boolean array of the values that are not None."""
+        
+        if self.missing is None:
+            return np.ones(len(self.data), bool)
+        return ~self.missing
+    
+    def value(self, i):
+        if self.missing is not None and self.missing[i]:
+            return None
+        return self.data[i].item()
+    
+    def tolist(self):
+        values = self.data.tolist()
+        if self.missing is not None:
+            for i in np.flatnonzero(self.missing).tolist():
+                values[i] = None
+        return values
+    
+    def take(self, indices):
+        missing = self.missing[indices] if self.missing is not None else None
+        return NumericColumn(self.data[indices], missing)
+    
+    def _mask(self, cond):
+        if isinstance(cond, In):
+            numbers = [v for v in cond.values if isinstance(v, (int, float))]
+            result = np.isin(self.data, numbers) & self.present
+            if None in cond.values and self.missing is not None:
+                result |= self.missing
+            return result
+        if isinstance(cond, Range):
+            bounds = [b for b in (cond.low, cond.high) if b is not None]
+            if not all(isinstance(b, (int, float)) for b in bounds):
+                return np.zeros(len(self.data), bool)
+            result = self.present
+            if cond.low is not None:
+                if cond.low_inclusive:
+                    result &= self.data >= cond.low
+                else:
+                    result &= self.data > cond.low
+            if cond.high is not None:
+                if cond.high_inclusive:
+                    result &= self.data <= cond.high
+                else:
+                    result &= self.data < cond.high
+            return result
+        return None
+    
+    def numbers(self):
+        """Present values as a float or integer array."""
+        
+        if self.missing is None:
+            return self.data
+        return self.data[~self.missing]
+
+
+class CategoricalColumn(Column):
+    """Strings as codes into the list of distinct (interned) strings.
+    Code -1 stands for None."""
+    
+    def __init__(self, categories, codes):
+        self.categories = categories
+        self.codes = codes
+    
+    @classmethod
+    def build(cls, values):
+        categories = []
+        index = {}
+        codes = np.empty(len(values), _codes_dtype)
+        for i, v in enumerate(values):
+            if v is None:
+                codes[i] = -1
+                continue
+            code = index.get(v)
+            if code is None:
+                code = index[v] = len(categories)
+                categories.append(sys.intern(v))
+            codes[i] = code
+        return cls(categories, codes)
+    
+    def __len__(self):
+        return len(self.codes)
+    
+    def value(self, i):
+        code = self.codes[i]
+        return None if code < 0 else self.categories[code]
+    
+    def tolist(self):
+        lookup = self.categories + [None]
+        return [lookup[code] for code in self.codes.tolist()]
+    
+    def take(self, indices):
+        return CategoricalColumn(self.categories, self.codes[indices])
+    
+    def _mask(self, cond):
+        # Test every distinct value once, None last (code -1)
+        hits = [cond.test(c) for c in self.categories] + [cond.test(None)]
+        return np.array(hits, bool)[self.codes]
+
+
+class ObjectColumn(Column):
+    """Arbitrary values (lists, dictionaries, mixed types)."""
+    
+    def __init__(self, data):
+        self.data = data
+    
+    @classmethod
+    def build(cls, values):
+        data = np.empty(len(values), object)
+        for i, value in enumerate(values):
+            data[i] = value
+        return cls(data)
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def value(self, i):
+        return self.data[i]
+    
+    def tolist(self):
+        return self.data.tolist()
+    
+    def take(self, indices):
+        return ObjectColumn(self.data[indices])
+
+
+def column(values):
+    """Column of the fittest kind for a list of values."""
+    
+    kinds = {type(v) for v in values if v is not None}
+    if kinds and kinds <= {str}:
+        return CategoricalColumn.build(values)
+    if kinds == {bool}:
+        return NumericColumn.build(values, np.bool_)
+    if kinds and kinds <= {int, float}:
+        if float in kinds:
+            return NumericColumn.build(values, np.float64)
+        try:
+            return NumericColumn.build(values, np.int64)
+        except OverflowError:
+            pass
+    return ObjectColumn.build(values)
+
+
+class Table:
+    """Records stored by columns.
+    
+    Arguments:
+        keys (Column): Record keys.
+        columns (dict): Field name -> Column.
+    
+    Use from_dict or from_records to build a table.
+    """
+    
+    def __init__(self, keys, columns):
+        self.keys_column = keys
+        self.columns = columns
+        self._positions = None
+    
+    @classmethod
+    def from_records(cls, records, keys=None):
+        """Table of records (dictionaries).
+        
+        Arguments:
+            records (iterable): Records.
+            keys (iterable): Record keys. Defaults to None (positions).
+        """
+        
+        records = list(records)
+        keys = list(keys) if keys is not None else list(range(len(records)))
+        fields = {}
+        for record in records:
+            for field in record:
+                fields[field] = None
+        columns = {field: column([record.get(field) for record in records])
+                   for field in fields}
+        return cls(column(keys), columns)
+    
+    @classmethod
+    def from_dict(cls, mapping):
+        """Table of a dictionary of records (like Dict)."""
+        
+        return cls.from_records(mapping.values(), mapping.keys())
+    
+    # Mapping interface
+    
+    def __len__(self):
+        return len(self.keys_column)
+    
+    def __iter__(self):
+        return iter(self.keys_column.tolist())
+    
+    def __contains__(self, key):
+        try:
+            return key in self.positions
+        except TypeError:
+            return False
+    
+    def __getitem__(self, key):
+        return self.record(self.positions[key])
+    
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+    
+    def keys(self):
+        return self.keys_column.tolist()
+    
+    def values(self):
+        return self.records()
+    
+    def items(self):
+        return list(zip(self.keys_column.tolist(), self.records()))
+    
+    def __eq__(self, other):
+        if isinstance(other, Table):
+            other = dict(other.items())
+        try:
+            return dict(self.items()) == dict(other.items())
+        except AttributeError:
+            return NotImplemented
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return 'Table(%d records, fields: %s)' % (len(self), ', '.join(self.columns))
+    
+    @property
+    def positions(self):
+        """Key -> position of the record (built on first use)."""
+        
+        if self._positions is None:
+            keys = self.keys_column.tolist()
+            self._positions = dict(zip(keys, range(len(keys))))
+        return self._positions
+    
+    def record(self, position):
+        """Record (dictionary) at a position."""
+        
+        return {field: c.value(position) for field, c in self.columns.items()}
+    
+    def records(self):
+        """All the records in order."""
+        
+        columns = [(field, c.tolist()) for field, c in self.columns.items()]
+        return [{field: values[i] for field, values in columns}
+                for i in range(len(self))]
+    
+    def __getstate__(self):
+        return {'keys_column': self.keys_column, 'columns': self.columns}
+    
+    def __setstate__(self, state):
+        self.__init__(state['keys_column'], state['columns'])
+    
+    # Filtering
+    
+    def mask(self, **filters):
+        """Boolean array of the records matching filters."""
+        
+        result = np.ones(len(self), bool)
+        for field, value in filters.items():
+            cond = condition(value)
+            if field in self.columns:
+                result &= self.columns[field].mask(cond)
+            elif not cond.test(None):
+                result[:] = False
+        return result
+    
+    def take(self, indices):
+        """Table of the records at positions."""
+        
+        return Table(self.keys_column.take(indices),
+                     {field: c.take(indices) for field, c in self.columns.items()})
+    
+    def __call__(self, **filters):
+        """Table of the records matching filters (see virtonomics.types)."""
+        
+        return self.take(np.flatnonzero(self.mask(**filters)))
+    
+    view = __call__
+    
+    def select(self, **filters):
+        """Return the unique record matching filters.
+        If not unique or does not exist, return None.
+        """
+        indices = np.flatnonzero(self.mask(**filters))
+        if len(indices) != 1:
+            return None
+        return self.record(indices[0])
+    
+    # Aggregation
+    
+    def column(self, field):
+        """Values of a field as an array (float with nan for missing
+        numbers, object for other columns)."""
+        
+        c = self.columns[field]
+        if isinstance(c, NumericColumn):
+            if c.missing is None:
+                return c.data
+            data = c.data.astype(np.float64)
+            data[c.missing] = np.nan
+            return data
+        return np.array(c.tolist(), object)
+    
+    def _numeric(self, field):
+        c = self.columns[field]
+        if not isinstance(c, NumericColumn):
+            raise TypeError('Field %s is not numeric' % field)
+        return c
+    
+    def groups(self, by):
+        """Group labels and codes of the records by the values of a field.
+        
+        Returns:
+            tuple: (labels list, codes array: label index for every record).
+        """
+        
+        c = self.columns[by]
+        if isinstance(c, CategoricalColumn):
+            codes = c.codes.astype(np.intp)
+            codes[codes < 0] = len(c.categories)
+            return c.categories + [None], codes
+        index = {}
+        codes = np.fromiter((index.setdefault(value, len(index))
+                             for value in c.tolist()), np.intp, len(c))
+        return list(index), codes
+    
+    def group_by(self, field):
+        """Group the records by the values of a field.
+        
+        Returns:
+            dict: Value -> Table of the records having it, in the order of
+                the first records of the groups.
+        """
+        
+        labels, codes = self.groups(field)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(labels))).tolist()
+        starts = [0] + bounds[:-1]
+        groups = [(order[start], labels[i], order[start:end]) 
+                  for i, (start, end) in enumerate(zip(starts, bounds)) if end > start]
+        return {label: self.take(indices) for _, label, indices in sorted(groups, key=lambda g: g[0])}
+    
+    def count(self, field=None, by=None):
+        """Number of records (with the field not None if passed), or dict
+        of numbers per value of by."""
+        
+        if field is None:
+            present = np.ones(len(self), bool)
+        else:
+            present = ~self.columns[field].mask(In([None]))
+        if by is None:
+            return int(present.sum())
+        labels, codes = self.groups(by)
+        counts = np.bincount(codes[present], minlength=len(labels))
+        groups = np.bincount(codes, minlength=len(labels))
+        return {labels[i]: n for i, n in enumerate(counts.tolist()) if groups[i]}
+    
+    def sum(self, field, by=None):
+        """Sum of a numeric field, or dict of sums per value of by."""
+        
+        c = self._numeric(field)
+        if by is None:
+            return c.numbers().sum().item()
+        labels, codes = self.groups(by)
+        present = c.present
+        sums = np.bincount(codes[present], weights=c.data[present],
+                           minlength=len(labels))
+        counts = np.bincount(codes, minlength=len(labels))
+        if c.data.dtype.kind in 'iub':
+            sums = sums.round().astype(np.int64)
+        return {labels[i]: s for i, s in enumerate(sums.tolist()) if counts[i]}
+    
+    def mean(self, field, by=None):
+        """Mean of a numeric field (None if no values), or dict of means per
+        value of by."""
+        
+        c = self._numeric(field)
+        if by is None:
+            numbers = c.numbers()
+            return numbers.mean().item() if len(numbers) else None
+        return self.weighted_mean(field, None, by)
+    
+    def _weighted(self, field, weight):
+        """Values and weights arrays (where both are present) and the mask
+        of the records they come from."""
+        
+        c = self._numeric(field)
+        if weight is None:
+            present = c.present
+            return c.data[present], np.ones(present.sum()), present
+        w = self._numeric(weight)
+        present = c.present & w.present
+        return c.data[present], w.data[present], present
+    
+    def weighted_mean(self, field, weight, by=None):
+        """Mean of a numeric field weighted by another one (None if the
+        total weight is 0), or dict of means per value of by. Weight None
+        weighs the values equally."""
+        
+        values, weights, present = self._weighted(field, weight)
+        if by is None:
+            total = weights.sum()
+            return (values * weights).sum().item() / total if total else None
+        labels, all_codes = self.groups(by)
+        codes = all_codes[present]
+        sums = np.bincount(codes, weights=values * weights, minlength=len(labels))
+        totals = np.bincount(codes, weights=weights, minlength=len(labels))
+        groups = set(all_codes.tolist())
+        return {labels[i]: s / t if t else None for i, (s, t) 
+                in enumerate(zip(sums.tolist(), totals.tolist())) if i in groups}
+    
+    def std(self, field, weight=None, by=None):
+        """Population standard deviation of a numeric field, weighted by 
+        weight if passed (None if no values), or dict of deviations per 
+        value of by."""
+        
+        values, weights, present = self._weighted(field, weight)
+        if by is None:
+            total = weights.sum()
+            if not total:
+                return None
+            mean = (values * weights).sum() / total
+            return (((values - mean)**2 * weights).sum() / total).item() ** 0.5
+        labels, all_codes = self.groups(by)
+        codes = all_codes[present]
+        totals = np.bincount(codes, weights=weights, minlength=len(labels))
+        sums = np.bincount(codes, weights=values * weights, minlength=len(labels))
+        means = np.divide(sums, totals, out=np.zeros(len(labels)), where=totals > 0)
+        squares = np.bincount(codes, weights=(values - means[codes])**2 * weights,
+                              minlength=len(labels))
+        groups = set(all_codes.tolist())
+        return {labels[i]: (q / t) ** 0.5 if t else None for i, (q, t) 
+                in enumerate(zip(squares.tolist(), totals.tolist())) if i in groups}
+    
+    def min(self, field):
+        """Minimum of a numeric field (None if no values)."""
+        
+        numbers = self._numeric(field).numbers()
+        return numbers.min().item() if len(numbers) else None
+    
+    def max(self, field):
+        """Maximum of a numeric field (None if no values)."""
+        
+        numbers = self._numeric(field).numbers()
+        return numbers.max().item() if len(numbers) else None
+    
+    @property
+    def nbytes(self):
+        """Memory taken by the arrays and the categories (approximately)."""
+        
+        total = 0
+        for c in [self.keys_column, *self.columns.values()]:
+            if isinstance(c, CategoricalColumn):
+                total += c.codes.nbytes + sum(sys.getsizeof(s) for s in c.categories)
+            elif isinstance(c, NumericColumn):
+                total += c.data.nbytes + (c.missing.nbytes if c.missing is not None else 0)
+            else:
+                total += c.data.nbytes + sum(sys.getsizeof(v) for v in c.data)
+        return total
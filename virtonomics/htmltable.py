@@ -0,0 +1,226 @@
+"""Declarative extraction of typed records from HTML report tables.
+
+A Table is defined by an expression locating the rows and a list of
+Column specs. Every row is walked once: its cells (td children) are
+collected in a single pass, and every column value is read from its cell,
+cleaned and converted to the column type.
+
+Example:
+    table = Table('service_history.rows', [
+        Column('price', 2, 'money', deep=True, required=False),
+        Column('sold', 3, 'int', required=False, default=0),
+        ])
+    records = table.records(page)
+
+Column types:
+    'str': Text stripped of leading and trailing whitespace.
+    'int': Integer. Spaces, brackets, '$' and '%' are ignored ('[1 234]').
+    'float': Float, cleaned the same way.
+    'money': Float, e.g. '$1 234.56'.
+    'percent': Fraction, e.g. '12.3 %' -> 0.123.
+    Any callable taking the raw text.
+
+Values that cannot be converted (e.g. 'неизв.') become the column default
+(None unless set).
+"""
+
+from .xpath import xpaths
+
+
+# Characters dropped from numbers: '$1 234.56', '[1 000]', '12.3 %'
+_number_junk = str.maketrans('', '', ' \xa0\t\r\n$%[]')
+
+
+def to_int(text):
+    return int(text.translate(_number_junk))
+
+
+def to_float(text):
+    return float(text.translate(_number_junk))
+
+
+def to_percent(text):
+    return float(text.translate(_number_junk)) / 100
+
+
+types = {
+    'str': str.strip,
+    'int': to_int,
+    'float': to_float,
+    'money': to_float,
+    'percent': to_percent,
+    }
+
+
+def first_text(element):
+    """First text node child of an element (like text()[0] in xpath)."""
+    
+    if element.text is not None:
+        return element.text
+    for child in element:
+        if child.tail is not None:
+            return child.tail
+    return None
+
+
+class Column:
+    """Table column spec.
+    
+    Arguments:
+        name (str): Record key.
+        index (int): Cell position in the row (1-based, like td[n] in
+            xpath). If None, the whole row is used as the cell.
+        type (str or callable): Value type (see module docstring).
+            Defaults to 'str'.
+        path: Element inside the cell holding the value. ElementPath string
+            (e.g. 'a', './/input') or compiled XPath (its first result is
+            taken, which may also be an attribute or text string). If None,
+            the cell itself holds the value.
+        attr (str): Read the value from this attribute of the element
+            instead of its text.
+        label (str): Read the value from a subtable inside the cell: the
+            text of the second cell in the first subtable row with the
+            first cell containing label (e.g. 'Количество').
+        deep (bool): If True, the first text node among all the element
+            descendants is taken, otherwise only the element own text
+            nodes are considered. Defaults to False.
+        many (bool): If True, the value is the list of all the elements 
+            found by path, converted one by one. Defaults to False.
+        required (bool): If True, rows without the value are skipped.
+            Otherwise the default is used. Defaults to True.
+        default: Value of missing and unconvertible cells. Defaults to None.
+    """
+    
+    def __init__(self, name, index=None, type='str', path=None, attr=None,
+                 label=None, deep=False, many=False, required=True, 
+                 default=None):
+        self.name = name
+        self.index = index
+        self.convert = types[type] if isinstance(type, str) else type
+        self.path = path
+        self.attr = attr
+        self.label = label
+        self.deep = deep
+        self.many = many
+        self.required = required
+        self.default = default
+    
+    def raw(self, cell, subtables):
+        """Raw text value of the column in a given cell, or None."""
+        
+        if self.label is not None:
+            if cell not in subtables:
+                subtables[cell] = subtable(cell)
+            for key, value in subtables[cell]:
+                if self.label in key:
+                    return value
+            return None
+        if self.many:
+            if isinstance(self.path, str):
+                found = cell.findall(self.path)
+            else:
+                found = self.path(cell)
+            return [self.text(element) for element in found]
+        element = cell
+        if self.path is not None:
+            if isinstance(self.path, str):
+                element = cell.find(self.path)
+            else:
+                found = self.path(cell)
+                element = found[0] if found else None
+        return self.text(element)
+    
+    def text(self, element):
+        if element is None or isinstance(element, str):
+            return element
+        if self.attr:
+            return element.get(self.attr)
+        if self.deep:
+            return next(element.itertext(), None)
+        return first_text(element)
+    
+    def value(self, text):
+        if self.many:
+            return [self.convert(item) for item in text]
+        try:
+            return self.convert(text)
+        except (ValueError, TypeError, AttributeError, IndexError):
+            return self.default
+
+
+def subtable(cell):
+    """(label, value) pairs of the tables nested in a cell.
+    
+    Label is the text content of the first cell in a row, value is the
+    first text node of the second one.
+    """
+    
+    result = []
+    for table in cell.iter('table'):
+        for row in table.iter('tr'):
+            cells = [td for td in row if td.tag == 'td']
+            if len(cells) >= 2:
+                result.append((cells[0].text_content(), first_text(cells[1])))
+    return result
+
+
+class Table:
+    """HTML table spec.
+    
+    Arguments:
+        rows (str or callable): Name of the xpath in the registry (see
+            virtonomics.xpath) or callable returning row elements of a
+            page tree.
+        spec (list): Column specs.
+    """
+    
+    def __init__(self, rows, spec):
+        self.rows = xpaths[rows] if isinstance(rows, str) else rows
+        self.spec = spec
+    
+    def records(self, page, rows=None):
+        """Extract table rows.
+        
+        Arguments:
+            page: Page tree (see Session.tree).
+            rows (list): Row elements, if already located. Defaults to None.
+        
+        Returns:
+            list: Records (dict column name -> value) in the rows order.
+        """
+        
+        if rows is None:
+            rows = self.rows(page)
+        result = []
+        for row in rows:
+            cells = [td for td in row if td.tag == 'td']
+            subtables = {}
+            record = {}
+            for column in self.spec:
+                if column.index is None:
+                    cell = row
+                elif column.index <= len(cells):
+                    cell = cells[column.index - 1]
+                else:
+                    cell = None
+                text = column.raw(cell, subtables) if cell is not None else None
+                if text is None:
+                    if column.required:
+                        break
+                    record[column.name] = column.default
+                else:
+                    record[column.name] = column.value(text)
+            else:
+                result.append(record)
+        return result
+    
+    def columns(self, page, rows=None):
+        """Extract table columns.
+        
+        Returns:
+            dict: Column name -> list of values.
+        """
+        
+        records = self.records(page, rows)
+        return {column.name: [record[column.name] for record in records]
+                for column in self.spec}
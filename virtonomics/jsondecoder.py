@@ -1,39 +1,578 @@
+"""JSON decoding with numeral strings conversion.
+
+The game API returns most numbers as strings ('123', '0.5') and booleans
+as 't'/'f'. Decoder and loads convert them, including integer dictionary
+keys.
+
+loads uses the fastest available backend: orjson or ujson (C libraries) if
+importable, the standard json module otherwise. C backends parse the
+document, which is then converted by a walk. The standard backend converts 
+while parsing (see Decoder). Results are the same with every backend: 
+documents a C backend rejects (e.g. NaN literals) or may decode 
+differently (integers beyond 64 bits) are decoded by the standard backend.
+The backend may be chosen by the VIRTA_JSON_BACKEND environment variable
+(if it names a backend that is not installed, a warning is issued and the
+fastest available one is used) or set_backend.
+
+With lazy=True, objects are decoded as LazyRecord: numeral strings are
+converted when a field is read, not while decoding.
+
+iter_items decodes a document incrementally, yielding the records of its
+'data' field as the body chunks arrive (standard backend only).
+"""
+
+import codecs
 import json
+import os
+import re
+import warnings
+from collections.abc import ItemsView, ValuesView
+
+
+# First characters of the strings int() or float() may accept, besides
+# non ASCII decimal digits and spaces: digits, signs, '.5', 'nan', 'inf'
+_number_starts = frozenset('0123456789+-.nNiI \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f')
+_int_starts = frozenset('0123456789+- \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f')
+
+
+def _string(s):
+    """Convert string value to bool, int or float if possible."""
+    
+    if s == 't':
+        return True
+    if s == 'f':
+        return False
+    c = s[:1]
+    if c in _number_starts or c > '\x7f' and (c.isdecimal() or c.isspace()):
+        try:
+            # int() never accepts '.': skip it for decimal fractions
+            return int(s) if '.' not in s else float(s)
+        except ValueError:
+            try:
+                return float(s)
+            except ValueError:
+                pass
+    return s
+
+
+def _key(k):
+    """Convert dictionary key to int if possible."""
+    
+    c = k[:1]
+    if c in _int_starts or c > '\x7f' and (c.isdecimal() or c.isspace()):
+        try:
+            return int(k)
+        except ValueError:
+            pass
+    return k
+
+
+def _list(items):
+    """Convert list items in place (dictionaries are already converted)."""
+    
+    for i, v in enumerate(items):
+        t = type(v)
+        if t is str:
+            items[i] = _string(v)
+        elif t is list:
+            _list(v)
+    return items
+
+
+def _object(pairs):
+    """object_pairs_hook converting keys and values of a parsed object."""
+    
+    result = {}
+    for k, v in pairs:
+        t = type(v)
+        if t is str:
+            # Inlined _string, the hot spot of decoding
+            if v == 't':
+                v = True
+            elif v == 'f':
+                v = False
+            else:
+                c = v[:1]
+                if (c in _number_starts 
+                        or c > '\x7f' and (c.isdecimal() or c.isspace())):
+                    try:
+                        v = int(v) if '.' not in v else float(v)
+                    except ValueError:
+                        try:
+                            v = float(v)
+                        except ValueError:
+                            pass
+        elif t is list:
+            _list(v)
+        c = k[:1]
+        if c in _int_starts or c > '\x7f' and (c.isdecimal() or c.isspace()):
+            try:
+                k = int(k)
+            except ValueError:
+                pass
+        result[k] = v
+    if len(result) < len(pairs):
+        # Repeated keys: the last value wins before the keys are converted
+        result = {}
+        for k, v in dict(pairs).items():
+            result[_key(k)] = _string(v) if type(v) is str else v
+    return result
+
+
+_missing = object()
+_dict_get = dict.get
+
+
+class LazyRecord(dict):
+    """Decoded JSON object converting numeral string values on access.
+    
+    Keys are converted while decoding, values are kept as decoded and 
+    converted (see loads) when read for the first time. Converted values 
+    replace the stored ones. All the reading methods (get, items, values, 
+    comparison, copy, dict(record), json.dumps, pickle) return converted 
+    values, so the record can be used as a regular dictionary.
+    
+    Note:
+        Strings assigned to the record are converted on access as well.
+    """
+    
+    __slots__ = ()
+    
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if type(value) is str:
+            value = _string(value)
+            if type(value) is not str:
+                dict.__setitem__(self, key, value)
+        return value
+    
+    def __iter__(self):
+        # Defined to keep dict(record) and {**record} from copying the
+        # stored values directly
+        return dict.__iter__(self)
+    
+    def get(self, key, default=None):
+        value = _dict_get(self, key, _missing)
+        if value is _missing:
+            return default
+        if type(value) is str:
+            value = _string(value)
+            if type(value) is not str:
+                dict.__setitem__(self, key, value)
+        return value
+    
+    def items(self):
+        return ItemsView(self)
+    
+    def values(self):
+        return ValuesView(self)
+    
+    def convert(self):
+        """Convert all the values now. Returns the record."""
+        
+        for key, value in dict.items(self):
+            if type(value) is str:
+                value = _string(value)
+                if type(value) is not str:
+                    dict.__setitem__(self, key, value)
+        return self
+    
+    def __eq__(self, other):
+        if isinstance(other, LazyRecord):
+            other.convert()
+        return dict.__eq__(self.convert(), other)
+    
+    def __ne__(self, other):
+        if isinstance(other, LazyRecord):
+            other.convert()
+        return dict.__ne__(self.convert(), other)
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return dict.__repr__(self.convert())
+    
+    def copy(self):
+        return LazyRecord(self)
+    
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            dict.__delitem__(self, key)
+            return value
+        return dict.pop(self, key, *default)
+    
+    def popitem(self):
+        key, value = dict.popitem(self)
+        return key, _string(value) if type(value) is str else value
+    
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        return dict.setdefault(self, key, default)
+
+
+def _lazy_object(pairs):
+    """object_pairs_hook building LazyRecord (keys and lists converted)."""
+    
+    convert_keys = False
+    for k, v in pairs:
+        if type(v) is list:
+            _list(v)
+        c = k[:1]
+        if c in _int_starts or c > '\x7f' and (c.isdecimal() or c.isspace()):
+            convert_keys = True
+    record = LazyRecord(pairs)
+    if convert_keys:
+        # Repeated keys: the last value wins before the keys are converted
+        record = LazyRecord([(_key(k), v) for k, v in dict.items(record)])
+    return record
 
 
 class Decoder(json.JSONDecoder):
     """JSON decoter.
     Converts numeral strings to numbers, including dictionaries keys.
-    """
     
+    Conversion is done while parsing: every object is converted as soon as
+    it is parsed (object_pairs_hook), together with the lists it holds.
+    Only a top level list or string is converted afterwards.
+    
+    Arguments:
+        lazy (bool): If True, objects are decoded as LazyRecord and their
+            values are converted on access. Defaults to False.
+    """
+
+    def __init__(self, lazy=False, **kwargs):
+        kwargs['object_pairs_hook'] = _lazy_object if lazy else _object
+        kwargs.pop('object_hook', None)
+        super().__init__(**kwargs)
+
     def decode(self, s):
         result = super().decode(s)
-        return self._decode(result)
+        t = type(result)
+        if t is str:
+            return _string(result)
+        if t is list:
+            return _list(result)
+        return result
 
-    def _decode(self, o):
-        if isinstance(o, str):
-            if o == 't':
-                return True
-            elif o == 'f':
-                return False
-            else:
-                try:
-                    return int(o)
-                except ValueError:
-                    try:
-                        return float(o)
-                    except ValueError:
-                        return o
-        elif isinstance(o, dict):
-            result = {}
-            for k, v in o.items():
+
+class _Inexact(ValueError):
+    """Document a C backend may have decoded differently."""
+
+
+# C backends turn integers beyond 64 bits into floats. Such documents (rare)
+# are left to the standard backend.
+_max_exact = 2.0**63
+
+
+def _walk(o):
+    """Convert a document decoded without hooks (by a C backend)."""
+    
+    t = type(o)
+    if t is dict:
+        result = {}
+        for k, v in o.items():
+            t = type(v)
+            if t is str:
+                # Inlined _string, as in _object
+                if v == 't':
+                    v = True
+                elif v == 'f':
+                    v = False
+                else:
+                    c = v[:1]
+                    if (c in _number_starts 
+                            or c > '\x7f' and (c.isdecimal() or c.isspace())):
+                        try:
+                            v = int(v) if '.' not in v else float(v)
+                        except ValueError:
+                            try:
+                                v = float(v)
+                            except ValueError:
+                                pass
+            elif t is dict or t is list:
+                v = _walk(v)
+            elif t is float and not -_max_exact < v < _max_exact:
+                raise _Inexact
+            c = k[:1]
+            if c in _int_starts or c > '\x7f' and (c.isdecimal() or c.isspace()):
                 try:
                     k = int(k)
                 except ValueError:
                     pass
-                result[k] = self._decode(v)
-            return result
-        elif isinstance(o, list):
-            return [self._decode(v) for v in o]
-        else:
-            return o
\ No newline at end of file
+            result[k] = v
+        return result
+    if t is list:
+        return [_string(v) if type(v) is str else _walk(v) for v in o]
+    if t is str:
+        return _string(o)
+    if t is float and not -_max_exact < o < _max_exact:
+        raise _Inexact
+    return o
+
+
+def _lazy_walk(o):
+    """Wrap objects of a document decoded by a C backend in LazyRecord."""
+    
+    t = type(o)
+    if t is dict:
+        record = LazyRecord(o)
+        convert_keys = False
+        for k, v in o.items():
+            t = type(v)
+            if t is dict or t is list:
+                dict.__setitem__(record, k, _lazy_walk(v))
+            elif t is float and not -_max_exact < v < _max_exact:
+                raise _Inexact
+            c = k[:1]
+            if c in _int_starts or c > '\x7f' and (c.isdecimal() or c.isspace()):
+                convert_keys = True
+        if convert_keys:
+            record = LazyRecord([(_key(k), v) for k, v in dict.items(record)])
+        return record
+    if t is list:
+        return [_string(v) if type(v) is str else _lazy_walk(v) for v in o]
+    if t is str:
+        return _string(o)
+    if t is float and not -_max_exact < o < _max_exact:
+        raise _Inexact
+    return o
+
+
+def _json_loads(data):
+    return json.loads(data, cls=Decoder)
+
+
+# Available backends in the order of preference
+backends = {}
+_parsers = {}  # C backends parsing functions
+try:
+    import orjson
+    _parsers['orjson'] = orjson.loads
+except ImportError:
+    pass
+try:
+    import ujson
+    _parsers['ujson'] = ujson.loads
+except ImportError:
+    pass
+for _name, _parse in _parsers.items():
+    backends[_name] = lambda data, parse=_parse: _walk(parse(data))
+backends['json'] = _json_loads
+
+_backend = 'json'
+
+
+def set_backend(name=None):
+    """Choose JSON backend.
+    
+    Arguments:
+        name (str): 'orjson', 'ujson' or 'json'. Defaults to None (the 
+            fastest available).
+    
+    Raises:
+        ValueError: If the backend is not available.
+    """
+    
+    global _backend
+    if name is None:
+        name = next(iter(backends))
+    if name not in backends:
+        raise ValueError('JSON backend %s is not available (available: %s)' 
+                         % (name, ', '.join(backends)))
+    _backend = name
+
+
+def get_backend():
+    """Name of the current JSON backend."""
+    
+    return _backend
+
+
+try:
+    set_backend(os.environ.get('VIRTA_JSON_BACKEND') or None)
+except ValueError as error:
+    # Not installed here: fall back rather than break the import
+    warnings.warn('%s, using %s' % (error, next(iter(backends))))
+    set_backend()
+
+
+def loads(data, lazy=False):
+    """Decode JSON document with numeral strings conversion.
+    
+    Arguments:
+        data (bytes or str): JSON document, e.g. response.content. Bytes
+            are decoded as UTF-8/16/32 (detected), without the response
+            encoding guessing done by requests.Response.json.
+        lazy (bool): If True, objects are decoded as LazyRecord, converting
+            values on access. Defaults to False.
+    
+    Raises:
+        ValueError: If data is not a valid JSON document.
+    """
+    
+    if _backend != 'json':
+        try:
+            if lazy:
+                return _lazy_walk(_parsers[_backend](data))
+            return backends[_backend](data)
+        except ValueError:
+            pass  # the standard backend decides
+    if lazy:
+        return json.loads(data, cls=Decoder, lazy=True)
+    return _json_loads(data)
+
+
+_whitespace = re.compile(r'[ \t\n\r]*')
+# Characters a number can go on with (2|.5, 1|e5, 1e|-5)
+_number_tail = re.compile(r'[0-9.eE+\-]*')
+
+
+class _Stream:
+    """JSON text read from an iterable of byte chunks (UTF-8).
+    
+    Only the text not consumed yet is kept in memory.
+    """
+    
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.done = False
+    
+    def more(self):
+        """Read the next chunk. Return False at the end of the document."""
+        
+        if self.done:
+            return False
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        for chunk in self.chunks:
+            text = self.decoder.decode(chunk)
+            if text:
+                self.text += text
+                return True
+        self.text += self.decoder.decode(b'', final=True)
+        self.done = True
+        return True
+    
+    def error(self, message):
+        return json.JSONDecodeError(message, self.text, self.pos)
+    
+    def peek(self):
+        """Next non whitespace character ('' at the end of the document)."""
+        
+        while True:
+            self.pos = _whitespace.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ''
+    
+    def expect(self, characters):
+        """Consume one of the characters and return it."""
+        
+        c = self.peek()
+        if not c or c not in characters:
+            raise self.error('Expecting %s' % ' or '.join(map(repr, characters)))
+        self.pos += 1
+        return c
+    
+    def value(self, decoder):
+        """Decode the next value."""
+        
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # Value may be incomplete
+                if not self.more():
+                    raise
+                continue
+            if (type(value) in (int, float) and not self.done
+                    and _number_tail.fullmatch(self.text, end) and self.more()):
+                continue  # number may go on in the next chunk
+            self.pos = end
+            return value
+    
+    def key(self, decoder):
+        """Decode the next object key and the colon following it."""
+        
+        if self.peek() != '"':
+            raise self.error('Expecting property name enclosed in double quotes')
+        key = self.value(decoder)
+        self.expect(':')
+        return key
+    
+    def members(self, decoder):
+        """Yield (key, value) pairs of the next object, or (index, value) 
+        pairs of the next array."""
+        
+        closing = '}' if self.expect('{[') == '{' else ']'
+        if self.peek() == closing:
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            if closing == '}':
+                key = self.key(decoder)
+            else:
+                key = index
+                index += 1
+            yield key, self.value(decoder)
+            if self.expect(',' + closing) == closing:
+                return
+
+
+def iter_items(chunks, field='data', lazy=False):
+    """Decode JSON document incrementally, yielding its records.
+    
+    Records are decoded (with numeral strings conversion) and yielded one 
+    by one as soon as they are complete, so the whole document is never 
+    held in memory. Other fields (e.g. 'info') are decoded and dropped.
+    
+    Arguments:
+        chunks (iterable): Document as byte chunks (UTF-8), e.g. 
+            response.iter_content(65536) of a streamed response.
+        field (str): Field of the top level object holding the records
+            (an object or an array). If the document is an array, its items
+            are the records. Defaults to 'data'.
+        lazy (bool): If True, records are decoded as LazyRecord. Defaults
+            to False.
+    
+    Yields:
+        tuple: (key, record) pairs. Keys are converted like dictionary keys
+            by loads; array items are indexed by their positions.
+    
+    Raises:
+        ValueError: If the document is not valid JSON. Records preceding 
+            the error are yielded.
+    """
+    
+    stream = _Stream(chunks)
+    decoder = Decoder(lazy=lazy)
+    if stream.peek() == '[':
+        members = stream.members(decoder)
+    else:
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            if stream.key(decoder) == field and stream.peek() in ('{', '['):
+                members = stream.members(decoder)
+                break
+            stream.value(decoder)  # other field
+            if stream.expect(',}') == '}':
+                return
+    for key, value in members:
+        if type(key) is str:
+            key = _key(key)
+        t = type(value)
+        if t is str:
+            value = _string(value)
+        elif t is list:
+            _list(value)
+        yield key, value
@@ -0,0 +1,225 @@
+"""Compact records with __slots__.
+
+API records (units, cities, offers, contracts etc.) are decoded as dicts,
+which take several hundred bytes each. A slotted record stores the values
+of a fixed set of fields in a plain array instead: a third to a half of the
+memory. Record types are generated per entity and field set, so records
+of the same API url share the type:
+
+    from virtonomics.records import compact
+    
+    units = compact(units, 'unit')
+    unit = units[unit_id]
+    unit.size  # fast attribute access
+    unit['size'], unit.get('name')  # dictionary interface
+
+Records are mutable mappings. Fields outside of the field set can still be
+added (unit['total'] = 0): they are kept in a small dict of the record.
+Attribute access is the fastest way to read a field, as fast as a dict
+lookup, while unit['size'] is a few times slower than on a dict. Loops
+over many records read their fields with getter, which works for records
+of either kind, or copy the fields they need into dicts once:
+
+    get = getter(units.values(), 'size', 'city_id')
+    for unit in units.values():
+        size, city_id = get(unit)
+
+Records are not dict instances: isinstance(unit, dict) is False (test for
+collections.abc.Mapping instead) and json.dumps(unit) raises TypeError 
+(dump dict(unit)).
+
+Set Virta.compact_records to decode API records as compact records.
+"""
+
+import keyword
+from collections.abc import MutableMapping
+from operator import attrgetter, itemgetter
+
+
+class Record(MutableMapping):
+    """Base of the generated record types (see record_type).
+    
+    Class attributes:
+        entity (str): Entity name (e.g. 'unit').
+        fields (tuple): Fields stored in slots.
+        extra_fields (tuple): Fields of the field set that can not be slot
+            names (e.g. not identifiers), stored in the extra dict.
+    """
+    
+    __slots__ = ('_extra',)
+    entity = 'record'
+    fields = ()
+    extra_fields = ()
+    _getters = {}
+    
+    def __getitem__(self, key):
+        try:
+            return self._getters[key](self)
+        except AttributeError:
+            raise KeyError(key) from None  # field deleted
+        except KeyError:
+            try:
+                return self._extra[key]
+            except AttributeError:
+                raise KeyError(key) from None
+    
+    def get(self, key, default=None):
+        try:
+            return self._getters[key](self)
+        except KeyError:
+            try:
+                return self._extra.get(key, default)
+            except AttributeError:
+                return default
+        except AttributeError:
+            return default
+    
+    def __contains__(self, key):
+        if key in self._getters:
+            return hasattr(self, key)
+        try:
+            return key in self._extra
+        except AttributeError:
+            return False
+    
+    def __setitem__(self, key, value):
+        if key in self._getters:
+            setattr(self, key, value)
+            return
+        try:
+            self._extra[key] = value
+        except AttributeError:
+            self._extra = {key: value}
+    
+    def __delitem__(self, key):
+        if key in self._getters:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        try:
+            del self._extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __iter__(self):
+        for field in self.fields:
+            if hasattr(self, field):
+                yield field
+        extra = getattr(self, '_extra', None)
+        if extra:
+            yield from extra
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, dict(self.items()))
+    
+    def copy(self):
+        return compact_record(self.entity, dict(self.items()))
+    
+    def __reduce__(self):
+        return compact_record, (self.entity, dict(self.items()))
+
+
+# (entity, field set) -> record type
+_types = {}
+
+
+def record_type(entity, fields):
+    """Record type of an entity with a given field set (cached).
+    
+    Arguments:
+        entity (str): Entity name, e.g. 'unit'. Used in the type name.
+        fields (tuple): Field names in the order of the constructor
+            arguments.
+    
+    Returns:
+        type: Record subclass. Constructed with the field values as
+            positional arguments.
+    """
+    
+    key = entity, fields
+    if key in _types:
+        return _types[key]
+    slots = tuple(f for f in fields if isinstance(f, str) and f.isidentifier()
+                  and not keyword.iskeyword(f) and not hasattr(Record, f))
+    extra = tuple(f for f in fields if f not in slots)
+    # Constructor taking the values positionally (like namedtuple)
+    arguments = ['_%d' % i for i in range(len(fields))]
+    body = ['    self.%s = %s' % (f, a) for f, a in zip(fields, arguments) if f in slots]
+    if extra:
+        body.append('    self._extra = {%s}' % ', '.join(
+            '%r: %s' % (f, a) for f, a in zip(fields, arguments) if f in extra))
+    source = 'def __init__(self, %s):\n%s\n' % (
+        ', '.join(arguments), '\n'.join(body) or '    pass')
+    namespace = {}
+    exec(source, namespace)
+    name = ''.join(part.title() for part in entity.split('_')) + 'Record'
+    _types[key] = type(name, (Record,), {
+        '__slots__': slots,
+        '__init__': namespace['__init__'],
+        'entity': entity,
+        'fields': slots,
+        'extra_fields': extra,
+        '_getters': {f: attrgetter(f) for f in slots},
+        })
+    return _types[key]
+
+
+def compact_record(entity, record):
+    """Compact record of an entity from a mapping."""
+    
+    return record_type(entity, tuple(record))(*record.values())
+
+
+def getter(records, *fields):
+    """Fast getter of fields of records.
+    
+    Arguments:
+        records (iterable): Records to read (compact records or dicts), 
+            iterated once to check their types.
+        *fields (str): Field names.
+    
+    Returns:
+        callable: Function of a record returning the field value (a tuple
+            of the values if several fields are passed): attrgetter if all
+            the records are compact records of the same type having the 
+            fields in slots, itemgetter otherwise. Both raise an error on a
+            missing field.
+    """
+    
+    types = {type(record) for record in records}
+    if len(types) == 1:
+        record_type, = types
+        if (issubclass(record_type, Record) 
+                and all(f in record_type._getters for f in fields)):
+            return attrgetter(*fields)
+    return itemgetter(*fields)
+
+
+def compact(records, entity):
+    """Convert records to compact records.
+    
+    Arguments:
+        records (dict or list): Records (mappings), or a dict of records by
+            id (like Dict), or a list of records (like List). Other values
+            are returned as is.
+        entity (str): Entity name, e.g. 'unit'.
+    
+    Returns:
+        Same type as records, with the mappings replaced by records.
+    """
+    
+    def convert(record):
+        if isinstance(record, dict):
+            return compact_record(entity, record)
+        return record
+    
+    if isinstance(records, dict):
+        return type(records)({k: convert(v) for k, v in records.items()})
+    if isinstance(records, list):
+        return type(records)([convert(r) for r in records])
+    return records
@@ -0,0 +1,212 @@
+"""Record and replay of the game traffic.
+
+A Virta instance created with the record argument writes every request 
+and response to a compact archive (gzipped JSON lines):
+
+    v = MyVirta('olga', record='run.jsonl.gz', cache_dir=None)
+    v.manage_shops()
+    v.quit()
+
+The archive can then be served by a local stand-in game server with
+configurable latency and jitter, so that routines can be benchmarked 
+without network:
+
+    python -m virtonomics.replay run.jsonl.gz --port 8000 --latency 0.1
+
+    v = MyVirta('olga', domain='http://127.0.0.1:8000', cache_dir=None)
+    v.manage_shops()
+
+Request bodies are only stored as hashes, and the login request body (that 
+contains the password) is not stored at all. Cookies are not recorded.
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import http.server
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def request_key(method, path, body):
+    """Key to match requests: (method, path with query, body hash)."""
+    
+    if body and not path.split('?')[0].endswith('/user/login'):
+        if isinstance(body, str):
+            body = body.encode()
+        body = hashlib.sha1(body).hexdigest()
+    else:
+        body = None
+    return method, path, body
+
+
+def local_path(url):
+    parts = urlsplit(url)
+    return parts.path + ('?' + parts.query if parts.query else '')
+
+
+class Recorder:
+    """Writes requests and responses to an archive (thread safe).
+    
+    Arguments:
+        filename (str): Archive file name.
+    """
+    
+    headers = ('Content-Type', 'ETag', 'Last-Modified', 'Location')
+    
+    def __init__(self, filename):
+        self.file = gzip.open(filename, 'wt', encoding='utf-8')
+        self.lock = threading.Lock()
+    
+    def record(self, request, response):
+        method, path, body = request_key(request.method, local_path(request.url), 
+                                         request.body)
+        headers = {k: response.headers[k] for k in self.headers 
+                   if k in response.headers}
+        if 'Location' in headers:
+            headers['Location'] = local_path(headers['Location']) or '/'
+        entry = {
+            'method': method,
+            'path': path,
+            'body': body,
+            'status': response.status_code,
+            'headers': headers,
+            'content': base64.b64encode(response.content).decode(),
+            }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.file.write(line)
+    
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def load(filename):
+    """Read archive.
+    
+    Returns:
+        dict: Maps request keys (see request_key) to the lists of recorded
+            responses, in the order they were recorded.
+    """
+    
+    result = {}
+    with gzip.open(filename, 'rt', encoding='utf-8') as file:
+        for line in file:
+            entry = json.loads(line)
+            entry['content'] = base64.b64decode(entry['content'])
+            key = entry['method'], entry['path'], entry['body']
+            result.setdefault(key, []).append(entry)
+    return result
+
+
+class ReplayServer(http.server.ThreadingHTTPServer):
+    """Local stand-in game server replaying recorded responses.
+    
+    Identical requests get the recorded responses in the recorded order. 
+    Once they are exhausted, the last one is repeated. If the body of a 
+    POST request does not match any recorded one, a response to the same
+    url is served. Unknown urls get 404.
+    
+    Arguments:
+        filename (str): Archive file name.
+        host (str): Defaults to '127.0.0.1'.
+        port (int): Defaults to 0 (any free port).
+        latency (float): Mean response delay in seconds. Defaults to 0.
+        jitter (float): Maximal deviation of the delay from latency. 
+            Defaults to 0.
+        seed: Random seed for the jitter. Defaults to None.
+    
+    Attributes:
+        url (str): Server url, to be passed to Virta as domain.
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, filename, host='127.0.0.1', port=0, latency=0, 
+                 jitter=0, seed=None):
+        self.responses = load(filename)
+        self.served = {}
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        super().__init__((host, port), ReplayHandler)
+        self.url = 'http://%s:%d' % self.server_address[:2]
+    
+    def find(self, method, path, body):
+        key = request_key(method, path, body)
+        with self.lock:
+            if key not in self.responses:
+                key = next((k for k in self.responses if k[:2] == key[:2]), None)
+                if key is None:
+                    return None
+            responses = self.responses[key]
+            n = self.served.get(key, 0)
+            self.served[key] = n + 1
+            delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0, delay))
+        return responses[min(n, len(responses) - 1)]
+    
+    def start(self):
+        """Serve in a background thread."""
+        
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class ReplayHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def respond(self, method):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else None
+        entry = self.server.find(method, self.path, body)
+        if entry is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(entry['status'])
+        for name, value in entry['headers'].items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(entry['content'])))
+        self.end_headers()
+        self.wfile.write(entry['content'])
+    
+    def do_GET(self):
+        self.respond('GET')
+    
+    def do_POST(self):
+        self.respond('POST')
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded game traffic.')
+    parser.add_argument('archive')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0, 
+                        help='mean response delay, seconds')
+    parser.add_argument('--jitter', type=float, default=0, 
+                        help='maximal deviation from latency, seconds')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    server = ReplayServer(args.archive, args.host, args.port, args.latency, 
+                          args.jitter, args.seed)
+    print('Serving %s at %s' % (args.archive, server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
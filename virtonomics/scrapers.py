@@ -0,0 +1,290 @@
+"""Registered HTML scrapers and the process pool running them.
+
+A scraper is a module level function extracting plain data (dicts, lists, 
+strings, numbers) from a page tree. It is registered under a name, together
+with the page region it reads (see Session.tree):
+
+    @scraper('technology_sellers', region='mainContent')
+    def technology_sellers(page):
+        ...
+
+Virta.scrape runs a scraper on a single page. Virta.scrape_many fetches 
+pages in threads and passes the raw response bodies to a pool of worker 
+processes (see ParsePool), so parsing, which holds the GIL, scales across
+cores and the network threads never wait for it.
+
+Scrapers are sent to the workers by reference: they must be importable 
+module level functions, and their arguments and results must be picklable.
+
+Results are cached by ParseCache, keyed by the scraper and the hash of the
+response body: pages fetched again with the same content are not parsed.
+"""
+
+import collections
+import hashlib
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from .transport import page_tree
+
+
+class Scraper:
+    """Registered scraper.
+    
+    Arguments:
+        name (str): Registry name.
+        function (callable): Called as function(page, **kwargs).
+        region (str): Id of the page element the scraper reads. Defaults to
+            None (whole page).
+    """
+    
+    def __init__(self, name, function, region=None):
+        self.name = name
+        self.function = function
+        self.region = region
+        # Results cached by a previous version of the code are not reused
+        code = function.__code__
+        self.version = hashlib.blake2b(code.co_code + repr(code.co_consts).encode(),
+                                       digest_size=8).hexdigest()
+    
+    def __call__(self, content, encoding=None, **kwargs):
+        """Parse page markup and extract data.
+        
+        Returns:
+            tuple: Extracted data, and whether the region was found.
+        """
+        
+        page, found = page_tree(content, self.region, encoding)
+        return self.function(page, **kwargs), found
+
+
+class ScraperRegistry(dict):
+    """Scrapers indexed by names."""
+    
+    def __missing__(self, name):
+        raise KeyError('Unknown scraper %s' % name)
+
+
+scrapers = ScraperRegistry()
+
+
+def scraper(name, region=None):
+    """Decorator registering a scraper. The function is returned unchanged.
+    
+    Arguments:
+        name (str): Registry name.
+        region (str): Id of the page element the scraper reads. Defaults to
+            None (whole page).
+    """
+    
+    def register(function):
+        if name in scrapers:
+            known = scrapers[name].function
+            if (known.__module__, known.__qualname__) != (
+                    function.__module__, function.__qualname__):
+                raise ValueError('Scraper %s is already registered' % name)
+        scrapers[name] = Scraper(name, function, region)
+        return function
+    
+    return register
+
+
+def _ready():
+    return True
+
+
+def _start_context():
+    """Multiprocessing context starting the workers without fork."""
+    
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+class ParsePool:
+    """Worker processes parsing pages with the registered scrapers.
+    
+    Workers are started on the first use (see start).
+    
+    Arguments:
+        processes (int): Number of worker processes. Defaults to None (the 
+            number of CPUs). If 0, pages are parsed in the calling thread.
+    """
+    
+    def __init__(self, processes=None):
+        self.processes = processes
+        self.executor = None
+        self.lock = threading.Lock()
+    
+    def start(self):
+        """Start the workers.
+        
+        Workers are started by a fork server (or spawned where it is not
+        available), never forked from the calling process: forking a 
+        process with live threads (network threads, AsyncVirta executors)
+        may leave locks held in the workers.
+        """
+        
+        with self.lock:
+            if self.processes == 0 or self.executor is not None:
+                return
+            self.executor = ProcessPoolExecutor(self.processes, _start_context())
+            # Start the workers now rather than on the first page
+            self.executor.submit(_ready).result()
+    
+    def submit(self, scraper, content, encoding=None, **kwargs):
+        """Parse page markup with a scraper.
+        
+        Arguments:
+            scraper (str or Scraper): Scraper or its name.
+            content (bytes): Page markup.
+            encoding (str): Page encoding. Defaults to None.
+            kwargs: Passed to the scraper function.
+        
+        Returns:
+            concurrent.futures.Future: Its result is the pair of the 
+                extracted data and whether the region was found.
+        """
+        
+        if isinstance(scraper, str):
+            scraper = scrapers[scraper]
+        if self.processes == 0:
+            future = Future()
+            try:
+                future.set_result(scraper(content, encoding, **kwargs))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        self.start()
+        return self.executor.submit(scraper, content, encoding, **kwargs)
+    
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+class ParseCache:
+    """Results of the scrapers indexed by the hash of the parsed content.
+    
+    Results are stored pickled, so every lookup returns a fresh copy that 
+    the caller may change. The least recently used results are dropped once
+    the size limit is exceeded. If a directory is given, results are also
+    stored there (one file per page) and reused by the next runs.
+    
+    A key covers the scraper name and code (the code of the functions it 
+    calls is not covered: clear the persisted cache when changing them), 
+    its arguments, the page encoding and content.
+    
+    Arguments:
+        size (int): Maximal total size of the pickled results kept in 
+            memory, in bytes.
+        directory (str): Directory to persist the results. Created if does
+            not exist, and made accessible to the owner only (mode 0700):
+            the stored results are unpickled, so whoever can write there
+            can run code in this process. Defaults to None (memory only).
+    
+    Attributes:
+        hits (int): Number of results served from the cache.
+        misses (int): Number of pages that had to be parsed.
+    """
+    
+    def __init__(self, size, directory=None):
+        self.size = size
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, 0o700, exist_ok=True)
+            os.chmod(directory, 0o700)
+        self.entries = collections.OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def key(scraper, content, encoding=None, **kwargs):
+        """Cache key of a page parsed by a scraper."""
+        
+        digest = hashlib.blake2b(content, digest_size=16)
+        digest.update(repr((encoding, sorted(kwargs.items()))).encode())
+        return '%s-%s-%s' % (scraper.name, scraper.version, digest.hexdigest())
+    
+    def filename(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+    
+    def get(self, key):
+        """Return (True, result) if the key is cached, (False, None) otherwise."""
+        
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+        if data is None and self.directory:
+            try:
+                with open(self.filename(key), 'rb') as file:
+                    data = file.read()
+            except OSError:
+                pass
+            else:
+                self.store(key, data)
+        with self.lock:
+            if data is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+        return True, pickle.loads(data)
+    
+    def put(self, key, result):
+        """Store scraper result."""
+        
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        self.store(key, data)
+        if self.directory:
+            filename = self.filename(key)
+            temporary = '%s.%d.%d' % (filename, os.getpid(), threading.get_ident())
+            fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, filename)
+    
+    def store(self, key, data):
+        """Keep pickled result in memory, dropping the oldest ones."""
+        
+        if len(data) > self.size:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.used -= len(self.entries.pop(key))
+            self.entries[key] = data
+            self.used += len(data)
+            while self.used > self.size:
+                _, dropped = self.entries.popitem(last=False)
+                self.used -= len(dropped)
+    
+    def clear(self):
+        """Drop all the results, including the persisted ones."""
+        
+        with self.lock:
+            self.entries.clear()
+            self.used = 0
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith('.pickle'):
+                    os.remove(os.path.join(self.directory, name))
+    
+    def stats(self):
+        """Usage counters: hits, misses, hit_rate, entries, bytes."""
+        
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.used,
+                }
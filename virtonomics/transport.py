@@ -0,0 +1,654 @@
+import collections
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+import requests
+from lxml import html
+from requests.structures import CaseInsensitiveDict
+
+
+class TokenBucket:
+    """Token bucket (thread safe).
+    
+    Tokens are added at a constant rate up to the bucket capacity. Every
+    request takes one token, waiting for it if the bucket is empty. Thus
+    bursts of up to burst requests are allowed, while the sustained rate
+    never exceeds rate requests per second.
+    
+    Arguments:
+        rate (float): Sustained number of requests per second. If None or 0,
+            the rate is not limited, only pauses are respected.
+        burst (int): Bucket capacity. Defaults to 1.
+    """
+    
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Wait for a token and take it."""
+        
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if not self.rate:
+                        return
+                    self.tokens = min(self.burst, 
+                                      self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+    
+    def pause(self, seconds):
+        """Stop giving out tokens for a given number of seconds."""
+        
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0
+            self.updated = max(self.updated, self.paused_until)
+
+
+class RateLimiter:
+    """Per host token buckets.
+    
+    Arguments:
+        rate (float): Sustained number of requests per second per host.
+        burst (int): Maximal burst size per host.
+    """
+    
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+    
+    def bucket(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+    
+    def acquire(self, host):
+        self.bucket(host).acquire()
+    
+    def pause(self, host, seconds):
+        self.bucket(host).pause(seconds)
+
+
+class AIMDLimit:
+    """Adaptive limit of concurrent requests (thread safe).
+    
+    The limit grows additively (by one request per limit successful 
+    responses, i.e. about one per round trip) while the latency stays 
+    close to the lowest latency observed, holds when the latency grows
+    (the server is queueing requests), and is cut multiplicatively on 
+    errors and timeouts.
+    
+    Arguments:
+        initial (int): Initial limit.
+        minimum (int): Lower bound of the limit. Defaults to 1.
+        maximum (int): Upper bound of the limit. Defaults to 32.
+        tolerance (float): Latency is considered flat as long as it stays
+            below tolerance times the baseline. Defaults to 2.
+        decrease (float): Factor applied to the limit on error. Defaults 
+            to 0.5.
+    """
+    
+    def __init__(self, initial, minimum=1, maximum=32, tolerance=2, 
+                 decrease=0.5):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.tolerance = tolerance
+        self.decrease = decrease
+        self.inflight = 0
+        self.baseline = None  # lowest smoothed latency
+        self.latency = None  # smoothed latency
+        self.errors = 0
+        self.condition = threading.Condition()
+    
+    def acquire(self):
+        """Wait until the number of requests in flight is below the limit."""
+        
+        with self.condition:
+            while self.inflight >= int(self.limit):
+                self.condition.wait()
+            self.inflight += 1
+    
+    def release(self, latency=None, error=False):
+        """Register completed request and adjust the limit.
+        
+        Arguments:
+            latency (float): Response time in seconds.
+            error (bool): True if the request failed or timed out.
+        """
+        
+        with self.condition:
+            self.inflight -= 1
+            if error:
+                self.errors += 1
+                self.limit = max(self.minimum, self.limit * self.decrease)
+            elif latency is not None:
+                if self.latency is None:
+                    self.latency = latency
+                else:
+                    self.latency = 0.8 * self.latency + 0.2 * latency
+                if self.baseline is None or self.latency < self.baseline:
+                    self.baseline = self.latency
+                if latency <= self.tolerance * self.baseline:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class ConcurrencyController:
+    """Per endpoint family adaptive concurrency limits.
+    
+    Urls differing only in numbers (ids) belong to the same family, e.g.
+    all unit/view/{id}/trading_hall pages. Every family has its own 
+    AIMDLimit, so slow pages are sent at lower concurrency than fast ones.
+    
+    Arguments:
+        initial (int): Initial limit of every family.
+        kwargs: Passed to AIMDLimit.
+    """
+    
+    def __init__(self, initial, **kwargs):
+        self.initial = initial
+        self.kwargs = kwargs
+        self.limits = {}
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def family(url):
+        """Endpoint family of a url (host and path with numbers masked)."""
+        
+        parts = urlsplit(url)
+        return parts.netloc + re.sub(r'\d+', '{}', parts.path)
+    
+    def get(self, url):
+        """AIMDLimit of the url family."""
+        
+        family = self.family(url)
+        with self.lock:
+            if family not in self.limits:
+                self.limits[family] = AIMDLimit(self.initial, **self.kwargs)
+            return self.limits[family]
+    
+    def snapshot(self):
+        """Current limits, indexed by families."""
+        
+        with self.lock:
+            return {family: int(limit.limit) 
+                    for family, limit in self.limits.items()}
+
+
+class Adapter(requests.adapters.HTTPAdapter):
+    """Transport adapter limiting the request rate and backing off on errors.
+    
+    Requests to every host are throttled by a token bucket. If the server
+    responds with 429 (Too Many Requests) or a 5xx error, the host is
+    paused for the time given in the Retry-After header, or for 
+    exponentially growing time otherwise, and the request is repeated.
+    Server errors are only retried for GET requests, since other requests
+    may have taken effect.
+    
+    If concurrency is passed, the number of requests in flight is limited
+    per endpoint family by the adaptive controller (see 
+    ConcurrencyController), so that parallel code may use many threads 
+    without overloading slow pages.
+    
+    Arguments:
+        rate (float): Sustained number of requests per second per host.
+            Defaults to None (no limit).
+        burst (int): Maximal burst size per host. Defaults to 1.
+        retries (int): Maximal number of repetitions. Defaults to 3.
+        backoff (float): Initial back off time in seconds. Defaults to 1.
+        recorder (replay.Recorder): If passed, every request and response
+            is recorded. Defaults to None.
+        concurrency (int): Initial number of requests in flight per 
+            endpoint family. Defaults to None (no adaptive limits).
+        max_concurrency (int): Upper bound of requests in flight per 
+            endpoint family. Defaults to 32.
+        kwargs: Passed to requests.adapters.HTTPAdapter.
+    """
+    
+    retry_statuses = (429, 500, 502, 503, 504)
+    
+    def __init__(self, rate=None, burst=1, retries=3, backoff=1, recorder=None,
+                 concurrency=None, max_concurrency=32, **kwargs):
+        self.limiter = RateLimiter(rate, burst)
+        self.controller = None
+        if concurrency:
+            self.controller = ConcurrencyController(concurrency, 
+                                                    maximum=max_concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.recorder = recorder
+        super().__init__(**kwargs)
+    
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        limit = self.controller.get(request.url) if self.controller else None
+        attempt = 0
+        while True:
+            if limit:
+                limit.acquire()
+            self.limiter.acquire(host)
+            start = time.monotonic()
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.exceptions.ConnectionError, 
+                    requests.exceptions.Timeout):
+                if limit:
+                    limit.release(error=True)
+                raise
+            except BaseException:
+                if limit:
+                    limit.release()
+                raise
+            status = response.status_code
+            if limit:
+                limit.release(time.monotonic() - start, 
+                              error=status in self.retry_statuses)
+            if (attempt >= self.retries or status not in self.retry_statuses
+                    or status != 429 and request.method != 'GET'):
+                if self.recorder:
+                    self.recorder.record(request, response)
+                return response
+            self.limiter.pause(host, self.retry_delay(response, attempt))
+            response.close()
+            attempt += 1
+    
+    def close(self):
+        super().close()
+        if self.recorder:
+            self.recorder.close()
+    
+    def retry_delay(self, response, attempt):
+        """Seconds to wait before the next attempt."""
+        
+        try:
+            return float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return self.backoff * 2**attempt * random.uniform(1, 1.5)
+
+
+class ResponseCache:
+    """On-disk cache of GET responses keyed by url.
+    
+    Every entry is stored in a separate file and contains the response 
+    body, its validators (ETag and Last-Modified headers), the time it was 
+    stored and a freshness tag.
+    
+    Arguments:
+        directory (str): Cache directory. Created if does not exist.
+    """
+    
+    headers = ('Content-Type', 'ETag', 'Last-Modified')
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+    
+    def filename(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest())
+    
+    def load(self, url):
+        """Return stored entry (dict) or None."""
+        
+        try:
+            with open(self.filename(url), 'rb') as file:
+                meta, content = file.read().split(b'\n', 1)
+        except (OSError, ValueError):
+            return None
+        entry = json.loads(meta)
+        if entry['url'] != url:
+            return None
+        entry['content'] = content
+        return entry
+    
+    def save(self, url, response, tag=None):
+        """Store response body and validators."""
+        
+        entry = {
+            'url': url,
+            'time': time.time(),
+            'tag': tag,
+            'status': response.status_code,
+            'encoding': response.encoding,
+            'headers': {k: response.headers[k] for k in self.headers 
+                        if k in response.headers},
+            }
+        filename = self.filename(url)
+        temp = '%s.%d.%d' % (filename, os.getpid(), threading.get_ident())
+        with open(temp, 'wb') as file:
+            file.write(json.dumps(entry).encode() + b'\n' + response.content)
+        os.replace(temp, filename)
+    
+    @staticmethod
+    def response(entry):
+        """Build requests.Response from a stored entry."""
+        
+        response = requests.Response()
+        response.url = entry['url']
+        response.status_code = entry['status']
+        response.encoding = entry['encoding']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['content']
+        return response
+
+
+id_attribute = re.compile(rb'\sid\s*=\s*["\']?$')
+
+
+def cut_region(content, element_id):
+    """Cut the markup of the element with a given id from a page.
+    
+    Nested elements of the same tag are counted to find the closing tag.
+    Scripts and comments are skipped. Tags are expected in lower case, as
+    the game server writes them.
+    
+    Arguments:
+        content (bytes): Page markup.
+        element_id (str): Element id.
+    
+    Returns:
+        bytes: Element markup, or None if the element is not found or not
+            closed.
+    """
+    
+    value = element_id.encode()
+    position = 0
+    while True:
+        # Plain search for the id is much faster than a regular expression
+        position = content.find(value, position)
+        if position < 0:
+            return None
+        end = position + len(value)
+        if (content[end:end+1] in (b'"', b"'", b' ', b'/', b'>') and 
+                id_attribute.search(content, max(0, position-16), position)):
+            start = content.rfind(b'<', 0, position)
+            if not (inside(content, start, b'<script', b'</script') 
+                    or inside(content, start, b'<!--', b'-->')):
+                break
+        position = end
+    tag = re.match(rb'<([a-zA-Z][a-zA-Z0-9]*)', content[start:start+32])
+    if not tag:
+        return None
+    tag = tag.group(1).lower()
+    # Next position of every marker, advanced only when consumed
+    found = {b'<' + tag: start, b'</' + tag: None, b'<script': None, 
+             b'<!--': None}
+    depth = 0
+    position = start
+    while True:
+        for marker, at in found.items():
+            if at is None or 0 <= at < position:
+                found[marker] = content.find(marker, position)
+        candidates = [(at, marker) for marker, at in found.items() if at >= 0]
+        if not candidates:
+            return None
+        at, marker = min(candidates)
+        position = at + len(marker)
+        if marker == b'<!--' or marker == b'<script':
+            position = content.find(b'-->' if marker == b'<!--' else b'</script', 
+                                    position)
+            if position < 0:
+                return None
+            continue
+        if content[position:position+1].isalnum():
+            continue  # longer tag name, like <divider
+        position = content.find(b'>', position) + 1
+        if position <= 0:
+            return None
+        if marker[1:2] == b'/':
+            depth -= 1
+        elif content[position-2:position-1] != b'/':
+            depth += 1
+        if depth == 0:
+            return content[start:position]
+
+
+def inside(content, position, opening, closing):
+    """Whether position is inside a block (script, comment) of the markup."""
+    
+    block = content.rfind(opening, 0, position)
+    return block >= 0 and content.find(closing, block, position) < 0
+
+
+def page_tree(content, region=None, encoding=None):
+    """Parse page markup (see Session.tree).
+    
+    Arguments:
+        content (bytes): Page markup.
+        region (str): Id of the element to cut and parse instead of the
+            whole page. Defaults to None.
+        encoding (str): Page encoding (see charset), needed to parse a 
+            region. Defaults to None (utf-8).
+    
+    Returns:
+        tuple: Page root or region element, and whether the region was 
+            found (True if no region is requested).
+    """
+    
+    if region:
+        fragment = cut_region(content, region)
+        if fragment is not None:
+            parser = html.HTMLParser(encoding=encoding or 'utf-8')
+            return html.fromstring(fragment, parser=parser), True
+        return html.fromstring(content), False
+    return html.fromstring(content), True
+
+
+def charset(response):
+    """Response character encoding, as declared by the server or the page."""
+    
+    match = re.search(r'charset=([\w-]+)', response.headers.get('Content-Type', ''))
+    if match:
+        return match.group(1)
+    match = re.search(rb'<meta[^>]+charset=["\']?([\w-]+)', response.content[:4096], 
+                      re.IGNORECASE)
+    if match:
+        return match.group(1).decode('ascii')
+    return 'utf-8'
+
+
+class Session(requests.Session):
+    """Requests session with single-flight GET requests.
+    
+    If a GET request for the same url and parameters is already in flight
+    (in another thread), the call waits for it and returns the same 
+    response instead of sending a duplicate request. Requests with any 
+    other arguments (headers, stream, etc.) are always sent.
+    
+    GET requests may also be served from the disk cache (see get).
+    
+    Requests changing the game state are marked by the mutation argument
+    ('set' or 'action'). If mutations queue is set (see Virta.batch), such
+    requests are queued instead of being sent, and None is returned. The
+    queue is set per thread: requests of other threads are sent.
+    
+    Attributes:
+        cache (ResponseCache): Disk cache. Defaults to None (no cache).
+        mutations (MutationQueue): Queue for deferred requests of the 
+            current thread. Defaults to None (requests are sent 
+            immediately).
+        stats (collections.Counter): Usage counters ('coalesced' - number of
+            requests served by a request in flight, 'cache_hits' - number
+            of fresh responses served from the disk cache, 
+            'cache_revalidated' - number of stale cached responses 
+            confirmed by the server, 'region_misses' - number of pages
+            parsed in full since the region requested from tree was not
+            found).
+    """
+    
+    def __init__(self, cache=None):
+        super().__init__()
+        self.cache = cache
+        self.local = threading.local()
+        self.stats = collections.Counter()
+        self.inflight = {}
+        self.lock = threading.Lock()
+    
+    @property
+    def mutations(self):
+        return getattr(self.local, 'mutations', None)
+    
+    @mutations.setter
+    def mutations(self, queue):
+        self.local.mutations = queue
+    
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+    
+    def get(self, url, cache=None, mutation=None, **kwargs):
+        """Send GET request.
+        
+        Arguments:
+            url (str): Url.
+            cache (float or callable): Disk cache policy. A number is the 
+                time in seconds the stored response stays fresh. A callable
+                returns the freshness tag (JSON serializable): the stored 
+                response stays fresh as long as the tag does not change. 
+                Stale responses are revalidated by conditional requests. 
+                Defaults to None (disk cache is not used).
+            mutation (str): 'set' if the request sets some state, 'action' 
+                if it performs any other action changing the game state.
+                Defaults to None (the request does not change the state).
+            sent (callable): For a mutation, called with the response once
+                the request is sent, i.e. when the batch is flushed if the
+                request is deferred. Defaults to None.
+            kwargs: Passed to requests.Session.get.
+        
+        Returns:
+            requests.Response. None if the request is deferred.
+        """
+        
+        if mutation:
+            return self.mutate(mutation, 'GET', url, **kwargs)
+        if cache is not None and self.cache is not None:
+            return self.cached_get(url, cache, **kwargs)
+        if set(kwargs) - {'params'}:
+            return super().get(url, **kwargs)
+        if kwargs.get('params'):
+            key = requests.Request('GET', url, params=kwargs['params']).prepare().url
+        else:
+            key = url
+        with self.lock:
+            call = self.inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self.inflight[key] = Future()
+            else:
+                self.stats['coalesced'] += 1
+        if not leader:
+            return call.result()
+        try:
+            response = super().get(url, **kwargs)
+            response.content  # read the body to share it between the callers
+        except BaseException as error:
+            with self.lock:
+                del self.inflight[key]
+            call.set_exception(error)
+            raise
+        with self.lock:
+            del self.inflight[key]
+        call.set_result(response)
+        return response
+    
+    def post(self, url, data=None, json=None, mutation=None, **kwargs):
+        """Send POST request.
+        
+        Arguments:
+            mutation (str): 'set', 'action' or None (see get).
+            sent (callable): Called with the response once sent (see get).
+            url, data, json, kwargs: Passed to requests.Session.post.
+        
+        Returns:
+            requests.Response. None if the request is deferred.
+        """
+        
+        if mutation:
+            return self.mutate(mutation, 'POST', url, data=data, json=json, **kwargs)
+        return super().post(url, data=data, json=json, **kwargs)
+    
+    def mutate(self, kind, method, url, sent=None, **kwargs):
+        if self.mutations is not None:
+            self.mutations.put(kind, method, url, sent=sent, **kwargs)
+            return None
+        response = self.request(method, url, **kwargs)
+        if sent is not None:
+            sent(response)
+        return response
+    
+    def tree(self, url, region=None):
+        """Page tree structure, in which elements can be located by xpath.
+        
+        Arguments:
+            url (str): Page url.
+            region (str): Id of the page element (e.g. 'mainContent') 
+                holding all the data needed. If passed, only the element 
+                markup is cut from the response and parsed, which saves
+                the time and memory spent on menus, scripts, etc. Absolute
+                xpaths ('//...') then search the element only. If the 
+                element is not found, the whole page is parsed. Defaults 
+                to None (whole page).
+        
+        Returns:
+            lxml.html.HtmlElement: Page root, or region element.
+        """
+        
+        response = self.get(url)
+        encoding = charset(response) if region else None
+        root, found = page_tree(response.content, region, encoding)
+        if not found:
+            self.count('region_misses')
+        return root
+    
+    def cached_get(self, url, cache, **kwargs):
+        entry = self.cache.load(url)
+        tag = None
+        if entry:
+            if callable(cache):
+                tag = cache()
+                fresh = entry['tag'] == tag
+            else:
+                fresh = time.time() - entry['time'] < cache
+            if fresh:
+                self.count('cache_hits')
+                return self.cache.response(entry)
+            validators = {}
+            if 'ETag' in entry['headers']:
+                validators['If-None-Match'] = entry['headers']['ETag']
+            if 'Last-Modified' in entry['headers']:
+                validators['If-Modified-Since'] = entry['headers']['Last-Modified']
+            if validators:
+                kwargs['headers'] = {**kwargs.get('headers', {}), **validators}
+        response = self.get(url, **kwargs)
+        if response.status_code == 304 and entry:
+            self.count('cache_revalidated')
+            response = self.cache.response(entry)
+        elif response.status_code != 200:
+            return response
+        if callable(cache) and tag is None:
+            tag = cache()
+        self.cache.save(url, response, tag)
+        return response
@@ -1,55 +1,817 @@
-class List(list):
+"""Records collections filtered by field values.
+
+Filter values are matched by equality, or by membership if a list, tuple
+or set is passed. Conditions and callables select by other tests:
+
+    from virtonomics.types import ge, startswith
+    
+    v.units(unit_class_kind='shop', size=ge(3), name=~startswith('* '))
+    v.cities(population=between(100000, 500000))
+    v.units(name=lambda name: 'Конкурс' not in name)
+
+Conditions: gt, ge, lt, le, ne, between, startswith, contains, not_in, 
+where (callable). They can be negated (~) and combined (&, |). Filters are
+compiled once per call into a single predicate (see predicate).
+
+Calls copy the matching records into a new Dict or List. The view method
+takes the same filters and returns a read-only view instead (DictView,
+ListView) holding only the positions of the matching records. Views can be
+filtered again, iterated, and converted with copy:
+
+    for unit_id, unit in v.units.view(unit_class_kind='shop').items():
+        ...
+    big_shops = v.units.view(unit_class_kind='shop').view(size=ge(5)).copy()
+
+Collections and views also group records and aggregate fields in one pass
+(see Aggregations):
+
+    v.units.sum('employee_count', by='country_name')
+    for product_id, contracts in v.sale_contracts(unit_id).group_by('product_id').items():
+        ...
+"""
+
+import operator
+from bisect import bisect_left, bisect_right
+from collections.abc import ItemsView, Mapping, Sequence, ValuesView
+from itertools import chain
+
+
+# Instance attributes derived from the records, dropped on changes
+_derived = ('_indexes', '_records', '_keys', '_sorted')
+
+
+class Condition:
+    """Test of a field value. Negated by ~, combined by & and |.
+    
+    Attributes:
+        test (callable): Returns True if a field value satisfies the 
+            condition (a missing field has value None).
+    """
+    
+    def lookup(self, collection, field):
+        """Positions of the records satisfying the condition found by the 
+        field index, ascending. None if the index can not be used."""
+        
+        return None
+    
+    def __invert__(self):
+        return Not(self)
+    
+    def __and__(self, other):
+        return And(self, condition(other))
+    
+    def __or__(self, other):
+        return Or(self, condition(other))
+
+
+class In(Condition):
+    """Value is one of the values (equality, as list membership)."""
+    
+    def __init__(self, values):
+        self.values = values
+        if isinstance(values, (set, frozenset)):
+            def test(value):
+                try:
+                    return value in values
+                except TypeError:
+                    return False  # unhashable value
+            self.test = test
+        else:
+            self.test = values.__contains__
+    
+    def lookup(self, collection, field):
+        index = collection.index(field, build=False)
+        if index is None:
+            return None
+        try:
+            found = [index[value] for value in self.values if value in index]
+        except TypeError:
+            return None  # unhashable value
+        if len(found) == 1:
+            return found[0]
+        return sorted(set(chain.from_iterable(found)))
+
+
+class Range(Condition):
+    """Value is within bounds (None for an open bound).
+    
+    Values not comparable with the bounds (e.g. None, strings and numbers)
+    do not satisfy the condition.
+    """
+    
+    def __init__(self, low=None, high=None, low_inclusive=True, 
+                 high_inclusive=True):
+        self.low = low
+        self.high = high
+        above = operator.ge if low_inclusive else operator.gt
+        below = operator.le if high_inclusive else operator.lt
+        self.low_inclusive = low_inclusive
+        self.high_inclusive = high_inclusive
+        
+        def test(value):
+            if value is None:
+                return False
+            try:
+                return ((low is None or above(value, low)) 
+                        and (high is None or below(value, high)))
+            except TypeError:
+                return False
+        
+        self.test = test
+    
+    def lookup(self, collection, field):
+        kinds = {_kind(bound) for bound in (self.low, self.high) if bound is not None}
+        if len(kinds) != 1:
+            return None
+        keys = collection.sorted_keys(field, kinds.pop())
+        if keys is None:
+            return None
+        first, last = 0, len(keys)
+        if self.low is not None:
+            bisect = bisect_left if self.low_inclusive else bisect_right
+            first = bisect(keys, self.low)
+        if self.high is not None:
+            bisect = bisect_right if self.high_inclusive else bisect_left
+            last = bisect(keys, self.high)
+        return collection.positions_of(field, keys[first:last])
+
+
+class StartsWith(Condition):
+    """String value starts with a prefix."""
+    
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.test = lambda value: isinstance(value, str) and value.startswith(prefix)
+    
+    def lookup(self, collection, field):
+        keys = collection.sorted_keys(field, str)
+        if keys is None:
+            return None
+        first = bisect_left(keys, self.prefix)
+        last = first
+        while last < len(keys) and keys[last].startswith(self.prefix):
+            last += 1
+        return collection.positions_of(field, keys[first:last])
+
+
+class Where(Condition):
+    """Value satisfies a predicate (a callable returning bool)."""
+    
+    def __init__(self, function):
+        self.function = function
+        self.test = lambda value: bool(function(value))
+
+
+class Not(Condition):
+    
+    def __init__(self, condition):
+        self.condition = condition
+        test = condition.test
+        self.test = lambda value: not test(value)
+
+
+class And(Condition):
+    
+    def __init__(self, *conditions):
+        self.conditions = conditions
+        tests = [c.test for c in conditions]
+        self.test = lambda value: all(test(value) for test in tests)
+    
+    def lookup(self, collection, field):
+        found = [c.lookup(collection, field) for c in self.conditions]
+        if any(positions is None for positions in found):
+            return None
+        return sorted(set(found[0]).intersection(*found[1:]))
+
+
+class Or(Condition):
+    
+    def __init__(self, *conditions):
+        self.conditions = conditions
+        tests = [c.test for c in conditions]
+        self.test = lambda value: any(test(value) for test in tests)
+    
+    def lookup(self, collection, field):
+        found = [c.lookup(collection, field) for c in self.conditions]
+        if any(positions is None for positions in found):
+            return None
+        return sorted(set(chain.from_iterable(found)))
+
+
+def gt(value):
+    """Greater than value."""
+    return Range(low=value, low_inclusive=False)
+
+
+def ge(value):
+    """Greater than or equal to value."""
+    return Range(low=value)
+
+
+def lt(value):
+    """Less than value."""
+    return Range(high=value, high_inclusive=False)
+
+
+def le(value):
+    """Less than or equal to value."""
+    return Range(high=value)
+
+
+def between(low, high):
+    """Between low and high, inclusive."""
+    return Range(low, high)
+
+
+def ne(value):
+    """Not equal to value."""
+    return Not(In([value]))
+
+
+def not_in(values):
+    """None of the values."""
+    return Not(In(list(values)))
+
+
+def startswith(prefix):
+    """String starting with prefix."""
+    return StartsWith(prefix)
+
+
+def contains(substring):
+    """String containing substring."""
+    return Where(lambda value: isinstance(value, str) and substring in value)
+
+
+def where(function):
+    """Value for which function returns True."""
+    return Where(function)
+
+
+def condition(value):
+    """Filter value as a Condition."""
+    
+    if isinstance(value, Condition):
+        return value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return In(value)
+    if callable(value) and not isinstance(value, (dict, type)):
+        return Where(value)
+    return In([value])
+
+
+def predicate(**filters):
+    """Compile filters into a function of a record returning True if the 
+    record matches all of them.
+    
+    Example:
+        is_big_shop = predicate(unit_class_kind='shop', size=ge(5))
+        big_shops = [u for u in units if is_big_shop(u)]
+    """
+    
+    tests = [(field, condition(value).test) for field, value in filters.items()]
+    if not tests:
+        return lambda record: True
+    if len(tests) == 1:
+        (field, test), = tests
+        return lambda record: test(record.get(field))
+    return lambda record: all(test(record.get(field)) for field, test in tests)
+
+
+def _kind(value):
+    """Class of mutually comparable values value belongs to, or None."""
+    
+    if isinstance(value, (int, float)):
+        return float
+    if isinstance(value, str):
+        return str
+    return None
+
+
+class Aggregations:
+    """Grouping and aggregation of the records fields.
+    
+    Fields are given by name or as a function of a record. Records with
+    the field value None (or missing) are skipped. With by, the result is a
+    dict: value of the by field -> aggregate of the records having it (see
+    group_by).
+    
+    Example:
+        contracts.sum('party_quantity', by='product_id')
+        trades.weighted_mean('price', 'sold')
+    """
+    
+    __slots__ = ()
+    
+    def group_by(self, field):
+        """Group the records by the values of a field in one pass.
+        
+        Returns:
+            dict: Value -> view of the records having it (DictView or 
+                ListView), in the collection order. Values are in the
+                order of their first records.
+        """
+        
+        return {value: self._view(positions) 
+                for value, positions in self._group_positions(field).items()}
+    
+    def _aggregate(self, function, by, *args):
+        if by is None:
+            return function(self._values(), *args)
+        return {value: function(group._values(), *args)
+                for value, group in self.group_by(by).items()}
+    
+    def sum(self, field, by=None):
+        """Sum of a field (0 if no values)."""
+        return self._aggregate(_sum, by, field)
+    
+    def mean(self, field, by=None):
+        """Mean of a field (None if no values)."""
+        return self._aggregate(_mean, by, field)
+    
+    def weighted_mean(self, field, weight, by=None):
+        """Mean of a field weighted by another field (None if the total 
+        weight is 0)."""
+        return self._aggregate(_weighted_mean, by, field, weight)
+    
+    def std(self, field, weight=None, by=None):
+        """Population standard deviation of a field, weighted by weight if
+        passed (None if no values)."""
+        return self._aggregate(_std, by, field, weight)
+
+
+def _getter(field):
+    if callable(field):
+        return field
+    return lambda record: record.get(field)
+
+
+def _field_values(records, field):
+    return [v for v in map(_getter(field), records) if v is not None]
+
+
+def _weighted_values(records, field, weight):
+    get_value, get_weight = _getter(field), _getter(weight)
+    pairs = ((get_value(r), get_weight(r)) for r in records)
+    return [(v, w) for v, w in pairs if v is not None and w is not None]
+
+
+def _sum(records, field):
+    return sum(_field_values(records, field))
+
+
+def _mean(records, field):
+    values = _field_values(records, field)
+    return sum(values) / len(values) if values else None
+
+
+def _weighted_mean(records, field, weight):
+    pairs = _weighted_values(records, field, weight)
+    total = sum(w for _, w in pairs)
+    return sum(v * w for v, w in pairs) / total if total else None
+
+
+def _std(records, field, weight=None):
+    if weight is None:
+        pairs = [(v, 1) for v in _field_values(records, field)]
+    else:
+        pairs = _weighted_values(records, field, weight)
+    total = sum(w for _, w in pairs)
+    if not total:
+        return None
+    mean = sum(v * w for v, w in pairs) / total
+    return (sum(w * (v - mean)**2 for v, w in pairs) / total) ** 0.5
+
+
+def _group(records, positions, field):
+    """Positions grouped by the values of a field: value -> positions."""
+    
+    groups = {}
+    for p in positions:
+        value = records[p].get(field)
+        if value in groups:
+            groups[value].append(p)
+        else:
+            groups[value] = [p]
+    return groups
+
+
+class Indexed(Aggregations):
+    """Filtering of records collections by hash indexes built on request.
+    
+    An index maps the values of a field to the positions of the records
+    having them. It is built by index(field) and used by the next calls
+    filtering by the field, so filtering repeatedly by an indexed field 
+    costs time proportional to the number of matching records, not of all
+    the records. Filters without an indexed field scan the records.
+    Indexes are dropped whenever the collection is changed (records added,
+    removed or replaced). Fields with unhashable values are not indexed.
+    
+    Collections whose records are not changed in place (e.g. the reference
+    tables v.cities, v.products) can index every field they are filtered
+    by on the first use instead (see auto_index).
+    
+    Range and prefix conditions (ge, between, startswith etc.) use the
+    sorted distinct values of the index. The candidates found by the most
+    selective index are checked against all the filters, so a record whose
+    field was changed in place is never returned for its former value. It
+    is missed when filtering by its new value until reindex is called.
+    
+    Subclasses implement records(): list of the records in the collection
+    order.
+    """
+    
+    def auto_index(self):
+        """Index every field on the first call filtering by it.
+        
+        Only for collections whose records are not changed in place: 
+        changing the collection itself drops the indexes as usual.
+        """
+        
+        self.__dict__['_auto_index'] = True
+    
+    def reindex(self):
+        """Drop the indexes (build them again with index)."""
+        
+        for name in _derived:
+            self.__dict__.pop(name, None)
+    
+    def __getstate__(self):
+        state = {k: v for k, v in self.__dict__.items() if k not in _derived}
+        return state or None
+    
+    def _positional(self):
+        """Records in the collection order, cached until a change."""
+        
+        records = self.__dict__.get('_records')
+        if records is None:
+            records = self.__dict__['_records'] = self.records()
+        return records
+    
+    def index(self, field, build=True):
+        """Index of a field: value -> positions of the records (ascending).
+        
+        Arguments:
+            field (str): Field name.
+            build (bool): Build the index if the field is not indexed yet.
+                Otherwise return None for such a field.
+        
+        Returns:
+            dict: Index of the field. None if the field values are
+                unhashable.
+        """
+        
+        indexes = self.__dict__.get('_indexes')
+        if indexes is None:
+            if not build:
+                return None
+            indexes = self.__dict__['_indexes'] = {}
+        if field not in indexes:
+            if not build:
+                return None
+            index = {}
+            try:
+                for position, record in enumerate(self._positional()):
+                    value = record.get(field)
+                    if value in index:
+                        index[value].append(position)
+                    else:
+                        index[value] = [position]
+            except TypeError:
+                index = None
+            indexes[field] = index
+        return indexes[field]
+    
+    def sorted_keys(self, field, kind):
+        """Sorted distinct values of a field of a kind (float for numbers, 
+        str for strings). None if the field is not indexed."""
+        
+        index = self.index(field, build=False)
+        if kind is None or index is None:
+            return None
+        cache = self.__dict__.setdefault('_sorted', {})
+        if (field, kind) not in cache:
+            if kind is str:
+                keys = [k for k in index if isinstance(k, str)]
+            else:
+                keys = [k for k in index 
+                        if isinstance(k, (int, float)) and k == k]  # not NaN
+            cache[field, kind] = sorted(keys)
+        return cache[field, kind]
+    
+    def positions_of(self, field, values):
+        """Positions of the records with the field values, ascending."""
+        
+        index = self.index(field, build=False)
+        if len(values) == 1:
+            return index[values[0]]
+        return sorted(chain.from_iterable(index[value] for value in values))
+    
+    def positions(self, filters):
+        """Yield positions of the records matching filters, in order."""
+        
+        conditions = {fk: condition(fv) for fk, fv in filters.items()}
+        candidates = None
+        if self.__dict__.get('_auto_index'):
+            for fk in conditions:
+                self.index(fk)
+        if self.__dict__.get('_indexes'):
+            for fk, fv in conditions.items():
+                found = fv.lookup(self, fk)
+                if found is not None and (candidates is None or len(found) < len(candidates)):
+                    candidates = found
+        records = self._positional()
+        if candidates is None:
+            candidates = range(len(records))
+        test = predicate(**conditions)
+        for position in candidates:
+            if test(records[position]):
+                yield position
+    
+    def _group_positions(self, field):
+        records = self._positional()
+        return _group(records, range(len(records)), field)
+    
+    def select(self, **filters):
+        """Return the unique dictionary that contains passed key-value pairs.
+        If not unique or does not exist, return None.
+        """
+        positions = self.positions(filters)
+        first = next(positions, None)
+        if first is None or next(positions, None) is not None:
+            return None
+        return self._positional()[first]
+
+
+def _invalidating(method):
+    """Wrap a method changing the collection to drop the indexes."""
+    
+    def wrapper(self, *args, **kwargs):
+        if self.__dict__:
+            self.reindex()
+        return method(self, *args, **kwargs)
+    
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class List(Indexed, list):
     """Extends built-in list. Values are assumed to be dictionaries.
     
-    Callable. When called with keyword arguments, return the list of 
+    Callable. When called with keyword arguments, return the list of
     dictionaries that contain all the passed key-value pairs.
     If a list or a tuple is passed as a keyword argument, perform inclusion
     test for the corresponding values.
-    If the resulting list contains a unique element, this single dictionary 
+    If the resulting list contains a unique element, this single dictionary
     can be extracted using select method with the same arguments.
+    
+    Fields filtered repeatedly can be indexed (see Indexed). The view method
+    filters without copying (see View). Records can be grouped and their
+    fields aggregated: group_by, sum, mean, weighted_mean, std (see
+    Aggregations).
     """
     
+    __setitem__ = _invalidating(list.__setitem__)
+    __delitem__ = _invalidating(list.__delitem__)
+    __iadd__ = _invalidating(list.__iadd__)
+    __imul__ = _invalidating(list.__imul__)
+    append = _invalidating(list.append)
+    extend = _invalidating(list.extend)
+    insert = _invalidating(list.insert)
+    pop = _invalidating(list.pop)
+    remove = _invalidating(list.remove)
+    clear = _invalidating(list.clear)
+    sort = _invalidating(list.sort)
+    reverse = _invalidating(list.reverse)
+    
+    def records(self):
+        return list(self)
+    
     def __call__(self, **filters):
-        for fk, fv in filters.items():
-            if not (isinstance(fv, list) or isinstance(fv, tuple) or isinstance(fv, set)):
-                filters[fk] = [fv]
-        return List(v for v in self if all(v.get(fk) in fv for fk, fv in filters.items()))
+        positions = list(self.positions(filters))
+        records = self._positional()
+        return List(records[p] for p in positions)
     
-    def select(self, **filters):
-        """Return the unique dictionary that contains passed key-value pairs.
-        If not unique or does not exist, return None.
-        """
-        result = self(**filters)
-        if len(result) == 1:
-            return result[0]
-        else:
-            return None
+    def view(self, **filters):
+        """Filter like a call, but return a ListView of the list."""
+        
+        return self._view(list(self.positions(filters)))
+    
+    def _view(self, positions):
+        return ListView(self._positional(), positions)
+    
+    def _values(self):
+        return self
 
 
-class Dict(dict):
+class Dict(Indexed, dict):
     """Extends built-in dict. Values are assumed to be dictionaries.
     
     Callable. When called with keyword arguments, return the dictionaries
     that contain all the passed key-value pairs.
     If a list or a tuple is passed as a keyword argument, perform inclusion
     test for the corresponding values.
-    If the resulting dictionary contains a unique element, this single 
+    If the resulting dictionary contains a unique element, this single
     dictionary can be extracted using select method with the same arguments.
+    
+    Fields filtered repeatedly can be indexed (see Indexed). The view method
+    filters without copying (see View). Records can be grouped and their
+    fields aggregated: group_by, sum, mean, weighted_mean, std (see
+    Aggregations).
     """
     
+    __setitem__ = _invalidating(dict.__setitem__)
+    __delitem__ = _invalidating(dict.__delitem__)
+    __ior__ = _invalidating(dict.__ior__)
+    clear = _invalidating(dict.clear)
+    pop = _invalidating(dict.pop)
+    popitem = _invalidating(dict.popitem)
+    setdefault = _invalidating(dict.setdefault)
+    update = _invalidating(dict.update)
+    
+    def records(self):
+        return list(self.values())
+    
     def __call__(self, **filters):
-        for fk, fv in filters.items():
-            if not (isinstance(fv, list) or isinstance(fv, tuple) or isinstance(fv, set)):
-                filters[fk] = [fv]
-        return Dict({k: v for k, v in self.items()
-                     if all(v.get(fk) in fv for fk, fv in filters.items())})
+        positions = list(self.positions(filters))
+        if not positions:
+            return Dict()
+        keys = self.__dict__.get('_keys')
+        if keys is None:
+            keys = self.__dict__['_keys'] = list(self)
+        records = self._positional()
+        return Dict({keys[p]: records[p] for p in positions})
+    
+    def view(self, **filters):
+        """Filter like a call, but return a DictView of the dictionary."""
+        
+        return self._view(list(self.positions(filters)))
+    
+    def _view(self, positions):
+        keys = self.__dict__.get('_keys')
+        if keys is None:
+            keys = self.__dict__['_keys'] = list(self)
+        return DictView(keys, self._positional(), positions)
+    
+    def _values(self):
+        return self.values()
+
+
+class View(Aggregations):
+    """Read-only filtered view of a Dict or List.
+    
+    References the records of the parent collection and keeps the positions
+    of the matching ones. A view reflects the collection at the time it was
+    created: later changes of the collection are not seen (changes of the 
+    records themselves are).
+    
+    Callable with filters like the collection itself. Filtering a view
+    returns a view as well, checking only the records of the view.
+    """
+    
+    __slots__ = ('_records', '_positions')
+    
+    def __len__(self):
+        return len(self._positions)
+    
+    def _filtered(self, filters):
+        """Positions of the view records matching filters."""
+        
+        test = predicate(**filters)
+        records = self._records
+        return [p for p in self._positions if test(records[p])]
+    
+    def _group_positions(self, field):
+        return _group(self._records, self._positions, field)
     
     def select(self, **filters):
         """Return the unique dictionary that contains passed key-value pairs.
         If not unique or does not exist, return None.
         """
-        result = self(**filters)
-        if len(result) == 1:
-            return next(iter(result.values()))
-        else:
-            return None
\ No newline at end of file
+        positions = self._filtered(filters)
+        if len(positions) != 1:
+            return None
+        return self._records[positions[0]]
+
+
+class ListView(View, Sequence):
+    """Filtered view of a List (see View)."""
+    
+    __slots__ = ()
+    
+    def __init__(self, records, positions):
+        self._records = records
+        self._positions = positions
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ListView(self._records, self._positions[index])
+        return self._records[self._positions[index]]
+    
+    def __iter__(self):
+        records = self._records
+        return (records[p] for p in self._positions)
+    
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return 'ListView(%r)' % list(self)
+    
+    def __call__(self, **filters):
+        return ListView(self._records, self._filtered(filters))
+    
+    def _view(self, positions):
+        return ListView(self._records, positions)
+    
+    def _values(self):
+        return self
+    
+    view = __call__
+    
+    def copy(self):
+        """Matching records as a new List."""
+        
+        return List(self)
+
+
+class DictView(View, Mapping):
+    """Filtered view of a Dict (see View)."""
+    
+    __slots__ = ('_keys', '_members')
+    
+    def __init__(self, keys, records, positions):
+        self._keys = keys
+        self._records = records
+        self._positions = positions
+        self._members = None
+    
+    def _member(self, key):
+        """Position of the record with a key, or None."""
+        
+        if self._members is None:
+            keys = self._keys
+            self._members = {keys[p]: p for p in self._positions}
+        return self._members.get(key)
+    
+    def __getitem__(self, key):
+        position = self._member(key)
+        if position is None:
+            raise KeyError(key)
+        return self._records[position]
+    
+    def __contains__(self, key):
+        return self._member(key) is not None
+    
+    def __iter__(self):
+        keys = self._keys
+        return (keys[p] for p in self._positions)
+    
+    def __repr__(self):
+        return 'DictView(%r)' % dict(self.items())
+    
+    def values(self):
+        return _DictViewValues(self)
+    
+    def items(self):
+        return _DictViewItems(self)
+    
+    def __call__(self, **filters):
+        return DictView(self._keys, self._records, self._filtered(filters))
+    
+    def _view(self, positions):
+        return DictView(self._keys, self._records, positions)
+    
+    def _values(self):
+        return self.values()
+    
+    view = __call__
+    
+    def copy(self):
+        """Matching records as a new Dict."""
+        
+        return Dict(self.items())
+
+
+class _DictViewValues(ValuesView):
+    
+    __slots__ = ()
+    
+    def __iter__(self):
+        records = self._mapping._records
+        return (records[p] for p in self._mapping._positions)
+
+
+class _DictViewItems(ItemsView):
+    
+    __slots__ = ()
+    
+    def __iter__(self):
+        view = self._mapping
+        keys, records = view._keys, view._records
+        return ((keys[p], records[p]) for p in view._positions)
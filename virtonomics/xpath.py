@@ -0,0 +1,137 @@
+"""Precompiled XPath expressions used by the HTML scrapers.
+
+Every expression is compiled once at import time and looked up by name:
+
+    from virtonomics.xpath import xpaths
+
+    rows = xpaths['trading_hall.rows'](page)
+    state = xpaths['eco_factor'](page, name='Промышленные стоки')
+
+Parameterised expressions use XPath variables ($name) instead of
+string formatting, so they are compiled once as well. Variables are passed
+to the call as keyword arguments.
+"""
+
+from lxml import etree
+
+
+class XPathRegistry(dict):
+    """Named precompiled etree.XPath objects."""
+    
+    def register(self, name, expression):
+        """Compile expression and store it under name.
+        
+        Returns:
+            etree.XPath: Compiled expression.
+        """
+        
+        if name in self and self[name].path != expression:
+            raise ValueError('XPath %s is already registered' % name)
+        self[name] = etree.XPath(expression, smart_strings=False)
+        return self[name]
+    
+    def __missing__(self, name):
+        raise KeyError('Unknown XPath %s' % name)
+
+
+xpaths = XPathRegistry()
+register = xpaths.register
+
+
+# Attributes
+register('elections.rows', '//td[contains(.," г.")]/../td/a'
+         '[contains(@href,"politics/elections")]/../..')
+register('elections.href', './td[2]/a/@href')
+register('elections.location_name', './td[2]/a/text()')
+register('elections.date', './td[3]/text()')
+register('qualification.rows',
+         '//tr/td[1]/img[contains(@src, "/qualification/")]/../..')
+register('qualification.name', './td[1]/img/@src')
+register('qualification.value', './td[last()]/b/text()')
+
+# Dates
+register('server_date', '//div[@title="Время на сервере"]/text()')
+register('shagreen.href', '//a[contains(.,"Шагрень")]/@href')
+register('shagreen.days_left', '//h3[contains(.,"Осталось пересчётов:")]/text()')
+
+# Messages
+register('messages.rows', '//tr[@id="newmesg"]')
+register('messages.id', './td/input/@value')
+register('messages.title', './td[last()]/a/text()')
+
+# Politics
+register('election_candidates.rows',
+         '//input[@type="radio" and @name=$name and @value!=0]/../..')
+register('election_candidates.id', './/input[@type="radio"]/@value')
+register('election_candidates.party', './/div[@class="title"]/text()')
+register('eco_factor', '//td[.=$name]/../td[2]/span/text()')
+register('party.companies', '//input[@name="member[]"]/../..'
+         '//a[contains(@href,"company/view")]/@href')
+
+# Trading hall
+register('trading_hall.rows', '//input[@type="text"]/ancestor::tr')
+
+# Warehouse
+register('warehouse.rows', '//tr//img[contains(@src, "/img/products/")]/../..')
+
+# Supply
+register('supply_products.rows',
+         '//img[@title="Выбрать поставщика"]/ancestor::tr[last()]')
+register('supply_products.product_id', './/@href[contains(.,"supply/create")]')
+register('supply_products.product_name',
+         './/img[contains(@src,"img/products")]/@alt')
+register('supply_products.title', '//td/@title')
+
+# Sale
+register('sale_offers.rows', '//input[contains(@name,"[price]")]/ancestor::tr')
+register('sale_offers.headers', './../tr/th')
+register('sale_offers.text', './text()')
+register('sale_offers.product_name',
+         './td/a[contains(@href,"globalreport/marketing")]/text()')
+register('sale_offers.price', './td/input[contains(@name,"[price]")]/@value')
+register('sale_offers.max_qty', './td//input[contains(@name,"[max_qty]")]/@value')
+register('sale_offers.constraint',
+         './td/select[contains(@name,"[constraint]")]/option[@selected]/@value')
+register('sale_offers.product', './td/input[@type="checkbox"]/@value')
+register('sale_offers.product_href', './td/a[contains(@href,"product_id")]/@href')
+register('sale_offers.company',
+         './td//select[contains(@name,"[company]")]/option/@value')
+
+# Service
+register('service_history.rows', '//*[@id="mainContent"]//tr')
+
+# Technologies
+register('technology_offers.cells',
+         '//input[@type="checkbox" and @name="techs[]"]/..')
+register('technology_offers.id', './input/@value')
+register('technology_offers.href', './a/@href')
+register('technology_sellers.rows',
+         '//td/a[contains(@href,"/company/view/")]/../..')
+register('technology_sellers.href', './/a/@href')
+register('technology_sellers.price', './td[2]/text()')
+
+# Units
+register('create_unit.options', '//input[@type="radio"]')
+register('create_unit.name', './@name')
+register('create_unit.value', './@value')
+register('create_unit.label', './../label/text()[last()]')
+register('create_unit.td2', './../../td[2]/text()[last()]')
+register('create_unit.td3', './../../td[3]/text()[last()]')
+register('create_unit.custom_name', '//input[@type="text"]/@value')
+register('sale_unit.price', '//input[@name="price"]/@value')
+register('unit_notice.text', '//textarea/text()')
+register('unit_view.not_found', '//h1[contains(.,"404")]')
+
+# Oligarch competition (shagreen)
+register('shagreen.innovations', '//img[contains(@src,"artefact")]/@title')
+register('shagreen.own_innovations', '//img[contains(@src,"pub/artefact")]/@title')
+register('shagreen.field', '//td[.=$name]/../td[2]/text()')
+register('shagreen.price', '//img[@alt="Шагрень"]/../../td[5]/text()')
+register('shagreen.history_price', '//tr/td[4]/text()')
+register('shagreen.city_name', '//div[@id="mainContent"]'
+         '//img[contains(@src,"flags")]/following-sibling::b/text()')
+register('shagreen.cells', '//a[contains(@href, "unit/view/")]/..')
+register('shagreen.revenue', './text()')
+register('shagreen.unit_href', './a/@href')
+register('shagreen.user', './../td[2]//a/text()')
+register('shagreen.company', './../td[3]//a/text()')